@@ -39,13 +39,14 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'rest_framework',
-    'core',
-    'user',
-    'recipe',
+    'core.apps.CoreConfig',
+    'user.apps.UserConfig',
+    'recipe.apps.RecipeConfig',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.replica_routing_middleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -74,20 +75,80 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'app.wsgi.application'
 
+# Runs the test suite with cheap password hashing and without throttles
+TEST_RUNNER = 'core.test_runner.TestRunner'
+
 
 # Database
 # https://docs.djangoproject.com/en/3.1/ref/settings/#databases
 
+# Connections are kept open for DB_CONN_MAX_AGE seconds and reused by
+# the requests a thread serves, 0 opens and closes one per request. With
+# health checks a reused connection is pinged when a request starts, so
+# one the server dropped is reopened instead of failing the request.
+#
+# Behind a transaction pooling pgbouncer set DB_POOL_MODE=transaction.
+# Consecutive transactions may run on different server connections then,
+# so nothing may rely on session state: server side cursors, which
+# QuerySet.iterator() uses, are disabled, and the database should
+# default to the UTC timezone so connecting issues no SET TIME ZONE. Keep
+# the connections to the pooler persistent, it pools the server side.
+DB_POOL_MODE = os.environ.get('DB_POOL_MODE', 'session')
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
         'HOST': os.environ.get('DB_HOST'),
+        'PORT': os.environ.get('DB_PORT', ''),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
-        'PASSWORD': os.environ.get('DB_PASS')
+        'PASSWORD': os.environ.get('DB_PASS'),
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': os.environ.get('DB_CONN_HEALTH_CHECKS', '1') == '1',
+        'DISABLE_SERVER_SIDE_CURSORS': DB_POOL_MODE == 'transaction',
     }
 }
 
+# Read replicas of the default database, a comma separated list of hosts.
+# The reads of GET requests go to one of them. A client that wrote reads
+# from the primary for DB_REPLICA_STICKY_SECONDS afterwards, so it sees
+# its own writes despite replication lag, see core.db.ReplicaRouter.
+DATABASE_REPLICAS = []
+for index, host in enumerate(
+        filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(','))):
+    alias = f'replica_{index}'
+    DATABASES[alias] = dict(
+        DATABASES['default'],
+        HOST=host.strip(),
+        TEST={'MIRROR': 'default'}
+    )
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['core.db.ReplicaRouter']
+REPLICA_STICKY_SECONDS = int(os.environ.get('DB_REPLICA_STICKY_SECONDS', 10))
+REPLICA_STICKY_COOKIE = 'primary_reads'
+
+
+# Cache
+# https://docs.djangoproject.com/en/3.1/topics/cache/
+# Local memory by default, point CACHE_BACKEND/CACHE_LOCATION at a shared
+# cache such as memcached when running more than one process. The image
+# defaults to the memcached service and manage.py serve refuses to start
+# several workers on a local memory cache.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+
+RECIPE_CACHE_ALIAS = os.environ.get('RECIPE_CACHE_ALIAS', 'default')
+RECIPE_CACHE_TIMEOUT = int(os.environ.get('RECIPE_CACHE_TIMEOUT', 300))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.1/ref/settings/#auth-password-validators
@@ -108,6 +169,44 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Password hashing. PASSWORD_HASHER_PROFILE picks the hasher for new
+# passwords, the others still verify existing hashes, which are replaced
+# with the preferred one on the next successful login. The same happens
+# when the costs below change. The test runner hashes with a cheap hasher
+PASSWORD_HASHER_PROFILES = {
+    'scrypt': 'core.hashers.ScryptPasswordHasher',
+    # Needs argon2-cffi
+    'argon2': 'core.hashers.Argon2PasswordHasher',
+    'pbkdf2': 'core.hashers.PBKDF2PasswordHasher',
+}
+PASSWORD_HASHER_PROFILE = os.environ.get('PASSWORD_HASHER_PROFILE', 'scrypt')
+PASSWORD_HASHERS = [PASSWORD_HASHER_PROFILES[PASSWORD_HASHER_PROFILE]] + [
+    hasher
+    for profile, hasher in PASSWORD_HASHER_PROFILES.items()
+    if profile != PASSWORD_HASHER_PROFILE
+]
+PASSWORD_SCRYPT = {
+    'work_factor': int(os.environ.get('PASSWORD_SCRYPT_N', 2 ** 14)),
+    'block_size': int(os.environ.get('PASSWORD_SCRYPT_R', 8)),
+    'parallelism': int(os.environ.get('PASSWORD_SCRYPT_P', 1)),
+}
+PASSWORD_ARGON2 = {
+    'time_cost': int(os.environ.get('PASSWORD_ARGON2_TIME_COST', 2)),
+    'memory_cost': int(os.environ.get('PASSWORD_ARGON2_MEMORY_COST', 102400)),
+    'parallelism': int(os.environ.get('PASSWORD_ARGON2_PARALLELISM', 8)),
+}
+PASSWORD_PBKDF2_ITERATIONS = int(
+    os.environ.get('PASSWORD_PBKDF2_ITERATIONS', 260000)
+)
+# Hash in a 'thread' or 'process' pool of PASSWORD_HASHING_WORKERS so a
+# burst of logins cannot take every core, empty to hash inline
+PASSWORD_HASHING_POOL = os.environ.get('PASSWORD_HASHING_POOL', 'thread')
+PASSWORD_HASHING_WORKERS = int(os.environ.get(
+    'PASSWORD_HASHING_WORKERS',
+    max(1, (os.cpu_count() or 2) // 2)
+))
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/3.1/topics/i18n/
 
@@ -131,15 +230,126 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = '/vol/web/media/'
 STATIC_ROOT = '/vol/web/static/'
 
+# Media is served by core.views.serve_media. Setting MEDIA_SENDFILE_HEADER
+# to X-Accel-Redirect (nginx, with an internal location at
+# MEDIA_ACCEL_PREFIX aliasing MEDIA_ROOT) or X-Sendfile (Apache, lighttpd)
+# hands the transfer to the front proxy once access has been checked
+MEDIA_SENDFILE_HEADER = os.environ.get('MEDIA_SENDFILE_HEADER', '')
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+# Only serve recipe images to the owner of the recipe
+MEDIA_REQUIRE_OWNER = bool(os.environ.get('MEDIA_REQUIRE_OWNER'))
+# Cache lifetimes in seconds, content addressed files never change
+MEDIA_MAX_AGE = 60 * 60
+MEDIA_IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+# 'content_addressed' stores each distinct recipe image once under its
+# SHA-256 and collects it with the last reference, 'unique' stores every
+# upload under a new name
+RECIPE_IMAGE_STORAGE = os.environ.get(
+    'RECIPE_IMAGE_STORAGE',
+    'content_addressed'
+)
+
+# Longest edge in pixels of the variants rendered for each recipe image
+RECIPE_IMAGE_VARIANTS = {
+    'thumbnail': 150,
+    'medium': 600,
+    'full': 2048,
+}
+RECIPE_IMAGE_MAX_ATTEMPTS = 3
+
+# Recipe images are resized on request at
+# MEDIA_URL/recipe/<id>/<width>x<height>.<ext>, both dimensions taken from
+# RECIPE_IMAGE_RESIZE_SIZES. Renders are kept under
+# RECIPE_IMAGE_RESIZE_ROOT, least recently used evicted past the size cap
+RECIPE_IMAGE_RESIZE_SIZES = (64, 128, 256, 512, 1024)
+RECIPE_IMAGE_RESIZE_FORMATS = {
+    'jpg': 'JPEG',
+    'png': 'PNG',
+    'webp': 'WEBP',
+}
+RECIPE_IMAGE_RESIZE_ROOT = os.environ.get(
+    'RECIPE_IMAGE_RESIZE_ROOT',
+    '/vol/web/resized/'
+)
+RECIPE_IMAGE_RESIZE_MAX_BYTES = int(
+    os.environ.get('RECIPE_IMAGE_RESIZE_MAX_BYTES', 512 * 1024 * 1024)
+)
+RECIPE_IMAGE_RESIZE_ACCEL_PREFIX = '/protected-resized/'
+
+# Limits enforced while a recipe image upload streams in
+RECIPE_IMAGE_MAX_BYTES = int(
+    os.environ.get('RECIPE_IMAGE_MAX_BYTES', 10 * 1024 * 1024)
+)
+RECIPE_IMAGE_MAX_PIXELS = int(
+    os.environ.get('RECIPE_IMAGE_MAX_PIXELS', 40 * 1000 * 1000)
+)
+RECIPE_IMAGE_CONTENT_TYPES = (
+    'image/jpeg',
+    'image/png',
+    'image/gif',
+    'image/webp',
+)
+RECIPE_IMAGE_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+
+# Keep upload temp files on the media volume so storing them is a rename
+FILE_UPLOAD_TEMP_DIR = os.environ.get('FILE_UPLOAD_TEMP_DIR')
+
 AUTH_USER_MODEL = 'core.User'
 
+# Serve list and retrieve of the recipe API from async views, set by the
+# ASGI entry point
+ASYNC_READ_VIEWS = bool(os.environ.get('ASYNC_READ_VIEWS'))
+
+# Default number of items per page on the list endpoints, clients may ask
+# for up to API_MAX_PAGE_SIZE with the page_size query parameter
+API_PAGE_SIZE = int(os.environ.get('API_PAGE_SIZE', 100))
+API_MAX_PAGE_SIZE = int(os.environ.get('API_MAX_PAGE_SIZE', 1000))
+
+# Seconds user.authentication.StatelessJWTAuthentication trusts its cached
+# view of whether a user's tokens are revoked
+JWT_REVOCATION_CACHE_TTL = int(
+    os.environ.get('JWT_REVOCATION_CACHE_TTL', 30)
+)
+# Seconds user.authentication.CachedJWTAuthentication remembers the
+# outcome of authenticating a token, failures included. Successes of
+# tokens issued without the user claims are not remembered, those are
+# checked against the database on every request
+AUTH_TOKEN_CACHE_TTL = int(os.environ.get('AUTH_TOKEN_CACHE_TTL', 30))
+
+# Authenticators for views that do not set their own, tried in order.
+# Compare alternatives with the benchmark_authentication command
+API_AUTHENTICATION_CLASSES = os.environ.get(
+    'API_AUTHENTICATION_CLASSES',
+    'user.authentication.CachedJWTAuthentication'
+).split(',')
+
+# Token bucket throttles of the user endpoints as capacity/period, the
+# bucket refilling at that rate. Buckets are kept per client address
+# ('<scope>_ip') and per account named in the request ('<scope>_account')
+# in THROTTLE_CACHE_ALIAS. The test runner turns them off, the requests
+# of the test suite all come from one address
+USER_THROTTLE_RATES = {
+    'token_ip': '30/min',
+    'token_account': '10/min',
+    'refresh_ip': '60/min',
+    'create_ip': '20/hour',
+    'create_account': '5/hour',
+}
+THROTTLE_CACHE_ALIAS = os.environ.get('THROTTLE_CACHE_ALIAS', 'default')
+# Requests per scope a process works on at once, more are answered 429
+USER_CONCURRENCY_CAPS = {
+    'token': PASSWORD_HASHING_WORKERS * 2,
+    'refresh': 32,
+    'create': PASSWORD_HASHING_WORKERS * 2,
+}
 
-REST_FRAMEWORK = {
-    'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
-        'rest_framework.authentication.TokenAuthentication'
 
-        ),
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': API_AUTHENTICATION_CLASSES,
+    # Reverse proxies in front of the app, their X-Forwarded-For entries
+    # are trusted for the client address. 0 uses the peer address
+    'NUM_PROXIES': int(os.environ.get('API_NUM_PROXIES', 0)),
 
     # 'DEFAULT_PERMISSION_CLASSES': (
     #     'rest_framework.permissions.IsAuthenticated'
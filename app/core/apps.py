@@ -1,5 +1,13 @@
 from django.apps import AppConfig
+from django.core.signals import request_started
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from core import signals  # noqa: F401
+        from core.db import check_connection_health
+
+        # After close_old_connections, which already dropped the stale ones
+        request_started.connect(check_connection_health)
@@ -0,0 +1,41 @@
+import time
+from contextlib import contextmanager
+
+from django.db import transaction
+
+
+def measure(func, repeat):
+    """Call func repeat times and return the sorted durations in ms"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+
+    return sorted(samples)
+
+
+def percentile(samples, pct):
+    """Return the pct percentile of a sorted list of samples"""
+    if not samples:
+        return 0.0
+    index = min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))
+
+    return samples[index]
+
+
+def summarize(samples):
+    """Return a one line p50/p99/max summary of sorted samples"""
+    return 'p50 {:.2f} ms  p99 {:.2f} ms  max {:.2f} ms'.format(
+        percentile(samples, 50),
+        percentile(samples, 99),
+        samples[-1] if samples else 0.0,
+    )
+
+
+@contextmanager
+def rolled_back(using='default'):
+    """Run the block in a transaction that is always rolled back"""
+    with transaction.atomic(using=using):
+        yield
+        transaction.set_rollback(True, using=using)
@@ -0,0 +1,133 @@
+import hashlib
+import os
+import re
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F
+
+from core.models import ImageBlob
+
+BLOB_PREFIX = 'uploads/recipe/blobs/'
+
+# Blobs and the variants rendered from them carry the digest in their path
+CONTENT_ADDRESSED_PATH = re.compile(
+    r'^uploads/recipe/(?:blobs/[0-9a-f]{2}/[0-9a-f]{2}/|variants/)'
+    r'(?P<digest>[0-9a-f]{64})[./]'
+)
+
+
+def content_addressed():
+    """Return whether recipe images are stored by content digest"""
+    return settings.RECIPE_IMAGE_STORAGE == 'content_addressed'
+
+
+def blob_path(digest, ext):
+    """Return the storage path of the blob with the given digest"""
+    return os.path.join(BLOB_PREFIX, digest[:2], digest[2:4],
+                        f'{digest}.{ext}')
+
+
+def is_blob(name):
+    """Return whether a stored image name is a content addressed blob"""
+    return bool(name) and name.startswith(BLOB_PREFIX)
+
+
+def content_digest(name):
+    """Return the digest a stored file is addressed by, or None"""
+    match = CONTENT_ADDRESSED_PATH.match(name or '')
+
+    return match.group('digest') if match else None
+
+
+def file_digest(file):
+    """Return the SHA-256 of a file, reusing one computed while uploading"""
+    digest = getattr(file, 'sha256', None)
+    if digest:
+        return digest
+
+    hasher = hashlib.sha256()
+    file.seek(0)
+    for chunk in file.chunks():
+        hasher.update(chunk)
+    file.seek(0)
+
+    return hasher.hexdigest()
+
+
+def acquire_blob(file, storage=default_storage):
+    """Store file once under its digest and take a reference to it
+
+    Returns the storage name. Content already stored is not written
+    again. The blob row is locked so a concurrent release cannot collect
+    it in between.
+    """
+    digest = file_digest(file)
+    ext = os.path.splitext(file.name)[1].lstrip('.').lower() or 'bin'
+    with transaction.atomic():
+        blob, _ = ImageBlob.objects.select_for_update().get_or_create(
+            digest=digest,
+            defaults={'name': blob_path(digest, ext), 'size': file.size}
+        )
+        if not storage.exists(blob.name):
+            storage.save(blob.name, file)
+        ImageBlob.objects.filter(pk=blob.pk).update(
+            ref_count=F('ref_count') + 1
+        )
+
+    return blob.name
+
+
+def attach_blob(instance, field, file, storage=default_storage):
+    """Point a file field of instance at the blob of file and save it
+
+    One transaction, so a failed save does not keep the reference. When
+    the instance already holds the same content its reference is kept
+    and the new one dropped.
+    """
+    with transaction.atomic():
+        name = acquire_blob(file, storage)
+        if getattr(instance, field).name == name:
+            release_blob(name, storage)
+        getattr(instance, field).name = name
+        instance.save()
+
+
+def release_blob(name, storage=default_storage):
+    """Drop a reference to a blob, deleting it with the last reference"""
+    if not is_blob(name):
+        return
+
+    with transaction.atomic():
+        ImageBlob.objects.filter(name=name, ref_count__gt=0).update(
+            ref_count=F('ref_count') - 1
+        )
+        released = ImageBlob.objects.select_for_update().filter(
+            name=name,
+            ref_count=0
+        )
+        if not released.exists():
+            return
+        released.delete()
+        transaction.on_commit(lambda: _delete_blob_files(storage, name))
+
+
+def _delete_blob_files(storage, name):
+    """Delete a blob and every variant rendered from it
+
+    Variants are addressed by the blob as well, those rendered under
+    earlier variant settings included.
+    """
+    from core.images import variant_dir
+
+    paths = [name]
+    directory = variant_dir(name)
+    if storage.exists(directory):
+        paths += [
+            os.path.join(directory, file)
+            for file in storage.listdir(directory)[1]
+        ]
+    for path in paths:
+        if storage.exists(path):
+            storage.delete(path)
@@ -0,0 +1,166 @@
+import base64
+import contextvars
+import functools
+import json
+import random
+import weakref
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
+from rest_framework_simplejwt.settings import api_settings
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_routing = contextvars.ContextVar('replica_routing', default=None)
+# Connections whose ensure_connection pings after check_connection_health
+_health_checked = weakref.WeakSet()
+
+
+def check_connection_health(**kwargs):
+    """Have reused connections pinged before their first use
+
+    Django only closes persistent connections once they are too old or
+    a query failed on them, so a connection the server or a failover
+    dropped in between fails the next request. Where CONN_HEALTH_CHECKS
+    is set, the ones left open are pinged when the request first uses
+    them and reopened if they no longer answer. Requests that never
+    touch a database do not ping it.
+    """
+    for connection in connections.all():
+        if connection.connection is None or connection.in_atomic_block:
+            continue
+        if not connection.settings_dict.get('CONN_HEALTH_CHECKS'):
+            continue
+        if connection not in _health_checked:
+            _health_checked.add(connection)
+            connection.ensure_connection = _check_first_use(
+                connection,
+                connection.ensure_connection
+            )
+        connection.health_check_pending = True
+
+
+def _check_first_use(connection, ensure_connection):
+    """Wrap ensure_connection to close a pending connection that is dead"""
+    @functools.wraps(ensure_connection)
+    def checked():
+        if connection.health_check_pending:
+            connection.health_check_pending = False
+            if connection.connection is not None and \
+                    not connection.in_atomic_block and \
+                    not connection.is_usable():
+                connection.close()
+        ensure_connection()
+
+    return checked
+
+
+def ping(connection):
+    """Run a trivial query, raising the driver's error when it fails"""
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+        cursor.fetchone()
+
+
+def unapplied_migrations(connection):
+    """Return the migrations not yet applied to the database"""
+    executor = MigrationExecutor(connection)
+
+    return [
+        migration for migration, _ in
+        executor.migration_plan(executor.loader.graph.leaf_nodes())
+    ]
+
+
+def sticky_key(user_id):
+    return f'replica-sticky:{user_id}'
+
+
+def token_user_id(request):
+    """Return the user id claim of the request's Bearer token, unverified
+
+    Only used to pick the database for reads, a forged token can do no
+    more than send its own reads to the primary.
+    """
+    header = request.META.get('HTTP_AUTHORIZATION', '').split()
+    if len(header) != 2 or header[0] not in api_settings.AUTH_HEADER_TYPES:
+        return None
+    try:
+        payload = header[1].split('.')[1]
+        claims = json.loads(
+            base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4))
+        )
+        return claims.get(api_settings.USER_ID_CLAIM)
+    except (IndexError, ValueError, AttributeError):
+        return None
+
+
+class ReplicaRouting:
+    """Where the reads of one request go
+
+    To the replica picked for the request, unless the request writes or
+    its client wrote within REPLICA_STICKY_SECONDS. Whether it did is
+    looked up on the first read.
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self.replica = random.choice(settings.DATABASE_REPLICAS)
+        self.primary = True if request.method not in SAFE_METHODS else None
+
+    def use_primary(self):
+        if self.primary is None:
+            self.primary = self.wrote_recently()
+
+        return self.primary
+
+    def wrote_recently(self):
+        if settings.REPLICA_STICKY_COOKIE in self.request.COOKIES:
+            return True
+        user_id = token_user_id(self.request)
+        if user_id is None:
+            return False
+        try:
+            return cache.get(sticky_key(user_id)) is not None
+        except Exception:
+            # The primary is never behind
+            return True
+
+
+@contextmanager
+def routing(request):
+    """Route the reads made while handling request"""
+    token = _routing.set(ReplicaRouting(request))
+    try:
+        yield _routing.get()
+    finally:
+        _routing.reset(token)
+
+
+class ReplicaRouter:
+    """Send the reads of safe requests to DATABASE_REPLICAS
+
+    Reads outside a request, from commands and the shell, stay on the
+    primary along with all writes.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _routing.get()
+        if state is None or state.use_primary():
+            return DEFAULT_DB_ALIAS
+
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Replicas get their schema through replication
+        return db not in settings.DATABASE_REPLICAS
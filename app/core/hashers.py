@@ -0,0 +1,201 @@
+import base64
+import hashlib
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.utils.crypto import constant_time_compare
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_hashing_pool():
+    """Return the executor passwords are hashed in, None to hash inline
+
+    PASSWORD_HASHING_POOL is 'thread' or 'process', sized by
+    PASSWORD_HASHING_WORKERS. However many requests log in at once, no
+    more than that many hashes are computed at a time per process.
+    """
+    kind = settings.PASSWORD_HASHING_POOL
+    if not kind:
+        return None
+
+    key = (kind, settings.PASSWORD_HASHING_WORKERS)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            executor = ProcessPoolExecutor if kind == 'process' \
+                else ThreadPoolExecutor
+            pool = _pools[key] = executor(max_workers=key[1])
+
+    return pool
+
+
+def run_hashing(func, *args, **kwargs):
+    """Call func in the hashing pool and wait for its result"""
+    pool = get_hashing_pool()
+    if pool is None:
+        return func(*args, **kwargs)
+
+    return pool.submit(func, *args, **kwargs).result()
+
+
+def _argon2_verify(hash, password):
+    import argon2
+
+    try:
+        return argon2.PasswordHasher().verify(hash, password)
+    except argon2.exceptions.VerificationError:
+        return False
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """PBKDF2-SHA256 with PASSWORD_PBKDF2_ITERATIONS rounds"""
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_PBKDF2_ITERATIONS
+
+    def encode(self, password, salt, iterations=None):
+        assert password is not None
+        assert salt and '$' not in salt
+        iterations = iterations or self.iterations
+        hash = run_hashing(
+            hashlib.pbkdf2_hmac,
+            self.digest().name,
+            password.encode(),
+            salt.encode(),
+            iterations
+        )
+        hash = base64.b64encode(hash).decode('ascii').strip()
+
+        return '%s$%d$%s$%s' % (self.algorithm, iterations, salt, hash)
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    """Argon2 with the costs in PASSWORD_ARGON2, needs argon2-cffi"""
+
+    @property
+    def time_cost(self):
+        return settings.PASSWORD_ARGON2['time_cost']
+
+    @property
+    def memory_cost(self):
+        return settings.PASSWORD_ARGON2['memory_cost']
+
+    @property
+    def parallelism(self):
+        return settings.PASSWORD_ARGON2['parallelism']
+
+    def encode(self, password, salt):
+        argon2 = self._load_library()
+        params = self.params()
+        data = run_hashing(
+            argon2.low_level.hash_secret,
+            password.encode(),
+            salt.encode(),
+            time_cost=params.time_cost,
+            memory_cost=params.memory_cost,
+            parallelism=params.parallelism,
+            hash_len=params.hash_len,
+            type=params.type
+        )
+
+        return self.algorithm + data.decode('ascii')
+
+    def verify(self, password, encoded):
+        self._load_library()
+        algorithm, rest = encoded.split('$', 1)
+        assert algorithm == self.algorithm
+
+        return run_hashing(_argon2_verify, '$' + rest, password)
+
+
+class ScryptPasswordHasher(hashers.BasePasswordHasher):
+    """scrypt from hashlib with the costs in PASSWORD_SCRYPT"""
+    algorithm = 'scrypt'
+
+    @property
+    def work_factor(self):
+        return settings.PASSWORD_SCRYPT['work_factor']
+
+    @property
+    def block_size(self):
+        return settings.PASSWORD_SCRYPT['block_size']
+
+    @property
+    def parallelism(self):
+        return settings.PASSWORD_SCRYPT['parallelism']
+
+    def encode(self, password, salt, n=None, r=None, p=None):
+        assert password is not None
+        assert salt and '$' not in salt
+        n = n or self.work_factor
+        r = r or self.block_size
+        p = p or self.parallelism
+        hash = run_hashing(
+            hashlib.scrypt,
+            password.encode(),
+            salt=salt.encode(),
+            n=n,
+            r=r,
+            p=p,
+            # Twice the memory scrypt needs, OpenSSL caps it at 32MB
+            maxmem=256 * n * r * p,
+            dklen=64
+        )
+        hash = base64.b64encode(hash).decode('ascii').strip()
+
+        return '%s$%d$%s$%d$%d$%s' % (self.algorithm, n, salt, r, p, hash)
+
+    def decode(self, encoded):
+        algorithm, n, salt, r, p, hash = encoded.split('$', 5)
+        assert algorithm == self.algorithm
+
+        return {
+            'algorithm': algorithm,
+            'work_factor': int(n),
+            'salt': salt,
+            'block_size': int(r),
+            'parallelism': int(p),
+            'hash': hash,
+        }
+
+    def verify(self, password, encoded):
+        decoded = self.decode(encoded)
+        encoded_2 = self.encode(
+            password,
+            decoded['salt'],
+            decoded['work_factor'],
+            decoded['block_size'],
+            decoded['parallelism']
+        )
+
+        return constant_time_compare(encoded, encoded_2)
+
+    def safe_summary(self, encoded):
+        decoded = self.decode(encoded)
+
+        return {
+            'algorithm': decoded['algorithm'],
+            'work factor': decoded['work_factor'],
+            'block size': decoded['block_size'],
+            'parallelism': decoded['parallelism'],
+            'salt': hashers.mask_hash(decoded['salt']),
+            'hash': hashers.mask_hash(decoded['hash']),
+        }
+
+    def must_update(self, encoded):
+        decoded = self.decode(encoded)
+
+        return (
+            decoded['work_factor'] != self.work_factor or
+            decoded['block_size'] != self.block_size or
+            decoded['parallelism'] != self.parallelism
+        )
+
+    def harden_runtime(self, password, encoded):
+        # The work factor is the same for every hash of a deployment
+        pass
@@ -0,0 +1,235 @@
+import datetime
+import io
+import os
+import traceback
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from core.blobs import is_blob
+from core.models import Recipe, RecipeImageVariant, ImageJob
+
+
+VARIANT_QUALITY = 85
+
+
+def variant_dir(source):
+    """Return the storage directory of the variants rendered from source"""
+    stem = os.path.splitext(os.path.basename(source))[0]
+
+    return os.path.join('uploads/recipe/variants/', stem)
+
+
+def variant_path(source, name):
+    """Return the storage path of a variant rendered from source
+
+    The name carries the size and quality it is rendered with, changed
+    settings render to a new path instead of replacing the bytes of one
+    that clients cache as immutable.
+    """
+    size = settings.RECIPE_IMAGE_VARIANTS[name]
+
+    return os.path.join(
+        variant_dir(source),
+        f'{name}-{size}-q{VARIANT_QUALITY}.jpg'
+    )
+
+
+def enqueue_image_processing(recipe):
+    """Mark the recipe image as pending and queue it for the workers"""
+    recipe.image_status = Recipe.IMAGE_PENDING
+    recipe.save(update_fields=['image_status', 'updated_at'])
+
+    return ImageJob.objects.create(recipe=recipe, source=recipe.image.name)
+
+
+def to_rgb(image):
+    """Flatten an image onto white and return it in RGB mode"""
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.split()[-1])
+
+        return background
+
+    return image.convert('RGB')
+
+
+def open_image(source, box, storage=default_storage):
+    """Decode source for output within box, with orientation applied"""
+    with storage.open(source, 'rb') as fh:
+        image = Image.open(fh)
+        # Let JPEG decode straight to a reduced scale when it can
+        image.draft('RGB', box)
+        image.load()
+    exif_transpose = getattr(ImageOps, 'exif_transpose', None)
+    if exif_transpose is not None:
+        image = exif_transpose(image)
+
+    return image
+
+
+def render_variants(source, storage=default_storage):
+    """Decode source once and store a re-encoded copy per variant size
+
+    Re-encoding drops EXIF and other metadata, the orientation is applied
+    to the pixels first. Returns a list of (name, path, width, height).
+    """
+    sizes = sorted(
+        settings.RECIPE_IMAGE_VARIANTS.items(),
+        key=lambda item: item[1],
+        reverse=True
+    )
+    image = to_rgb(open_image(source, (sizes[0][1], sizes[0][1]), storage))
+
+    variants = []
+    for name, size in sizes:
+        # Each size is resized from the previous, larger one
+        image.thumbnail((size, size), Image.LANCZOS)
+        buffer = io.BytesIO()
+        image.save(buffer, 'JPEG', quality=VARIANT_QUALITY, optimize=True,
+                   progressive=True)
+        path = variant_path(source, name)
+        if storage.exists(path):
+            storage.delete(path)
+        path = storage.save(path, ContentFile(buffer.getvalue()))
+        variants.append((name, path) + image.size)
+
+    return variants
+
+
+def stored_variants(source, storage=default_storage):
+    """Return the variants already rendered from a content addressed source
+
+    Blobs are shared, so another recipe with the same image may have
+    rendered them before. Only the headers are read for the dimensions.
+    Returns None unless every variant is present.
+    """
+    if not is_blob(source):
+        return None
+
+    variants = []
+    for name in settings.RECIPE_IMAGE_VARIANTS:
+        path = variant_path(source, name)
+        if not storage.exists(path):
+            return None
+        with storage.open(path, 'rb') as fh:
+            variants.append((name, path) + Image.open(fh).size)
+
+    return variants
+
+
+def claim_jobs(limit, stale_after=None):
+    """Claim up to limit pending jobs for this worker
+
+    The status update only succeeds for one worker per job, so several
+    workers can poll the same queue. Running jobs older than stale_after
+    seconds are assumed abandoned and claimed again.
+    """
+    claimable = Q(status=ImageJob.PENDING)
+    if stale_after is not None:
+        claimable |= Q(
+            status=ImageJob.RUNNING,
+            started_at__lt=timezone.now() - datetime.timedelta(
+                seconds=stale_after
+            )
+        )
+    candidates = ImageJob.objects.filter(claimable).order_by(
+        'created_at'
+    ).values_list('pk', 'status', 'started_at')[:limit]
+
+    claimed = []
+    for pk, status, started_at in candidates:
+        updated = ImageJob.objects.filter(
+            pk=pk,
+            status=status,
+            started_at=started_at
+        ).update(
+            status=ImageJob.RUNNING,
+            started_at=timezone.now(),
+            attempts=F('attempts') + 1
+        )
+        if updated:
+            claimed.append(pk)
+
+    return claimed
+
+
+def process_job(job_id):
+    """Render the variants of a claimed job and publish them
+
+    Errors, the lookups and the publish included, are recorded on the
+    job instead of raised, one broken job does not end a worker's run.
+    """
+    job = recipe = None
+    try:
+        job = ImageJob.objects.select_related('recipe').get(pk=job_id)
+        recipe = job.recipe
+        if recipe.image.name != job.source:
+            # A newer upload replaced this image and has its own job
+            ImageJob.objects.filter(pk=job.pk).update(status=ImageJob.DONE)
+            return
+
+        recipe.image_status = Recipe.IMAGE_PROCESSING
+        recipe.save(update_fields=['image_status', 'updated_at'])
+        variants = stored_variants(job.source) or \
+            render_variants(job.source)
+
+        with transaction.atomic():
+            # The recipe may have been deleted or given a new image while
+            # rendering, the lock holds it until the variants are in
+            recipe = Recipe.objects.select_for_update().filter(
+                pk=recipe.pk
+            ).first()
+            if recipe is None or recipe.image.name != job.source:
+                ImageJob.objects.filter(pk=job.pk).update(
+                    status=ImageJob.DONE
+                )
+                return
+            replaced = set(
+                recipe.image_variants.values_list('image', flat=True)
+            )
+            recipe.image_variants.all().delete()
+            RecipeImageVariant.objects.bulk_create([
+                RecipeImageVariant(
+                    recipe=recipe,
+                    name=name,
+                    image=path,
+                    width=width,
+                    height=height
+                )
+                for name, path, width, height in variants
+            ])
+            recipe.image_status = Recipe.IMAGE_READY
+            recipe.save(update_fields=['image_status', 'updated_at'])
+            ImageJob.objects.filter(pk=job.pk).update(
+                status=ImageJob.DONE,
+                error=''
+            )
+    except ImageJob.DoesNotExist:
+        # Deleted along with its recipe
+        return
+    except Exception:
+        failed = job is None or \
+            job.attempts >= settings.RECIPE_IMAGE_MAX_ATTEMPTS
+        ImageJob.objects.filter(pk=job_id).update(
+            status=ImageJob.FAILED if failed else ImageJob.PENDING,
+            error=traceback.format_exc()
+        )
+        if recipe is not None:
+            recipe.image_status = Recipe.IMAGE_FAILED if failed \
+                else Recipe.IMAGE_PENDING
+            recipe.save(update_fields=['image_status', 'updated_at'])
+        return
+
+    # Variants of a shared blob may still be used by other recipes
+    replaced.difference_update(RecipeImageVariant.objects.filter(
+        image__in=replaced
+    ).values_list('image', flat=True))
+    for path in replaced:
+        default_storage.delete(path)
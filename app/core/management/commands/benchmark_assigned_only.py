@@ -0,0 +1,65 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db.models import Exists, OuterRef
+
+from core.benchmark import measure, rolled_back, summarize
+from core.models import Tag, Recipe
+
+
+class Command(BaseCommand):
+    """Compare the join + DISTINCT and EXISTS forms of assigned_only"""
+
+    help = 'Benchmark the assigned_only tag filter on seeded data, ' \
+           'the data is rolled back afterwards'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--tags', type=int, default=50)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            user = self.seed(options['recipes'], options['tags'])
+            user_tags = Tag.objects.filter(user=user)
+            forms = (
+                ('join + distinct', user_tags.filter(
+                    recipe__isnull=False
+                ).order_by('-name', 'id').distinct()),
+                ('exists', user_tags.filter(Exists(
+                    Recipe.tags.through.objects.filter(tag_id=OuterRef('pk'))
+                )).order_by('-name', 'id')),
+            )
+            for label, queryset in forms:
+                samples = measure(
+                    lambda: list(queryset.all()),
+                    options['repeat']
+                )
+                self.stdout.write(f'{label:<16} {summarize(samples)}')
+
+    def seed(self, recipe_count, tag_count):
+        """Create a user whose every recipe carries every tag"""
+        self.stdout.write(
+            f'Seeding {recipe_count} recipes x {tag_count} tags...'
+        )
+        user = get_user_model().objects.create_user(
+            'benchmark@benchmark.local'
+        )
+        tags = Tag.objects.bulk_create([
+            Tag(user=user, name=f'Tag {i}') for i in range(tag_count)
+        ])
+        Recipe.objects.bulk_create([
+            Recipe(user=user, title=f'Recipe {i}', time_minutes=1, price=1)
+            for i in range(recipe_count)
+        ], batch_size=1000)
+        recipe_ids = Recipe.objects.filter(
+            user=user
+        ).values_list('id', flat=True)
+        tag_ids = [tag.pk for tag in tags] if tags and tags[0].pk else \
+            list(Tag.objects.filter(user=user).values_list('id', flat=True))
+        Recipe.tags.through.objects.bulk_create((
+            Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+            for recipe_id in recipe_ids.iterator()
+            for tag_id in tag_ids
+        ), batch_size=5000)
+
+        return user
@@ -0,0 +1,74 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.settings import api_settings
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.benchmark import measure, rolled_back, summarize
+from user.authentication import add_user_claims, revocations, \
+                                token_results
+
+
+class Command(BaseCommand):
+    """Compare authentication pipelines on the common request shapes"""
+
+    help = 'Benchmark authenticating anonymous, invalid and valid token ' \
+           'requests with each authentication pipeline'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pipeline',
+            action='append',
+            help='Comma separated authentication classes, may be repeated. '
+                 'Defaults to the configured pipeline and plain '
+                 'JWTAuthentication'
+        )
+        parser.add_argument('--repeat', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        pipelines = options['pipeline'] or [
+            ','.join(
+                f'{cls.__module__}.{cls.__name__}'
+                for cls in api_settings.DEFAULT_AUTHENTICATION_CLASSES
+            ),
+            'rest_framework_simplejwt.authentication.JWTAuthentication',
+        ]
+        with rolled_back():
+            user = get_user_model().objects.create_user(
+                'benchmark@benchmark.local'
+            )
+            token = str(add_user_claims(
+                RefreshToken.for_user(user),
+                user
+            ).access_token)
+            headers = (
+                ('anonymous', {}),
+                ('invalid token', {'HTTP_AUTHORIZATION': 'Bearer invalid'}),
+                ('valid token', {'HTTP_AUTHORIZATION': f'Bearer {token}'}),
+            )
+            for pipeline in pipelines:
+                authenticators = [
+                    import_string(path)() for path in pipeline.split(',')
+                ]
+                revocations.clear()
+                token_results.clear()
+                self.stdout.write(pipeline)
+                for label, header in headers:
+                    request = APIRequestFactory().get('/', **header)
+                    samples = measure(
+                        lambda: self.authenticate(authenticators, request),
+                        options['repeat']
+                    )
+                    self.stdout.write(f'  {label:<14} {summarize(samples)}')
+
+    def authenticate(self, authenticators, request):
+        """Run the pipeline the way rest_framework.request.Request does"""
+        for authenticator in authenticators:
+            try:
+                result = authenticator.authenticate(request)
+            except AuthenticationFailed:
+                return None
+            if result is not None:
+                return result
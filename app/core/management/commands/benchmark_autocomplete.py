@@ -0,0 +1,97 @@
+import random
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+
+from core.benchmark import measure, rolled_back, summarize
+from core.models import Tag
+from recipe.autocomplete import autocomplete
+from recipe.cache import invalidate_user
+
+SYLLABLES = (
+    'ba', 'ko', 'ri', 'lem', 'on', 'chi', 'cken', 'to', 'ma', 'pa', 'sta',
+    'ber', 'ry', 'gar', 'lic', 'pep', 'per', 'sal', 'mon', 'cur', 'tha',
+    'i', 'spi', 'cy', 've', 'gan', 'swe', 'et', 'sour',
+)
+
+
+class Command(BaseCommand):
+    """Time tag autocomplete over a large seeded set of names"""
+
+    help = 'Benchmark tag autocomplete on seeded names, the data is ' \
+           'rolled back afterwards'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--names', type=int, default=100000)
+        parser.add_argument('--limit', type=int, default=10)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument(
+            '--text',
+            action='append',
+            help='Input to complete, repeatable'
+        )
+        parser.add_argument(
+            '--explain',
+            action='store_true',
+            help='Print EXPLAIN ANALYZE of each query on PostgreSQL'
+        )
+
+    def handle(self, *args, **options):
+        texts = options['text'] or ['lem', 'chicken', 'garlc', 'spicy curry']
+        with rolled_back():
+            user = self.seed(options['names'])
+            tags = Tag.objects.filter(user=user)
+            connection = connections[tags.db]
+            for text in texts:
+                samples = measure(
+                    lambda: autocomplete(tags, user.pk, text,
+                                         options['limit']),
+                    options['repeat']
+                )
+                self.stdout.write(f'{text!r:<16} {summarize(samples)}')
+                if options['explain'] and connection.vendor == 'postgresql':
+                    self.explain(connection, tags, user, text,
+                                 options['limit'])
+
+    def seed(self, count):
+        """Create a user with count distinct names made of syllables"""
+        self.stdout.write(f'Seeding {count} names...')
+        user = get_user_model().objects.create_user(
+            'benchmark@benchmark.local'
+        )
+        generator = random.Random(0)
+        names = set()
+        while len(names) < count:
+            names.add(' '.join(
+                ''.join(
+                    generator.choice(SYLLABLES)
+                    for _ in range(generator.randint(2, 4))
+                )
+                for _ in range(generator.randint(1, 3))
+            ))
+        Tag.objects.bulk_create(
+            [Tag(user=user, name=name) for name in sorted(names)],
+            batch_size=5000
+        )
+        connection = connections[Tag.objects.db]
+        if connection.vendor == 'postgresql':
+            # Autovacuum would not analyze the rolled back rows in time
+            with connection.cursor() as cursor:
+                cursor.execute(f'ANALYZE {Tag._meta.db_table}')
+        # bulk_create sends no signals, start from a fresh index
+        invalidate_user(user.pk)
+
+        return user
+
+    def explain(self, connection, tags, user, text, limit):
+        """Print the plan and timings of the query autocomplete runs"""
+        with CaptureQueriesContext(connection) as queries:
+            autocomplete(tags, user.pk, text, limit)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'EXPLAIN (ANALYZE, BUFFERS) ' + queries[-1]['sql']
+            )
+            for line, in cursor.fetchall():
+                self.stdout.write(f'    {line}')
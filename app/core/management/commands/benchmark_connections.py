@@ -0,0 +1,73 @@
+from django.contrib.auth import get_user_model
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.benchmark import measure, summarize
+
+
+class Command(BaseCommand):
+    """Compare per request and persistent database connections
+
+    Requests go through the WSGI handler, so connections are opened and
+    closed by the request signals just as under gunicorn. Run it against
+    the real database, a SQLite connection costs next to nothing.
+    """
+
+    help = 'Benchmark GET /api/user/me/ for each CONN_MAX_AGE'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-age',
+            action='append',
+            type=int,
+            help='CONN_MAX_AGE to measure, may be repeated. Defaults to 0 '
+                 'and the configured value'
+        )
+        parser.add_argument('--repeat', type=int, default=500)
+
+    def handle(self, *args, **options):
+        connection = connections[DEFAULT_DB_ALIAS]
+        configured = connection.settings_dict['CONN_MAX_AGE']
+        max_ages = options['max_age'] or sorted({0, configured})
+
+        user = get_user_model().objects.create_user(
+            'benchmark-connections@benchmark.local'
+        )
+        try:
+            environ = RequestFactory().get(
+                reverse('user:me'),
+                HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}'
+            ).environ
+            handler = WSGIHandler()
+            for max_age in max_ages:
+                connection.close()
+                connection.settings_dict['CONN_MAX_AGE'] = max_age
+                with override_settings(ALLOWED_HOSTS=['testserver']):
+                    self.get(handler, environ)
+                    samples = measure(
+                        lambda: self.get(handler, environ),
+                        options['repeat']
+                    )
+                self.stdout.write(
+                    f'CONN_MAX_AGE {max_age:<6} {summarize(samples)}'
+                )
+        finally:
+            connection.close()
+            connection.settings_dict['CONN_MAX_AGE'] = configured
+            user.delete()
+
+    def get(self, handler, environ):
+        """Serve one request, closing it fires request_finished"""
+        statuses = []
+        response = handler(
+            environ,
+            lambda status, headers: statuses.append(status)
+        )
+        response.close()
+        if not statuses[0].startswith('200'):
+            raise CommandError(f'GET /api/user/me/ answered {statuses[0]}')
@@ -0,0 +1,130 @@
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmark import summarize
+
+
+class Command(BaseCommand):
+    """Load a running server with many concurrent keep-alive connections
+
+    Start the servers to compare against the same database first, e.g.
+
+        gunicorn app.wsgi --workers 4 --bind :8000
+        uvicorn app.asgi:application --workers 4 --port 8001
+
+    then pass each as --target wsgi=http://127.0.0.1:8000/api/... The
+    process needs a file descriptor per connection, raise ulimit -n.
+    """
+
+    help = 'Measure throughput and latency of GET requests against ' \
+           'running servers at a given number of concurrent connections'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--target',
+            action='append',
+            required=True,
+            help='label=url to load, may be repeated'
+        )
+        parser.add_argument('--connections', type=int, default=1000)
+        parser.add_argument('--duration', type=float, default=10.0)
+        parser.add_argument('--token', help='JWT sent as a Bearer token')
+
+    def handle(self, *args, **options):
+        for target in options['target']:
+            label, _, url = target.rpartition('=')
+            if not url.startswith('http://'):
+                raise CommandError(f'Not an http:// URL: {url}')
+            samples, errors, elapsed = asyncio.run(self.load(
+                url,
+                options['connections'],
+                options['duration'],
+                options['token']
+            ))
+            self.stdout.write(
+                f'{label or url:<8} {len(samples) / elapsed:8.1f} req/s  '
+                f'errors {errors}  {summarize(sorted(samples))}'
+            )
+
+    async def load(self, url, connections, duration, token):
+        """Run the connections for duration seconds
+
+        Returns the latencies in ms, the number of failed requests and the
+        elapsed time.
+        """
+        parts = urlsplit(url)
+        headers = [f'Host: {parts.netloc}']
+        if token:
+            headers.append(f'Authorization: Bearer {token}')
+        request = (
+            f'GET {parts.path or "/"}'
+            f'{"?" + parts.query if parts.query else ""} HTTP/1.1\r\n' +
+            ''.join(f'{header}\r\n' for header in headers) + '\r\n'
+        ).encode()
+
+        samples = []
+        errors = [0]
+        start = time.perf_counter()
+        deadline = start + duration
+        await asyncio.gather(*(
+            self.client(parts.hostname, parts.port or 80, request, deadline,
+                        samples, errors)
+            for _ in range(connections)
+        ))
+
+        return samples, errors[0], time.perf_counter() - start
+
+    async def client(self, host, port, request, deadline, samples, errors):
+        """Send requests on one connection, reconnecting when closed"""
+        writer = None
+        while time.perf_counter() < deadline:
+            sent = time.perf_counter()
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.open_connection(host, port)
+                writer.write(request)
+                await writer.drain()
+                status, keep_alive = await self.read_response(reader)
+            except (OSError, asyncio.IncompleteReadError, ValueError):
+                errors[0] += 1
+                status, keep_alive = None, False
+            else:
+                if status == 200:
+                    samples.append((time.perf_counter() - sent) * 1000)
+                else:
+                    errors[0] += 1
+            if not keep_alive and writer is not None:
+                writer.close()
+                writer = None
+        if writer is not None:
+            writer.close()
+
+    async def read_response(self, reader):
+        """Read one response, return its status and whether to reuse"""
+        status_line = await reader.readuntil(b'\r\n')
+        version, status = status_line.split()[:2]
+        headers = {}
+        while True:
+            line = await reader.readuntil(b'\r\n')
+            if line == b'\r\n':
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip().lower()
+
+        if headers.get('transfer-encoding') == 'chunked':
+            while True:
+                size = int((await reader.readuntil(b'\r\n')).split(b';')[0],
+                           16)
+                await reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        else:
+            await reader.readexactly(int(headers.get('content-length', 0)))
+
+        keep_alive = headers.get('connection') != 'close' and \
+            version == b'HTTP/1.1'
+
+        return int(status), keep_alive
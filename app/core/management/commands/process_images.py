@@ -0,0 +1,66 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from core.images import claim_jobs, process_job
+
+
+def run_job(job_id):
+    """Process one job on a pool thread with its own connection"""
+    try:
+        process_job(job_id)
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    """Django command to process queued recipe images"""
+
+    help = 'Render the variants of uploaded recipe images'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help='Number of images processed in parallel'
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=1.0,
+            help='Seconds to wait when the queue is empty'
+        )
+        parser.add_argument(
+            '--stale-after', type=int, default=600,
+            help='Seconds after which a running job is claimed again'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Exit once the queue is empty'
+        )
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        self.stdout.write(f'Processing images with {workers} workers...')
+        processed = 0
+        # Pillow releases the GIL while decoding, resizing and encoding
+        pool = ThreadPoolExecutor(max_workers=workers) if workers > 1 \
+            else None
+        try:
+            while True:
+                job_ids = claim_jobs(workers, options['stale_after'])
+                if not job_ids:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+                if pool is None:
+                    for job_id in job_ids:
+                        process_job(job_id)
+                else:
+                    list(pool.map(run_job, job_ids))
+                processed += len(job_ids)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        self.stdout.write(self.style.SUCCESS(f'Processed {processed} jobs'))
@@ -0,0 +1,77 @@
+import os
+import runpy
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from core.db import unapplied_migrations
+
+CONFIG_PATH = os.path.join(settings.BASE_DIR, 'gunicorn.conf.py')
+PROCESS_LOCAL_CACHES = {'django.core.cache.backends.locmem.LocMemCache'}
+
+
+class Command(BaseCommand):
+    """Run the production server with gunicorn.conf.py"""
+
+    help = 'Refuse to start with unapplied migrations or with a process ' \
+           'local cache shared by several workers, then replace this ' \
+           'process with a preforking gunicorn server'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--asgi',
+            action='store_true',
+            help='Serve app.asgi with uvicorn workers'
+        )
+        parser.add_argument(
+            '--database',
+            default=DEFAULT_DB_ALIAS,
+            help='Database to check for unapplied migrations'
+        )
+
+    def handle(self, *args, **options):
+        self.check_migrations_applied(options['database'])
+        if options['asgi']:
+            os.environ['GUNICORN_ASGI'] = '1'
+        self.check_cache_shared(runpy.run_path(CONFIG_PATH)['workers'])
+
+        argv = ['gunicorn', '--config', CONFIG_PATH]
+        if options['asgi']:
+            argv.append('app.asgi:application')
+        else:
+            argv.append('app.wsgi:application')
+        # The server opens its own connections after forking
+        connections.close_all()
+        self.stdout.write(' '.join(argv))
+        self.stdout.flush()
+        os.execvp(argv[0], argv)
+
+    def check_migrations_applied(self, database):
+        unapplied = unapplied_migrations(connections[database])
+        if unapplied:
+            raise CommandError(
+                'Unapplied migrations: ' +
+                ', '.join(str(migration) for migration in unapplied) +
+                '. Run manage.py migrate first.'
+            )
+
+    def check_cache_shared(self, workers):
+        """Refuse a per process cache when there is more than one worker
+
+        Throttles, concurrency caps, token revocations and the recipe
+        cache generations would each be counted per worker.
+        """
+        if workers <= 1:
+            return
+        local = sorted(
+            alias for alias, config in settings.CACHES.items()
+            if config['BACKEND'] in PROCESS_LOCAL_CACHES
+        )
+        if local:
+            raise CommandError(
+                f'Cache {", ".join(local)} is local to each of the '
+                f'{workers} workers. Point CACHE_BACKEND/CACHE_LOCATION '
+                f'at a shared cache such as memcached, or set '
+                f'GUNICORN_WORKERS=1.'
+            )
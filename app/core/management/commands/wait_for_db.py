@@ -1,24 +1,85 @@
+import random
 import time
 
-from django.db import connections
+from django.db import DEFAULT_DB_ALIAS, connections
 from django.db.utils import OperationalError
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+
+from core.db import ping, unapplied_migrations
 
 
 class Command(BaseCommand):
-    """ Django command to pause execution until db is available"""
+    """ Django command to pause execution until db is available
+
+    Getting a connection object does not connect, so each attempt runs a
+    query. Attempts back off exponentially with full jitter, containers
+    started together then do not all retry in step.
+    """
+
+    help = 'Wait until the database answers queries, and optionally ' \
+           'until its migrations are applied'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database',
+            default=DEFAULT_DB_ALIAS,
+            help='Database to wait for'
+        )
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            default=60.0,
+            help='Seconds to wait in total before failing'
+        )
+        parser.add_argument(
+            '--max-delay',
+            type=float,
+            default=5.0,
+            help='Longest pause between attempts in seconds'
+        )
+        parser.add_argument(
+            '--wait-for-migrations',
+            action='store_true',
+            help='Also wait until no migration is left to apply'
+        )
 
     def handle(self, *args, **options):
         self.stdout.write('Waiting for Database...')
-        db_conn = None
-        while not db_conn:
-            try:
-                db_conn = connections['default']
-            except(OperationalError):
-                self.stdout.write(
-                    self.style.WARNING(
-                        'Database unavailable, waiting 1 second'
-                    )
+        deadline = time.monotonic() + options['timeout']
+        attempt = 0
+        while True:
+            problem = self.check(options['database'],
+                                 options['wait_for_migrations'])
+            if problem is None:
+                break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise CommandError(
+                    f'{problem} after {options["timeout"]:g} seconds'
                 )
-                time.sleep(1)
+            backoff = min(options['max_delay'], 0.1 * 2 ** attempt)
+            delay = min(remaining, random.uniform(0, backoff))
+            attempt += 1
+            self.stdout.write(
+                self.style.WARNING(
+                    f'{problem}, waiting {delay:.2f} seconds'
+                )
+            )
+            time.sleep(delay)
         self.stdout.write(self.style.SUCCESS('Database Connected'))
+
+    def check(self, database, wait_for_migrations):
+        """Return what the database is not ready for, None when ready"""
+        connection = None
+        try:
+            connection = connections[database]
+            ping(connection)
+            if wait_for_migrations and unapplied_migrations(connection):
+                return 'Migrations not applied'
+        except OperationalError:
+            # A broken connection is not reopened on its own
+            if connection is not None:
+                connection.close()
+            return 'Database unavailable'
+
+        return None
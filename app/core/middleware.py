@@ -0,0 +1,67 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.decorators import sync_and_async_middleware
+
+from core.db import SAFE_METHODS, routing, sticky_key, token_user_id
+
+
+def stick_to_primary(request, response):
+    """Keep the client of a successful write on the primary for a while
+
+    With a cookie and, for authenticated users, in the cache so API
+    clients that drop cookies read their writes back as well.
+    """
+    if request.method in SAFE_METHODS or response.status_code >= 400:
+        return
+
+    seconds = settings.REPLICA_STICKY_SECONDS
+    response.set_cookie(
+        settings.REPLICA_STICKY_COOKIE,
+        '1',
+        max_age=seconds,
+        httponly=True,
+        samesite='Lax'
+    )
+    user_id = token_user_id(request)
+    if user_id is None:
+        user = getattr(request, 'user', None)
+        if user is None or not user.is_authenticated:
+            return
+        user_id = user.pk
+    try:
+        cache.set(sticky_key(user_id), True, seconds)
+    except Exception:
+        # The cookie still covers clients that keep it
+        pass
+
+
+@sync_and_async_middleware
+def replica_routing_middleware(get_response):
+    """Route reads to replicas and keep writers on the primary
+
+    Async capable, a sync middleware would run every ASGI request on the
+    one thread sensitive thread. Unused without DATABASE_REPLICAS.
+    """
+    if not settings.DATABASE_REPLICAS:
+        raise MiddlewareNotUsed
+
+    if asyncio.iscoroutinefunction(get_response):
+        async def middleware(request):
+            with routing(request):
+                response = await get_response(request)
+            await sync_to_async(stick_to_primary)(request, response)
+
+            return response
+    else:
+        def middleware(request):
+            with routing(request):
+                response = get_response(request)
+            stick_to_primary(request, response)
+
+            return response
+
+    return middleware
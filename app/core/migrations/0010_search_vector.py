@@ -0,0 +1,99 @@
+# Generated by Django 3.2.25 on 2026-10-16 23:07
+
+import re
+
+import core.models
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+# Frozen copy of core.search as of this migration, later changes to the
+# search document must come with a migration of their own
+SEARCH_CONFIG = 'simple'
+TITLE_WEIGHT = 'A'
+NAME_WEIGHT = 'B'
+TERM = re.compile(r'\w+')
+
+
+def search_terms(text):
+    return TERM.findall(text.lower())
+
+
+def search_document(title, names):
+    return ' '.join(
+        [f'{term}:{TITLE_WEIGHT}' for term in search_terms(title)] +
+        [f'{term}:{NAME_WEIGHT}'
+         for name in names for term in search_terms(name)]
+    )
+
+
+def names(recipes, field):
+    from django.contrib.postgres.aggregates import StringAgg
+
+    related = recipes.model._meta.get_field(field).related_model
+
+    return Subquery(
+        related.objects.using(recipes.db).filter(recipe=OuterRef('pk'))
+        .values('recipe')
+        .annotate(names=StringAgg('name', ' '))
+        .values('names')
+    )
+
+
+def build_search_vectors(apps, schema_editor):
+    Recipe = apps.get_model('core', 'Recipe')
+    recipes = Recipe.objects.using(schema_editor.connection.alias).all()
+    if schema_editor.connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import SearchVector
+
+        recipes.update(search_vector=SearchVector(
+            'title', weight=TITLE_WEIGHT, config=SEARCH_CONFIG
+        ) + SearchVector(
+            names(recipes, 'ingredients'),
+            names(recipes, 'tags'),
+            weight=NAME_WEIGHT,
+            config=SEARCH_CONFIG
+        ))
+        return
+
+    recipes = list(recipes.only('id', 'title').prefetch_related(
+        'ingredients', 'tags'
+    ))
+    for recipe in recipes:
+        recipe.search_vector = search_document(recipe.title, [
+            related.name
+            for related in (*recipe.ingredients.all(), *recipe.tags.all())
+        ])
+    Recipe.objects.using(schema_editor.connection.alias).bulk_update(
+        recipes, ['search_vector'], batch_size=1000
+    )
+
+
+def create_search_index(apps, schema_editor):
+    # GIN is PostgreSQL only, the fallback scans its documents
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX core_recipe_search_idx ON core_recipe '
+            'USING gin (search_vector)'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS core_recipe_search_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_imageblob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=core.models.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(build_search_vectors, migrations.RunPython.noop),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.25 on 2026-10-16 23:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipeimagevariant',
+            name='image',
+            field=models.ImageField(height_field='height', max_length=255, upload_to='', width_field='width'),
+        ),
+    ]
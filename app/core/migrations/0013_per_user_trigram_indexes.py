@@ -0,0 +1,47 @@
+# Generated by Django 3.2.25 on 2026-10-16 23:58
+
+from django.db import migrations
+
+TABLES = ('core_tag', 'core_ingredient')
+
+
+def create_user_trigram_indexes(apps, schema_editor):
+    # btree_gist lets user_id share the GiST index with the trigrams, so
+    # autocomplete walks one user's names nearest first. Trusted from
+    # PostgreSQL 13 on like pg_trgm
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    for table in TABLES:
+        schema_editor.execute(
+            f'CREATE INDEX {table}_user_name_trgm_idx ON {table} '
+            f'USING gist (user_id, name gist_trgm_ops)'
+        )
+        schema_editor.execute(f'DROP INDEX IF EXISTS {table}_name_trgm_idx')
+
+
+def drop_user_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table in TABLES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {table}_name_trgm_idx ON {table} '
+            f'USING gin (name gin_trgm_ops)'
+        )
+        schema_editor.execute(
+            f'DROP INDEX IF EXISTS {table}_user_name_trgm_idx'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_variant_image_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            create_user_trigram_indexes,
+            drop_user_trigram_indexes
+        ),
+    ]
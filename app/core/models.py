@@ -14,6 +14,16 @@ def recipe_image_file_path(instance, filename):
     return os.path.join('uploads/recipe/', filename)
 
 
+class SearchVectorField(models.TextField):
+    """A tsvector on PostgreSQL, core.search's term document elsewhere"""
+
+    def db_type(self, connection):
+        if connection.vendor == 'postgresql':
+            return 'tsvector'
+
+        return super().db_type(connection)
+
+
 class UserManager(BaseUserManager):
     """ Override Base User Manager for the custom user """
 
@@ -59,6 +69,15 @@ class Tag(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', '-name', 'id'],
+                name='core_tag_user_name_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -71,6 +90,15 @@ class Ingredient(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', '-name', 'id'],
+                name='core_ingredient_user_name_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -78,6 +106,17 @@ class Ingredient(models.Model):
 
 class Recipe(models.Model):
     """Recipe Object"""
+    IMAGE_PENDING = 'pending'
+    IMAGE_PROCESSING = 'processing'
+    IMAGE_READY = 'ready'
+    IMAGE_FAILED = 'failed'
+    IMAGE_STATUS_CHOICES = (
+        (IMAGE_PENDING, 'Pending'),
+        (IMAGE_PROCESSING, 'Processing'),
+        (IMAGE_READY, 'Ready'),
+        (IMAGE_FAILED, 'Failed'),
+    )
+
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
@@ -95,7 +134,102 @@ class Recipe(models.Model):
     tags = models.ManyToManyField('Tag')
 
     image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    image_status = models.CharField(
+        max_length=20,
+        choices=IMAGE_STATUS_CHOICES,
+        blank=True
+    )
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Title and linked ingredient and tag names, kept up to date by
+    # core.signals. GIN indexed on PostgreSQL by migration 0010
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', '-id'],
+                name='core_recipe_user_id_idx'
+            ),
+        ]
 
     def __str__(self):
 
         return self.title
+
+
+class ImageBlob(models.Model):
+    """Image content stored once under its digest"""
+    digest = models.CharField(max_length=64, unique=True)
+    name = models.CharField(max_length=255, unique=True)
+    size = models.PositiveIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return self.name
+
+
+class RecipeImageVariant(models.Model):
+    """Resized copy of a recipe image"""
+    recipe = models.ForeignKey(
+        'Recipe',
+        on_delete=models.CASCADE,
+        related_name='image_variants'
+    )
+    name = models.CharField(max_length=20)
+    image = models.ImageField(
+        max_length=255,
+        width_field='width',
+        height_field='height'
+    )
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'name'],
+                name='core_recipe_image_variant_unique'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe_id} {self.name}'
+
+
+class ImageJob(models.Model):
+    """Queued processing of an uploaded recipe image"""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    )
+
+    recipe = models.ForeignKey('Recipe', on_delete=models.CASCADE)
+    source = models.CharField(max_length=255)
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default=PENDING
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['status', 'created_at'],
+                name='core_imagejob_queue_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.source} ({self.status})'
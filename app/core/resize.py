@@ -0,0 +1,226 @@
+import contextlib
+import fcntl
+import hashlib
+import io
+import os
+import tempfile
+import threading
+
+import PIL
+from django.conf import settings
+from django.core.files.storage import default_storage
+from PIL import Image
+
+from core.images import open_image, to_rgb
+
+# Pillow before 7.0 raises a plain OSError for images it cannot decode
+UnidentifiedImageError = getattr(PIL, 'UnidentifiedImageError', OSError)
+
+
+class DiskLRUCache:
+    """Files under root, least recently used evicted first past max_bytes
+
+    A hit bumps the modification time, so the order survives restarts and
+    is shared by every process using the directory. Each process keeps an
+    estimate of the total size and rescans the directory once it goes
+    past max_bytes, evicting down to LOW_WATER of the cap.
+    """
+    LOW_WATER = 0.9
+
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.size = None
+        self.lock = threading.Lock()
+
+    def path(self, key):
+        return os.path.join(self.root, key)
+
+    def lock_path(self, path):
+        """Return the lock file of an entry, hidden like temporary files"""
+        directory, filename = os.path.split(path)
+
+        return os.path.join(directory, f'.{filename}.lock')
+
+    @contextlib.contextmanager
+    def locked(self, key):
+        """Hold an exclusive lock on key, shared by every process"""
+        path = self.lock_path(self.path(key))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'a') as fh:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def get(self, key):
+        """Return the path of a cached file, or None"""
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+
+        return path
+
+    def put(self, key, data):
+        """Store data under key and return its path"""
+        path = self.path(key)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        # Readers only ever see complete files
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.')
+        with os.fdopen(fd, 'wb') as fh:
+            fh.write(data)
+        os.replace(temp_path, path)
+
+        with self.lock:
+            if self.size is None:
+                self.size = sum(size for _, size, _ in self.entries())
+            else:
+                self.size += len(data)
+            if self.size > self.max_bytes:
+                self.evict(keep=path)
+
+        return path
+
+    def entries(self):
+        """Yield (mtime, size, path) of every cached file"""
+        for directory, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if filename.startswith('.'):
+                    continue
+                path = os.path.join(directory, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield stat.st_mtime, stat.st_size, path
+
+    def evict(self, keep=None):
+        """Remove the oldest files until the cache is below LOW_WATER"""
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * self.LOW_WATER
+        for _, size, path in entries:
+            if total <= target:
+                break
+            if path == keep:
+                continue
+            # A render still holding the lock file only loses coalescing
+            for evicted in (path, self.lock_path(path)):
+                try:
+                    os.remove(evicted)
+                except FileNotFoundError:
+                    pass
+            total -= size
+        self.size = total
+
+
+class SingleFlight:
+    """Run a function once per key for all callers arriving meanwhile"""
+
+    class Call:
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+
+    def do(self, key, func):
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = self.Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+        except Exception as exc:
+            call.error = exc
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+
+        return call.result
+
+
+_caches = {}
+_resizes = SingleFlight()
+
+
+def get_resize_cache():
+    """Return the cache of resized recipe images for the current settings"""
+    root = settings.RECIPE_IMAGE_RESIZE_ROOT
+    max_bytes = settings.RECIPE_IMAGE_RESIZE_MAX_BYTES
+    cache = _caches.get((root, max_bytes))
+    if cache is None:
+        cache = _caches[(root, max_bytes)] = DiskLRUCache(root, max_bytes)
+
+    return cache
+
+
+def image_format(ext):
+    """Return the Pillow format for an allowed extension, or None"""
+    name = settings.RECIPE_IMAGE_RESIZE_FORMATS.get(ext)
+    Image.init()
+
+    return name if name in Image.SAVE else None
+
+
+def resize_key(source, width, height, ext):
+    """Return the cache key, which changes whenever the image does"""
+    digest = hashlib.sha256(source.encode()).hexdigest()
+
+    return os.path.join(digest[:2], digest, f'{width}x{height}.{ext}')
+
+
+def render_resized(source, width, height, name, storage=default_storage):
+    """Return source fitted within width x height, encoded as name"""
+    image = open_image(source, (width, height), storage)
+    if name == 'JPEG':
+        image = to_rgb(image)
+    elif image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA')
+    image.thumbnail((width, height), Image.LANCZOS)
+    buffer = io.BytesIO()
+    image.save(buffer, name, quality=85, optimize=True)
+
+    return buffer.getvalue()
+
+
+def get_resized(source, width, height, ext):
+    """Return the path of the resized image, rendering it on a miss
+
+    Concurrent misses for the same key wait for a single render, threads
+    of this process on the call in flight and other processes on a lock
+    file next to the cache entry.
+    """
+    cache = get_resize_cache()
+    key = resize_key(source, width, height, ext)
+    path = cache.get(key)
+    if path is not None:
+        return path
+
+    def render():
+        with cache.locked(key):
+            return cache.get(key) or cache.put(key, render_resized(
+                source,
+                width,
+                height,
+                image_format(ext)
+            ))
+
+    return _resizes.do(key, render)
@@ -0,0 +1,144 @@
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, Case, F, FloatField, Func, \
+                             OuterRef, Subquery, Value, When
+from django.db.models.functions import Cast
+
+# No stemming or stop words, prefix matching covers word endings and
+# the fallback matches the same way
+SEARCH_CONFIG = 'simple'
+TITLE_WEIGHT = 'A'
+NAME_WEIGHT = 'B'
+# ts_rank's default weights for A and B
+FALLBACK_WEIGHTS = {TITLE_WEIGHT: 1.0, NAME_WEIGHT: 0.4}
+
+TERM = re.compile(r'\w+')
+
+
+def search_terms(text):
+    """Return the lower cased words of text"""
+    return TERM.findall(text.lower())
+
+
+def is_postgresql(queryset):
+    return connections[queryset.db].vendor == 'postgresql'
+
+
+def _names(recipes, field):
+    """Return a subquery of the names linked to the outer recipe"""
+    from django.contrib.postgres.aggregates import StringAgg
+
+    related = recipes.model._meta.get_field(field).related_model
+
+    return Subquery(
+        related.objects.filter(recipe=OuterRef('pk'))
+        .values('recipe')
+        .annotate(names=StringAgg('name', ' '))
+        .values('names')
+    )
+
+
+def search_document(title, names):
+    """Return the fallback document of a recipe, weighted terms"""
+    return ' '.join(
+        [f'{term}:{TITLE_WEIGHT}' for term in search_terms(title)] +
+        [f'{term}:{NAME_WEIGHT}'
+         for name in names for term in search_terms(name)]
+    )
+
+
+def update_search_vectors(recipes):
+    """Rebuild the search vectors of a queryset of recipes
+
+    Takes the recipe model from the queryset, so migrations can pass
+    their historical one.
+    """
+    if is_postgresql(recipes):
+        from django.contrib.postgres.search import SearchVector
+
+        recipes.update(search_vector=SearchVector(
+            'title', weight=TITLE_WEIGHT, config=SEARCH_CONFIG
+        ) + SearchVector(
+            _names(recipes, 'ingredients'),
+            _names(recipes, 'tags'),
+            weight=NAME_WEIGHT,
+            config=SEARCH_CONFIG
+        ))
+        return
+
+    model = recipes.model
+    recipes = list(recipes.only('id', 'title').prefetch_related(
+        'ingredients', 'tags'
+    ))
+    for recipe in recipes:
+        recipe.search_vector = search_document(recipe.title, [
+            related.name
+            for related in (*recipe.ingredients.all(), *recipe.tags.all())
+        ])
+    model.objects.bulk_update(recipes, ['search_vector'], batch_size=1000)
+
+
+def fallback_rank(document, terms):
+    """Rank a fallback document, None unless every term prefixes a word
+
+    A term scores the weight of its best matching word, like a prefix
+    tsquery where every term must match.
+    """
+    words = [word.rpartition(':') for word in (document or '').split()]
+    rank = 0.0
+    for term in terms:
+        weights = [
+            FALLBACK_WEIGHTS[weight]
+            for word, _, weight in words if word.startswith(term)
+        ]
+        if not weights:
+            return None
+        rank += max(weights)
+
+    return rank
+
+
+def search(recipes, text):
+    """Filter recipes to those matching text, annotated with their rank
+
+    Every word of text has to prefix a word of the title or of a linked
+    ingredient or tag name. The rank is a double so cursor pagination
+    can compare it exactly.
+    """
+    terms = search_terms(text)
+    if not terms:
+        return recipes.none()
+
+    if is_postgresql(recipes):
+        from django.contrib.postgres.search import SearchQuery, SearchRank
+
+        query = SearchQuery(
+            ' & '.join(f"'{term}':*" for term in terms),
+            search_type='raw',
+            config=SEARCH_CONFIG
+        )
+        matches = Func(
+            F('search_vector'), query,
+            arg_joiner=' @@ ',
+            template='%(expressions)s',
+            output_field=BooleanField()
+        )
+        return recipes.filter(matches).annotate(rank=Cast(
+            SearchRank(F('search_vector'), query),
+            FloatField()
+        ))
+
+    # Scan the stored documents, fine for the sizes SQLite is used with
+    ranks = {}
+    for pk, document in recipes.values_list('pk', 'search_vector'):
+        rank = fallback_rank(document, terms)
+        if rank is not None:
+            ranks[pk] = rank
+    if not ranks:
+        return recipes.none()
+
+    return recipes.filter(pk__in=ranks).annotate(rank=Case(
+        *[When(pk=pk, then=Value(rank)) for pk, rank in ranks.items()],
+        output_field=FloatField()
+    ))
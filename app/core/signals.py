@@ -0,0 +1,102 @@
+from django.db.models.signals import m2m_changed, post_delete, post_init, \
+                                     post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.blobs import release_blob
+from core.models import Tag, Ingredient, Recipe
+from core.search import update_search_vectors
+
+
+def touch_recipes(queryset):
+    """Mark recipes as modified without running their save signals"""
+    queryset.update(updated_at=timezone.now())
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def touch_relinked_recipes(sender, instance, action, reverse, pk_set,
+                           **kwargs):
+    """Update recipe timestamps when their tags or ingredients change"""
+    if not reverse:
+        if action.startswith('post_'):
+            touch_recipes(Recipe.objects.filter(pk=instance.pk))
+            update_search_vectors(Recipe.objects.filter(pk=instance.pk))
+        return
+
+    # Changed from the tag or ingredient side, pk_set holds recipe ids
+    # except when clearing, then the links have to be read beforehand
+    if action == 'pre_clear':
+        instance._cleared_recipe_ids = list(sender.objects.filter(**{
+            f'{instance._meta.model_name}_id': instance.pk
+        }).values_list('recipe_id', flat=True))
+    elif action == 'post_clear':
+        pk_set = instance.__dict__.pop('_cleared_recipe_ids', ())
+    if action.startswith('post_') and pk_set:
+        touch_recipes(Recipe.objects.filter(pk__in=pk_set))
+        update_search_vectors(Recipe.objects.filter(pk__in=pk_set))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def touch_recipes_using(sender, instance, **kwargs):
+    """Update the timestamps of recipes showing a changed tag/ingredient"""
+    if kwargs.get('created'):
+        return
+    field = 'tags' if sender is Tag else 'ingredients'
+    recipes = Recipe.objects.filter(**{field: instance})
+    touch_recipes(recipes)
+    if kwargs['signal'] is post_save:
+        update_search_vectors(recipes)
+    else:
+        # The name leaves their search vectors once the links are gone
+        instance._search_recipe_ids = list(
+            recipes.values_list('pk', flat=True)
+        )
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def reindex_recipes_used(sender, instance, **kwargs):
+    """Drop a deleted tag/ingredient name from its recipes' search"""
+    pks = instance.__dict__.pop('_search_recipe_ids', ())
+    if pks:
+        update_search_vectors(Recipe.objects.filter(pk__in=pks))
+
+
+@receiver(post_save, sender=Recipe)
+def reindex_recipe(sender, instance, update_fields, **kwargs):
+    """Rebuild the search vector of a saved recipe"""
+    if update_fields is None or 'title' in update_fields:
+        update_search_vectors(Recipe.objects.filter(pk=instance.pk))
+
+
+def _image_name(instance):
+    """Return the stored image name without touching a deferred field"""
+    value = instance.__dict__.get('image')
+
+    return getattr(value, 'name', value)
+
+
+@receiver(post_init, sender=Recipe)
+def remember_image(sender, instance, **kwargs):
+    """Remember the loaded image so a replacement can be detected"""
+    instance._loaded_image = _image_name(instance)
+
+
+@receiver(post_save, sender=Recipe)
+def release_replaced_image(sender, instance, **kwargs):
+    """Release the blob of an image that was replaced or cleared"""
+    current = _image_name(instance)
+    previous = instance.__dict__.get('_loaded_image')
+    if previous and previous != current and 'image' in instance.__dict__:
+        release_blob(previous)
+    instance._loaded_image = current
+
+
+@receiver(post_delete, sender=Recipe)
+def release_deleted_image(sender, instance, **kwargs):
+    """Release the blob of a deleted recipe's image"""
+    release_blob(_image_name(instance))
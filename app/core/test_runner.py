@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+FAST_PASSWORD_HASHER = 'django.contrib.auth.hashers.MD5PasswordHasher'
+
+
+class TestRunner(DiscoverRunner):
+    """Discover runner with settings suited to the test suite
+
+    Passwords are hashed with a cheap hasher, the production costs would
+    dominate the run, and the user endpoints are not throttled as every
+    test request comes from one address. Tests of either override the
+    settings themselves.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.settings_override = override_settings(
+            PASSWORD_HASHERS=[FAST_PASSWORD_HASHER] +
+            settings.PASSWORD_HASHERS,
+            USER_THROTTLE_RATES={}
+        )
+        self.settings_override.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.settings_override.disable()
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,161 @@
+import shutil
+import tempfile
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+
+from core.blobs import attach_blob, is_blob
+from core.images import enqueue_image_processing, claim_jobs, process_job, \
+                        variant_path
+from core.models import Recipe, ImageBlob
+from core.tests.test_images import sample_jpeg
+
+
+def upload(recipe, content, name='photo.jpg'):
+    """Store content as the recipe image by digest"""
+    attach_blob(recipe, 'image', ContentFile(content, name=name))
+
+
+@override_settings(RECIPE_IMAGE_VARIANTS={'thumbnail': 50, 'medium': 200})
+class ImageBlobTests(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(
+            MEDIA_ROOT=self.media_root
+        )
+        self.settings_override.enable()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            'password1234'
+        )
+        self.recipes = [
+            Recipe.objects.create(
+                user=self.user,
+                title=title,
+                time_minutes=5,
+                price=3.00
+            )
+            for title in ('Pancakes', 'Waffles')
+        ]
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def test_same_content_is_stored_once(self):
+        """Test identical uploads share one blob and file"""
+        content = sample_jpeg()
+        for recipe in self.recipes:
+            upload(recipe, content)
+
+        names = {recipe.image.name for recipe in self.recipes}
+        self.assertEqual(len(names), 1)
+        name = names.pop()
+        self.assertTrue(is_blob(name))
+        blob = ImageBlob.objects.get()
+        self.assertEqual(blob.name, name)
+        self.assertEqual(blob.ref_count, 2)
+        self.assertEqual(blob.size, len(content))
+
+    def test_replacing_image_releases_blob(self):
+        """Test replacing an image drops the reference to the old blob"""
+        first = sample_jpeg()
+        upload(self.recipes[0], first)
+        upload(self.recipes[1], first)
+        name = self.recipes[0].image.name
+
+        upload(self.recipes[0], sample_jpeg(size=(300, 300)))
+
+        self.assertEqual(ImageBlob.objects.get(name=name).ref_count, 1)
+        self.assertTrue(default_storage.exists(name))
+
+    def test_same_content_again_keeps_one_reference(self):
+        """Test uploading the current image again takes no reference"""
+        content = sample_jpeg()
+        upload(self.recipes[0], content)
+        upload(self.recipes[0], content)
+        name = self.recipes[0].image.name
+
+        self.assertEqual(ImageBlob.objects.get(name=name).ref_count, 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipes[0].delete()
+        self.assertFalse(ImageBlob.objects.filter(name=name).exists())
+
+    def test_failed_save_takes_no_reference(self):
+        """Test the reference is rolled back with a failed save"""
+        with patch.object(Recipe, 'save', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                upload(self.recipes[0], sample_jpeg())
+
+        self.assertFalse(ImageBlob.objects.filter(ref_count__gt=0).exists())
+
+    def test_last_reference_deletes_blob(self):
+        """Test the blob and its variants go with the last reference"""
+        upload(self.recipes[0], sample_jpeg())
+        name = self.recipes[0].image.name
+        enqueue_image_processing(self.recipes[0])
+        for job_id in claim_jobs(10):
+            process_job(job_id)
+        self.assertTrue(default_storage.exists(variant_path(name, 'medium')))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipes[0].delete()
+
+        self.assertFalse(ImageBlob.objects.filter(name=name).exists())
+        self.assertFalse(default_storage.exists(name))
+        self.assertFalse(default_storage.exists(variant_path(name, 'medium')))
+
+    def test_changed_variant_settings_render_new_paths(self):
+        """Test new variant sizes never replace a cached variant's bytes"""
+        upload(self.recipes[0], sample_jpeg())
+        name = self.recipes[0].image.name
+        enqueue_image_processing(self.recipes[0])
+        for job_id in claim_jobs(10):
+            process_job(job_id)
+        old = variant_path(name, 'medium')
+
+        with override_settings(
+            RECIPE_IMAGE_VARIANTS={'thumbnail': 50, 'medium': 100}
+        ):
+            enqueue_image_processing(self.recipes[0])
+            for job_id in claim_jobs(10):
+                process_job(job_id)
+            new = variant_path(name, 'medium')
+            self.assertNotEqual(new, old)
+            self.assertEqual(
+                self.recipes[0].image_variants.get(name='medium').image.name,
+                new
+            )
+            self.assertTrue(default_storage.exists(new))
+
+            with self.captureOnCommitCallbacks(execute=True):
+                self.recipes[0].delete()
+
+        self.assertFalse(default_storage.exists(old))
+        self.assertFalse(default_storage.exists(new))
+
+    def test_shared_variants_are_reused(self):
+        """Test variants of a shared blob are rendered once and kept"""
+        content = sample_jpeg()
+        for recipe in self.recipes:
+            upload(recipe, content)
+            enqueue_image_processing(recipe)
+        for job_id in claim_jobs(10):
+            process_job(job_id)
+        paths = [
+            set(recipe.image_variants.values_list('image', flat=True))
+            for recipe in self.recipes
+        ]
+        self.assertEqual(paths[0], paths[1])
+
+        upload(self.recipes[0], sample_jpeg(size=(300, 300)))
+        enqueue_image_processing(self.recipes[0])
+        for job_id in claim_jobs(10):
+            process_job(job_id)
+
+        for path in paths[1]:
+            self.assertTrue(default_storage.exists(path))
@@ -1,8 +1,32 @@
-from unittest.mock import patch
+import os
+import runpy
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from unittest.mock import MagicMock, patch
 
+from django.conf import settings
+from django.contrib.auth import get_user_model
 from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.migrations import Migration
 from django.db.utils import OperationalError
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from core.models import Tag
+
+
+class OkHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'ok')
+
+    def log_message(self, *args):
+        pass
 
 
 class CommandTests(TestCase):
@@ -11,14 +35,187 @@ class CommandTests(TestCase):
         """Test waiting for db when db is available"""
 
         with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.return_value = True
+            gi.return_value = MagicMock()
             call_command('wait_for_db')
             self.assertEqual(gi.call_count, 1)
+            gi.return_value.cursor().__enter__().execute.assert_called_with(
+                'SELECT 1'
+            )
 
     @patch('time.sleep', return_value=True)
     def test_wait_for_db(self, ts):
         """ Test waiting for db """
         with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.side_effect = [OperationalError] * 5 + [True]
+            gi.side_effect = [OperationalError] * 5 + [MagicMock()]
             call_command('wait_for_db')
             self.assertEqual(gi.call_count, 6)
+
+        delays = [call[0][0] for call in ts.call_args_list]
+        for attempt, delay in enumerate(delays):
+            self.assertLessEqual(delay, 0.1 * 2 ** attempt)
+
+    def test_wait_for_db_queries(self):
+        """Test the database is actually queried"""
+        out = StringIO()
+        call_command('wait_for_db', stdout=out)
+
+        self.assertIn('Database Connected', out.getvalue())
+
+    @patch('time.sleep', return_value=True)
+    def test_wait_for_db_times_out(self, ts):
+        """Test giving up once the total timeout has passed"""
+        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi, \
+                patch('time.monotonic', side_effect=[0, 1, 2, 3]):
+            gi.side_effect = OperationalError
+            with self.assertRaisesMessage(CommandError, 'unavailable'):
+                call_command('wait_for_db', '--timeout', '2',
+                             stdout=StringIO())
+
+    @patch('time.sleep', return_value=True)
+    def test_wait_for_migrations(self, ts):
+        """Test waiting until another container applied the migrations"""
+        pending = [[Migration('0099_pending', 'core')]] * 2 + [[]]
+        with patch(
+            'core.management.commands.wait_for_db.unapplied_migrations',
+            side_effect=pending
+        ) as unapplied:
+            call_command('wait_for_db', '--wait-for-migrations',
+                         stdout=StringIO())
+
+        self.assertEqual(unapplied.call_count, 3)
+        self.assertEqual(ts.call_count, 2)
+
+    def test_benchmark_assigned_only(self):
+        """Test the assigned_only benchmark reports both query forms"""
+        out = StringIO()
+        call_command(
+            'benchmark_assigned_only',
+            recipes=5,
+            tags=3,
+            repeat=2,
+            stdout=out
+        )
+
+        self.assertIn('join + distinct', out.getvalue())
+        self.assertIn('exists', out.getvalue())
+        self.assertFalse(Tag.objects.exists())
+
+    def test_benchmark_autocomplete(self):
+        """Test the autocomplete benchmark times every input"""
+        out = StringIO()
+        call_command(
+            'benchmark_autocomplete',
+            names=50,
+            repeat=2,
+            text=['lem', 'garlc'],
+            stdout=out
+        )
+
+        self.assertIn("'lem'", out.getvalue())
+        self.assertIn("'garlc'", out.getvalue())
+        self.assertFalse(Tag.objects.exists())
+
+    def test_benchmark_authentication(self):
+        """Test the authentication benchmark reports every request shape"""
+        out = StringIO()
+        call_command('benchmark_authentication', repeat=2, stdout=out)
+
+        for label in ('anonymous', 'invalid token', 'valid token'):
+            self.assertIn(label, out.getvalue())
+        self.assertIn('CachedJWTAuthentication', out.getvalue())
+
+    def test_benchmark_load(self):
+        """Test the load benchmark reports throughput per target"""
+        server = ThreadingHTTPServer(('127.0.0.1', 0), OkHandler)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        out = StringIO()
+        try:
+            call_command(
+                'benchmark_load',
+                target=[f'local=http://127.0.0.1:{server.server_port}/'],
+                connections=3,
+                duration=0.2,
+                stdout=out
+            )
+        finally:
+            server.shutdown()
+            server.server_close()
+            thread.join()
+
+        self.assertIn('local', out.getvalue())
+        self.assertIn('req/s  errors 0', out.getvalue())
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': '/tmp/recipe-app-api-test-cache',
+    }})
+    # Closing would also drop the connection holding the test transaction
+    @patch('django.db.connections.close_all')
+    @patch('core.management.commands.serve.os.execvp')
+    def test_serve_execs_gunicorn(self, execvp, close_all):
+        """Test serve replaces itself with gunicorn and the config"""
+        call_command('serve', stdout=StringIO())
+
+        program, argv = execvp.call_args[0]
+        self.assertEqual(program, 'gunicorn')
+        self.assertIn(str(settings.BASE_DIR / 'gunicorn.conf.py'), argv)
+        self.assertEqual(argv[-1], 'app.wsgi:application')
+
+    @patch('core.management.commands.serve.os.execvp')
+    def test_serve_refuses_unapplied_migrations(self, execvp):
+        """Test serve fails fast while migrations are pending"""
+        plan = [(Migration('0099_pending', 'core'), False)]
+        with patch(
+            'django.db.migrations.executor.MigrationExecutor.migration_plan',
+            return_value=plan
+        ):
+            with self.assertRaisesMessage(CommandError, '0099_pending'):
+                call_command('serve', stdout=StringIO())
+
+        execvp.assert_not_called()
+
+    @patch('django.db.connections.close_all')
+    @patch('core.management.commands.serve.os.execvp')
+    def test_serve_refuses_local_cache_with_workers(self, execvp, close_all):
+        """Test serve fails when workers would each keep their own cache"""
+        with patch.dict(os.environ, {'GUNICORN_WORKERS': '3'}):
+            with self.assertRaisesMessage(CommandError, 'GUNICORN_WORKERS'):
+                call_command('serve', stdout=StringIO())
+
+        execvp.assert_not_called()
+
+        with patch.dict(os.environ, {'GUNICORN_WORKERS': '1'}):
+            call_command('serve', stdout=StringIO())
+
+        execvp.assert_called_once()
+
+    def test_gunicorn_config(self):
+        """Test the gunicorn config preloads and sizes workers by cores"""
+        path = str(settings.BASE_DIR / 'gunicorn.conf.py')
+        with patch.dict(os.environ, {'GUNICORN_ASGI': '1'}):
+            asgi = runpy.run_path(path)
+        wsgi = runpy.run_path(path)
+
+        self.assertTrue(wsgi['preload_app'])
+        self.assertGreater(wsgi['max_requests'], 0)
+        self.assertEqual(wsgi['workers'], wsgi['available_cpus']() * 2 + 1)
+        self.assertEqual(asgi['workers'], asgi['available_cpus']())
+        self.assertEqual(asgi['worker_class'], 'uvicorn.workers.UvicornWorker')
+        self.assertNotIn('worker_class', wsgi)
+
+
+class ConnectionBenchmarkTests(TransactionTestCase):
+    """Closes connections, which would end a TestCase transaction"""
+
+    def test_benchmark_connections(self):
+        """Test each CONN_MAX_AGE is measured and the user removed"""
+        out = StringIO()
+        call_command('benchmark_connections', '--max-age', '0',
+                     '--max-age', '60', '--repeat', '3', stdout=out)
+
+        lines = out.getvalue().splitlines()
+        self.assertTrue(lines[0].startswith('CONN_MAX_AGE 0 '))
+        self.assertTrue(lines[1].startswith('CONN_MAX_AGE 60 '))
+        self.assertIn('p99', lines[1])
+        self.assertFalse(get_user_model().objects.exists())
@@ -0,0 +1,226 @@
+import asyncio
+from unittest.mock import MagicMock, patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db.utils import OperationalError
+from django.test import RequestFactory, SimpleTestCase, TestCase, \
+                        override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.db import ReplicaRouter, check_connection_health, routing, \
+                    sticky_key
+from core.middleware import replica_routing_middleware
+from core.models import Recipe
+from user.authentication import add_user_claims
+
+RECIPES_URL = reverse('recipe:recipe-list')
+HEALTHZ_URL = reverse('healthz')
+
+
+def open_connection(usable=True, health_checks=True, in_atomic_block=False):
+    connection = MagicMock(in_atomic_block=in_atomic_block)
+    connection.settings_dict = {'CONN_HEALTH_CHECKS': health_checks}
+    connection.is_usable.return_value = usable
+
+    return connection
+
+
+class ConnectionHealthTests(SimpleTestCase):
+
+    def check(self, *connections):
+        with patch('core.db.connections') as handler:
+            handler.all.return_value = connections
+            check_connection_health()
+
+    def test_dropped_connection_closed_on_first_use(self):
+        """Test a connection that no longer answers is closed when used"""
+        dropped = open_connection(usable=False)
+        alive = open_connection()
+        ensure_dropped = dropped.ensure_connection
+
+        self.check(dropped, alive)
+        dropped.is_usable.assert_not_called()
+        for connection in (dropped, alive):
+            connection.ensure_connection()
+
+        dropped.close.assert_called_once()
+        ensure_dropped.assert_called_once()
+        alive.close.assert_not_called()
+
+    def test_pinged_once_per_request(self):
+        """Test only the first use of a reused connection pings it"""
+        connection = open_connection()
+
+        self.check(connection)
+        connection.ensure_connection()
+        connection.ensure_connection()
+        self.check(connection)
+        connection.ensure_connection()
+
+        self.assertEqual(connection.is_usable.call_count, 2)
+
+    def test_unused_connection_not_pinged(self):
+        """Test a request that makes no query does not ping"""
+        connection = open_connection()
+
+        self.check(connection)
+
+        connection.is_usable.assert_not_called()
+
+    def test_unchecked_connections_left_alone(self):
+        """Test closed, disabled and in transaction ones are not pinged"""
+        closed = open_connection()
+        closed.connection = None
+        disabled = open_connection(health_checks=False)
+        in_transaction = open_connection(in_atomic_block=True)
+
+        self.check(closed, disabled, in_transaction)
+        for connection in (closed, disabled, in_transaction):
+            connection.ensure_connection()
+
+        for connection in (closed, disabled, in_transaction):
+            connection.is_usable.assert_not_called()
+            connection.close.assert_not_called()
+
+
+def access_token(user):
+    return str(add_user_claims(RefreshToken.for_user(user), user).access_token)
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.router = ReplicaRouter()
+        self.user = get_user_model().objects.create_user('test@test.com')
+
+    def read_from(self, request):
+        with routing(request):
+            return self.router.db_for_read(Recipe)
+
+    def test_reads_outside_requests_on_primary(self):
+        """Test commands and the shell read from the primary"""
+        self.assertEqual(self.router.db_for_read(Recipe), 'default')
+
+    def test_safe_request_reads_from_replica(self):
+        """Test GET requests read from a replica, writes stay on primary"""
+        request = RequestFactory().get('/')
+
+        self.assertEqual(self.read_from(request), 'replica')
+        with routing(request):
+            self.assertEqual(self.router.db_for_write(Recipe), 'default')
+
+    def test_writing_request_reads_from_primary(self):
+        """Test a POST reads what it is about to change from the primary"""
+        self.assertEqual(self.read_from(RequestFactory().post('/')),
+                         'default')
+
+    def test_sticky_cookie_reads_from_primary(self):
+        """Test a client holding the cookie reads from the primary"""
+        request = RequestFactory().get('/')
+        request.COOKIES[settings.REPLICA_STICKY_COOKIE] = '1'
+
+        self.assertEqual(self.read_from(request), 'default')
+
+    def test_sticky_user_reads_from_primary(self):
+        """Test a user that wrote recently reads from the primary"""
+        other = get_user_model().objects.create_user('other@test.com')
+        cache.set(sticky_key(self.user.pk), True)
+
+        for user, alias in ((self.user, 'default'), (other, 'replica')):
+            request = RequestFactory().get(
+                '/',
+                HTTP_AUTHORIZATION=f'Bearer {access_token(user)}'
+            )
+            self.assertEqual(self.read_from(request), alias)
+
+    def test_replicas_not_migrated(self):
+        """Test migrations only run on the primary"""
+        self.assertTrue(self.router.allow_migrate('default', 'core'))
+        self.assertFalse(self.router.allow_migrate('replica', 'core'))
+
+
+class ReplicaMiddlewareTests(SimpleTestCase):
+
+    @override_settings(DATABASE_REPLICAS=['replica'])
+    def test_async_chain_stays_async(self):
+        """Test ASGI requests are not funnelled through a sync middleware"""
+        async def get_response(request):
+            pass
+
+        middleware = replica_routing_middleware(get_response)
+
+        self.assertTrue(asyncio.iscoroutinefunction(middleware))
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_unused_without_replicas(self):
+        """Test the middleware drops out when there is nothing to route"""
+        with self.assertRaises(MiddlewareNotUsed):
+            replica_routing_middleware(lambda request: None)
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaStickinessTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user('test@test.com')
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {access_token(self.user)}'
+        )
+
+    def test_created_recipe_listed_from_primary(self):
+        """Test a write marks its client and reads stick to the primary"""
+        res = self.client.post(RECIPES_URL, {
+            'title': 'Sticky toffee pudding',
+            'time_minutes': 60,
+            'price': 4.00
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertIn(settings.REPLICA_STICKY_COOKIE, res.cookies)
+        self.assertTrue(cache.get(sticky_key(self.user.pk)))
+
+        # Without the cookie the cache still keeps the reads on the
+        # primary, a read from the missing replica alias would fail
+        self.client.cookies.clear()
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'][0]['title'],
+                         'Sticky toffee pudding')
+
+    def test_failed_write_not_sticky(self):
+        """Test a rejected write does not pin the client to the primary"""
+        res = self.client.post(RECIPES_URL, {'title': ''})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertNotIn(settings.REPLICA_STICKY_COOKIE, res.cookies)
+        self.assertIsNone(cache.get(sticky_key(self.user.pk)))
+
+
+class HealthzTests(TestCase):
+
+    def test_healthy(self):
+        """Test the probe runs a single query and is never cached"""
+        with self.assertNumQueries(1):
+            res = self.client.get(HEALTHZ_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('no-cache', res['Cache-Control'])
+
+    def test_database_down(self):
+        """Test the probe fails while the database does not answer"""
+        with patch('core.views.ping', side_effect=OperationalError):
+            res = self.client.get(HEALTHZ_URL)
+
+        self.assertEqual(res.status_code,
+                         status.HTTP_503_SERVICE_UNAVAILABLE)
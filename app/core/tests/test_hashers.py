@@ -0,0 +1,110 @@
+import threading
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import check_password, identify_hasher, \
+                                        make_password
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import hashers
+
+USER_GETTOKEN_URL = reverse('user:token_obtain_pair')
+
+SCRYPT = ['core.hashers.ScryptPasswordHasher',
+          'core.hashers.PBKDF2PasswordHasher']
+PBKDF2 = ['core.hashers.PBKDF2PasswordHasher',
+          'core.hashers.ScryptPasswordHasher']
+CHEAP_SCRYPT = {'work_factor': 2 ** 4, 'block_size': 8, 'parallelism': 1}
+
+
+@override_settings(
+    PASSWORD_SCRYPT=CHEAP_SCRYPT,
+    PASSWORD_PBKDF2_ITERATIONS=10,
+    PASSWORD_HASHING_POOL=''
+)
+class PasswordHasherTests(TestCase):
+
+    def login(self, password='testpass123'):
+        return APIClient().post(USER_GETTOKEN_URL, {
+            'email': 'test@test.com',
+            'password': password
+        })
+
+    @override_settings(PASSWORD_HASHERS=SCRYPT)
+    def test_scrypt_round_trip(self):
+        """Test scrypt hashes verify and record their costs"""
+        encoded = make_password('testpass123')
+
+        self.assertTrue(encoded.startswith('scrypt$16$'))
+        self.assertTrue(check_password('testpass123', encoded))
+        self.assertFalse(check_password('wrong', encoded))
+
+    def test_rehash_on_login_when_profile_changes(self):
+        """Test a login replaces a hash made by a previous profile"""
+        with self.settings(PASSWORD_HASHERS=PBKDF2):
+            user = get_user_model().objects.create_user(
+                'test@test.com',
+                'testpass123'
+            )
+        self.assertEqual(identify_hasher(user.password).algorithm,
+                         'pbkdf2_sha256')
+
+        with self.settings(PASSWORD_HASHERS=SCRYPT):
+            res = self.login()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('scrypt$16$'))
+
+    @override_settings(PASSWORD_HASHERS=SCRYPT)
+    def test_rehash_on_login_when_costs_change(self):
+        """Test a login replaces a hash made with other parameters"""
+        user = get_user_model().objects.create_user(
+            'test@test.com',
+            'testpass123'
+        )
+
+        with self.settings(PASSWORD_SCRYPT=dict(CHEAP_SCRYPT,
+                                                work_factor=2 ** 5)):
+            self.login()
+
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('scrypt$32$'))
+
+    @override_settings(PASSWORD_HASHERS=SCRYPT)
+    def test_failed_login_keeps_hash(self):
+        """Test a wrong password does not rehash"""
+        user = get_user_model().objects.create_user(
+            'test@test.com',
+            'testpass123'
+        )
+        encoded = user.password
+
+        with self.settings(PASSWORD_SCRYPT=dict(CHEAP_SCRYPT,
+                                                work_factor=2 ** 5)):
+            res = self.login('wrong')
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        user.refresh_from_db()
+        self.assertEqual(user.password, encoded)
+
+    @override_settings(PASSWORD_HASHERS=SCRYPT, PASSWORD_HASHING_POOL='thread',
+                       PASSWORD_HASHING_WORKERS=1)
+    def test_hashing_runs_in_pool(self):
+        """Test hashes are computed on the pool threads"""
+        threads = []
+        scrypt = hashers.hashlib.scrypt
+
+        def record(*args, **kwargs):
+            threads.append(threading.current_thread())
+            return scrypt(*args, **kwargs)
+
+        with patch.object(hashers.hashlib, 'scrypt', record):
+            encoded = make_password('testpass123')
+
+        self.assertTrue(check_password('testpass123', encoded))
+        self.assertEqual(len(threads), 1)
+        self.assertIsNot(threads[0], threading.current_thread())
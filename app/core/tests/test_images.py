@@ -0,0 +1,214 @@
+import io
+import shutil
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+
+from PIL import Image
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from core.images import enqueue_image_processing, claim_jobs, \
+    process_job, render_variants
+from core.models import Recipe, ImageJob, RecipeImageVariant
+
+# Minimal big endian TIFF header with an empty IFD
+EXIF = b'Exif\x00\x00MM\x00*\x00\x00\x00\x08\x00\x00\x00\x00\x00\x00'
+
+
+def sample_jpeg(size=(800, 400), **save_kwargs):
+    """Return the bytes of a JPEG image"""
+    buffer = io.BytesIO()
+    Image.new('RGB', size, (200, 30, 30)).save(buffer, 'JPEG', **save_kwargs)
+
+    return buffer.getvalue()
+
+
+@override_settings(RECIPE_IMAGE_VARIANTS={'thumbnail': 50, 'medium': 200})
+class ImageProcessingTests(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(
+            MEDIA_ROOT=self.media_root
+        )
+        self.settings_override.enable()
+        user = get_user_model().objects.create_user(
+            'test@test.com',
+            'password1234'
+        )
+        self.recipe = Recipe.objects.create(
+            user=user,
+            title='Pancakes',
+            time_minutes=5,
+            price=3.00
+        )
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def upload(self, content):
+        """Store an image for the recipe and queue it"""
+        self.recipe.image.save('photo.jpg', ContentFile(content))
+
+        return enqueue_image_processing(self.recipe)
+
+    def test_enqueue_marks_image_pending(self):
+        """Test queueing an image marks the recipe as pending"""
+        job = self.upload(sample_jpeg())
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_PENDING)
+        self.assertEqual(job.source, self.recipe.image.name)
+        self.assertEqual(job.status, ImageJob.PENDING)
+
+    def test_process_job_renders_variants(self):
+        """Test processing renders every variant without metadata"""
+        self.upload(sample_jpeg(exif=EXIF))
+
+        for job_id in claim_jobs(10):
+            process_job(job_id)
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_READY)
+        variants = {
+            variant.name: variant
+            for variant in self.recipe.image_variants.all()
+        }
+        self.assertEqual(set(variants), {'thumbnail', 'medium'})
+        self.assertEqual(
+            (variants['medium'].width, variants['medium'].height),
+            (200, 100)
+        )
+        with default_storage.open(variants['thumbnail'].image.name) as fh:
+            thumbnail = Image.open(fh)
+            self.assertEqual(thumbnail.size, (50, 25))
+            self.assertNotIn('exif', thumbnail.info)
+
+    def test_job_claimed_once(self):
+        """Test a job can only be claimed by one worker"""
+        job = self.upload(sample_jpeg())
+
+        self.assertEqual(claim_jobs(10), [job.pk])
+        self.assertEqual(claim_jobs(10), [])
+
+    @override_settings(RECIPE_IMAGE_MAX_ATTEMPTS=2)
+    def test_invalid_image_fails_after_retries(self):
+        """Test an undecodable image is retried then marked failed"""
+        job = self.upload(b'not an image')
+
+        for _ in range(2):
+            for job_id in claim_jobs(10):
+                process_job(job_id)
+
+        job.refresh_from_db()
+        self.recipe.refresh_from_db()
+        self.assertEqual(job.status, ImageJob.FAILED)
+        self.assertEqual(job.attempts, 2)
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_FAILED)
+
+    def test_failed_lookup_marks_job_failed(self):
+        """Test an error loading the job is recorded, not raised"""
+        job = self.upload(sample_jpeg())
+        claim_jobs(10)
+
+        with patch.object(
+            ImageJob.objects,
+            'select_related',
+            side_effect=RuntimeError('lookup failed')
+        ):
+            process_job(job.pk)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImageJob.FAILED)
+        self.assertIn('lookup failed', job.error)
+
+    def test_deleted_recipe_job_ignored(self):
+        """Test a job removed with its recipe after claiming is skipped"""
+        job = self.upload(sample_jpeg())
+        claim_jobs(10)
+        self.recipe.delete()
+
+        process_job(job.pk)
+
+        self.assertFalse(ImageJob.objects.exists())
+
+    def test_replaced_image_job_skipped(self):
+        """Test a job for an image that was replaced renders nothing"""
+        old_job = self.upload(sample_jpeg())
+        self.upload(sample_jpeg())
+
+        claim_jobs(1)
+        process_job(old_job.pk)
+
+        old_job.refresh_from_db()
+        self.assertEqual(old_job.status, ImageJob.DONE)
+        self.assertFalse(self.recipe.image_variants.exists())
+
+    def test_image_replaced_while_rendering_not_published(self):
+        """Test variants are dropped if the image changed during the render"""
+        job = self.upload(sample_jpeg())
+        claim_jobs(10)
+
+        def render_and_replace(source):
+            Recipe.objects.filter(pk=self.recipe.pk).update(image='new.jpg')
+            return render_variants(source)
+
+        with patch('core.images.render_variants',
+                   side_effect=render_and_replace):
+            process_job(job.pk)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImageJob.DONE)
+        self.assertFalse(self.recipe.image_variants.exists())
+
+    def test_recipe_deleted_while_rendering_not_published(self):
+        """Test a recipe deleted during the render gets no variants"""
+        job = self.upload(sample_jpeg())
+        claim_jobs(10)
+
+        def render_and_delete(source):
+            Recipe.objects.filter(pk=self.recipe.pk).delete()
+            return render_variants(source)
+
+        with patch('core.images.render_variants',
+                   side_effect=render_and_delete):
+            process_job(job.pk)
+
+        self.assertFalse(RecipeImageVariant.objects.exists())
+        self.assertFalse(ImageJob.objects.exists())
+
+    def test_failed_publish_recorded(self):
+        """Test an error publishing the variants is recorded, not raised"""
+        job = self.upload(sample_jpeg())
+        claim_jobs(10)
+
+        with patch.object(
+            RecipeImageVariant.objects,
+            'bulk_create',
+            side_effect=RuntimeError('publish failed')
+        ):
+            process_job(job.pk)
+
+        job.refresh_from_db()
+        self.recipe.refresh_from_db()
+        self.assertEqual(job.status, ImageJob.PENDING)
+        self.assertIn('publish failed', job.error)
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_PENDING)
+        self.assertFalse(self.recipe.image_variants.exists())
+
+    def test_process_images_command(self):
+        """Test the worker command drains the queue"""
+        self.upload(sample_jpeg())
+        out = StringIO()
+
+        call_command('process_images', workers=1, once=True, stdout=out)
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_READY)
+        self.assertEqual(self.recipe.image_variants.count(), 2)
+        self.assertIn('Processed 1 jobs', out.getvalue())
@@ -0,0 +1,186 @@
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.blobs import acquire_blob
+from core.models import Recipe
+from core.views import parse_range
+
+CONTENT = bytes(range(256)) * 4
+
+
+def media_url(name):
+    return f'/media/{name}'
+
+
+def bearer(user):
+    return f'Bearer {RefreshToken.for_user(user).access_token}'
+
+
+def read(response):
+    return b''.join(response.streaming_content)
+
+
+class ParseRangeTests(TestCase):
+
+    def test_parse_range(self):
+        """Test single byte ranges are resolved against the file size"""
+        self.assertEqual(parse_range('bytes=0-99', 1000), (0, 99))
+        self.assertEqual(parse_range('bytes=900-', 1000), (900, 999))
+        self.assertEqual(parse_range('bytes=-100', 1000), (900, 999))
+        self.assertEqual(parse_range('bytes=990-2000', 1000), (990, 999))
+        self.assertIsNone(parse_range('bytes=0-1,5-9', 1000))
+        self.assertIsNone(parse_range(None, 1000))
+        with self.assertRaises(ValueError):
+            parse_range('bytes=1000-', 1000)
+
+
+class MediaServingTests(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(
+            MEDIA_ROOT=self.media_root
+        )
+        self.settings_override.enable()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            'password1234'
+        )
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title='Pancakes',
+            time_minutes=5,
+            price=3.00
+        )
+        self.recipe.image.name = acquire_blob(
+            ContentFile(CONTENT, name='photo.jpg')
+        )
+        self.recipe.save()
+        self.name = self.recipe.image.name
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def test_serve_content_addressed_file(self):
+        """Test blobs are served with a strong ETag and cached for good"""
+        res = self.client.get(media_url(self.name))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(read(res), CONTENT)
+        self.assertEqual(res['Content-Type'], 'image/jpeg')
+        self.assertEqual(res['Accept-Ranges'], 'bytes')
+        self.assertFalse(res['ETag'].startswith('W/'))
+        self.assertIn('immutable', res['Cache-Control'])
+        self.assertIn('public', res['Cache-Control'])
+
+    def test_serve_other_file_revalidates(self):
+        """Test files not addressed by content get a short lifetime"""
+        name = default_storage.save('other/notes.txt', ContentFile(b'x'))
+
+        res = self.client.get(media_url(name))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertNotIn('immutable', res['Cache-Control'])
+
+    def test_if_none_match_not_modified(self):
+        """Test a matching ETag is answered with 304"""
+        etag = self.client.get(media_url(self.name))['ETag']
+
+        res = self.client.get(media_url(self.name), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res['ETag'], etag)
+
+    def test_range_request(self):
+        """Test a byte range is served as partial content"""
+        res = self.client.get(media_url(self.name), HTTP_RANGE='bytes=10-19')
+
+        self.assertEqual(res.status_code, 206)
+        self.assertEqual(read(res), CONTENT[10:20])
+        self.assertEqual(res['Content-Length'], '10')
+        self.assertEqual(
+            res['Content-Range'],
+            f'bytes 10-19/{len(CONTENT)}'
+        )
+
+    def test_range_ignored_for_stale_if_range(self):
+        """Test a range is ignored when If-Range does not match"""
+        res = self.client.get(
+            media_url(self.name),
+            HTTP_RANGE='bytes=10-19',
+            HTTP_IF_RANGE='"stale"'
+        )
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(read(res), CONTENT)
+
+    def test_unsatisfiable_range(self):
+        """Test a range past the end is answered with 416"""
+        res = self.client.get(
+            media_url(self.name),
+            HTTP_RANGE=f'bytes={len(CONTENT)}-'
+        )
+
+        self.assertEqual(res.status_code, 416)
+        self.assertEqual(res['Content-Range'], f'bytes */{len(CONTENT)}')
+
+    def test_missing_and_outside_files(self):
+        """Test missing files and paths outside MEDIA_ROOT are not found"""
+        self.assertEqual(
+            self.client.get(media_url('missing.jpg')).status_code,
+            404
+        )
+        self.assertEqual(
+            self.client.get(media_url('../etc/passwd')).status_code,
+            404
+        )
+
+    @override_settings(MEDIA_SENDFILE_HEADER='X-Accel-Redirect')
+    def test_x_accel_redirect(self):
+        """Test the transfer is handed to nginx"""
+        res = self.client.get(media_url(self.name))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.content, b'')
+        self.assertEqual(
+            res['X-Accel-Redirect'],
+            f'/protected-media/{self.name}'
+        )
+        self.assertIn('immutable', res['Cache-Control'])
+
+    @override_settings(MEDIA_SENDFILE_HEADER='X-Sendfile')
+    def test_x_sendfile(self):
+        """Test the transfer is handed to the server by file path"""
+        res = self.client.get(media_url(self.name))
+
+        self.assertEqual(res['X-Sendfile'], default_storage.path(self.name))
+
+    @override_settings(MEDIA_REQUIRE_OWNER=True)
+    def test_owner_check(self):
+        """Test recipe images are only served to the recipe owner"""
+        other = get_user_model().objects.create_user(
+            'other@test.com',
+            'password1234'
+        )
+
+        anonymous = self.client.get(media_url(self.name))
+        stranger = self.client.get(
+            media_url(self.name),
+            HTTP_AUTHORIZATION=bearer(other)
+        )
+        owner = self.client.get(
+            media_url(self.name),
+            HTTP_AUTHORIZATION=bearer(self.user)
+        )
+
+        self.assertEqual(anonymous.status_code, 404)
+        self.assertEqual(stranger.status_code, 404)
+        self.assertEqual(owner.status_code, 200)
+        self.assertIn('private', owner['Cache-Control'])
@@ -0,0 +1,193 @@
+import io
+import os
+import shutil
+import tempfile
+import threading
+import time
+from unittest.mock import patch
+
+from PIL import Image
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+
+from core import resize
+from core.models import Recipe
+from core.resize import DiskLRUCache, SingleFlight
+from core.tests.test_images import sample_jpeg
+
+
+def resized_url(pk, width, height, ext='jpg'):
+    return f'/media/recipe/{pk}/{width}x{height}.{ext}'
+
+
+class DiskLRUCacheTests(TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_least_recently_used_evicted_past_cap(self):
+        """Test the oldest unused files go once the cap is exceeded"""
+        cache = DiskLRUCache(self.root, max_bytes=300)
+        for index, key in enumerate(('a/1', 'b/2', 'c/3')):
+            path = cache.put(key, b'x' * 100)
+            os.utime(path, (index, index))
+        # Reading the oldest makes it the most recently used
+        self.assertIsNotNone(cache.get('a/1'))
+
+        cache.put('d/4', b'x' * 100)
+
+        self.assertIsNone(cache.get('b/2'))
+        self.assertIsNotNone(cache.get('a/1'))
+        self.assertIsNotNone(cache.get('d/4'))
+        self.assertLessEqual(cache.size, 300)
+
+
+class SingleFlightTests(TestCase):
+
+    def test_concurrent_calls_coalesce(self):
+        """Test concurrent calls for one key run the function once"""
+        flight = SingleFlight()
+        calls = []
+        started = threading.Event()
+
+        def slow():
+            calls.append(1)
+            started.set()
+            time.sleep(0.2)
+            return 'done'
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(flight.do('key', slow))
+            )
+            for _ in range(5)
+        ]
+        threads[0].start()
+        started.wait()
+        for thread in threads[1:]:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['done'] * 5)
+
+
+@override_settings(
+    RECIPE_IMAGE_RESIZE_SIZES=(64, 128),
+    RECIPE_IMAGE_RESIZE_FORMATS={'jpg': 'JPEG', 'png': 'PNG'}
+)
+class ResizedImageTests(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.resize_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(
+            MEDIA_ROOT=self.media_root,
+            RECIPE_IMAGE_RESIZE_ROOT=self.resize_root
+        )
+        self.settings_override.enable()
+        user = get_user_model().objects.create_user(
+            'test@test.com',
+            'password1234'
+        )
+        self.recipe = Recipe.objects.create(
+            user=user,
+            title='Pancakes',
+            time_minutes=5,
+            price=3.00
+        )
+        self.recipe.image.save('photo.jpg', ContentFile(sample_jpeg()))
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+        shutil.rmtree(self.resize_root, ignore_errors=True)
+
+    def test_resize_within_box(self):
+        """Test the image is fitted within the requested size"""
+        res = self.client.get(resized_url(self.recipe.id, 128, 64, 'png'))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res['Content-Type'], 'image/png')
+        image = Image.open(io.BytesIO(b''.join(res.streaming_content)))
+        self.assertEqual(image.format, 'PNG')
+        self.assertEqual(image.size, (128, 64))
+
+    def test_resize_rendered_once(self):
+        """Test a second request is served from the disk cache"""
+        render = patch.object(
+            resize,
+            'render_resized',
+            wraps=resize.render_resized
+        )
+        with render as mocked:
+            first = self.client.get(resized_url(self.recipe.id, 64, 64))
+            second = self.client.get(resized_url(self.recipe.id, 64, 64))
+
+        self.assertEqual(mocked.call_count, 1)
+        self.assertEqual(first['ETag'], second['ETag'])
+
+    def test_render_waits_for_other_process(self):
+        """Test a miss waits on the lock file of a render in another process"""
+        cache = resize.get_resize_cache()
+        key = resize.resize_key(self.recipe.image.name, 64, 64, 'jpg')
+        results = []
+        render = patch.object(resize, 'render_resized')
+        with render as mocked:
+            # Another process holding the lock on the same entry
+            with cache.locked(key):
+                thread = threading.Thread(target=lambda: results.append(
+                    resize.get_resized(self.recipe.image.name, 64, 64, 'jpg')
+                ))
+                thread.start()
+                thread.join(0.2)
+                self.assertTrue(thread.is_alive())
+                cache.put(key, sample_jpeg())
+            thread.join()
+
+        mocked.assert_not_called()
+        self.assertEqual(results, [cache.path(key)])
+
+    def test_missing_or_corrupt_image_not_found(self):
+        """Test an image gone from storage or not decodable is a 404"""
+        path = os.path.join(self.media_root, self.recipe.image.name)
+        with open(path, 'wb') as fh:
+            fh.write(b'not an image')
+
+        res = self.client.get(resized_url(self.recipe.id, 64, 64))
+
+        self.assertEqual(res.status_code, 404)
+
+        os.remove(path)
+
+        res = self.client.get(resized_url(self.recipe.id, 128, 128))
+
+        self.assertEqual(res.status_code, 404)
+
+    def test_size_not_allowed(self):
+        """Test sizes and formats outside the allowlist are not found"""
+        for url in (
+            resized_url(self.recipe.id, 100, 64),
+            resized_url(self.recipe.id, 64, 2000),
+            resized_url(self.recipe.id, 64, 64, 'tiff'),
+        ):
+            self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_recipe_without_image(self):
+        """Test a recipe without an image has no resized versions"""
+        recipe = Recipe.objects.create(
+            user=self.recipe.user,
+            title='Toast',
+            time_minutes=2,
+            price=1.00
+        )
+
+        res = self.client.get(resized_url(recipe.id, 64, 64))
+
+        self.assertEqual(res.status_code, 404)
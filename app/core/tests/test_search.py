@@ -0,0 +1,22 @@
+from django.test import TestCase
+
+from core.search import fallback_rank, search_document
+
+
+class FallbackIndexTests(TestCase):
+
+    def test_document_weights_title_terms(self):
+        """Test title words are weighted above linked names"""
+        self.assertEqual(
+            search_document('Thai Curry', ['Coconut milk']),
+            'thai:A curry:A coconut:B milk:B'
+        )
+
+    def test_rank_needs_every_term(self):
+        """Test a document ranks only when every term prefixes a word"""
+        document = search_document('Thai curry', ['Coconut milk'])
+
+        self.assertEqual(fallback_rank(document, ['cur']), 1.0)
+        self.assertEqual(fallback_rank(document, ['cur', 'coco']), 1.4)
+        self.assertIsNone(fallback_rank(document, ['cur', 'rice']))
+        self.assertIsNone(fallback_rank(None, ['cur']))
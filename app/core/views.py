@@ -0,0 +1,279 @@
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_safe
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from PIL import Image
+
+from core.blobs import content_digest
+from core.db import ping
+from core.models import Recipe, RecipeImageVariant
+from core.resize import UnidentifiedImageError, get_resized, image_format, \
+                        resize_key
+
+RECIPE_MEDIA_PREFIX = 'uploads/recipe/'
+BYTE_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class FileRange:
+    """Read only view of length bytes of an open file from start"""
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """Return the inclusive (start, end) of a single byte range
+
+    Returns None when the whole file should be sent, which RFC 7233
+    allows for multiple ranges and malformed headers. Raises ValueError
+    when the range cannot be satisfied.
+    """
+    match = BYTE_RANGE.match(header or '')
+    if match is None or match.groups() == ('', ''):
+        return None
+
+    first, last = match.groups()
+    if not first:
+        length = int(last)
+        if length == 0 or size == 0:
+            raise ValueError('Unsatisfiable range')
+        return max(size - length, 0), size - 1
+
+    start = int(first)
+    if start >= size:
+        raise ValueError('Unsatisfiable range')
+    end = min(int(last), size - 1) if last else size - 1
+    if end < start:
+        return None
+
+    return start, end
+
+
+def request_user(request):
+    """Authenticate a plain Django request with the API authenticators"""
+    request = Request(request, authenticators=[
+        authenticator()
+        for authenticator in api_settings.DEFAULT_AUTHENTICATION_CLASSES
+    ])
+    try:
+        return request.user
+    except APIException:
+        return None
+
+
+def owns_media(user, path):
+    """Return whether path is an image of one of the user's recipes"""
+    if user is None or not user.is_authenticated:
+        return False
+
+    return Recipe.objects.filter(user=user, image=path).exists() or \
+        RecipeImageVariant.objects.filter(
+            recipe__user=user,
+            image=path
+        ).exists()
+
+
+def media_etag(path, stat):
+    """Return a strong ETag, the digest for content addressed files"""
+    digest = content_digest(path)
+    if digest is None:
+        return '"%x-%x"' % (stat.st_mtime_ns, stat.st_size)
+
+    name = posixpath.splitext(posixpath.basename(path))[0]
+
+    return f'"{digest}"' if name == digest else f'"{digest}-{name}"'
+
+
+def file_response(request, full_path, size, etag, content_type):
+    """Return the file, or the requested byte range of it"""
+    byte_range = None
+    if request.method == 'GET' and \
+            request.META.get('HTTP_IF_RANGE', etag) == etag:
+        try:
+            byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    if byte_range is None:
+        # Streamed with wsgi.file_wrapper, sendfile() where supported
+        response = FileResponse(
+            open(full_path, 'rb'),
+            content_type=content_type
+        )
+    else:
+        start, end = byte_range
+        response = FileResponse(
+            FileRange(open(full_path, 'rb'), start, end - start + 1),
+            status=206,
+            content_type=content_type
+        )
+        response['Content-Length'] = end - start + 1
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Accept-Ranges'] = 'bytes'
+
+    return response
+
+
+def send_file(request, full_path, stat, etag, cache_control, accel_path,
+              content_type=None):
+    """Answer a conditional request for a file under the given validators
+
+    The transfer is handed to the front proxy when MEDIA_SENDFILE_HEADER
+    is set, X-Accel-Redirect pointing at accel_path.
+    """
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(stat.st_mtime),
+        'Cache-Control': cache_control,
+    }
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=int(stat.st_mtime)
+    )
+    if response is None:
+        content_type = content_type or \
+            mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+        sendfile_header = settings.MEDIA_SENDFILE_HEADER
+        if sendfile_header.lower() == 'x-accel-redirect':
+            response = HttpResponse(content_type=content_type)
+            response[sendfile_header] = quote(accel_path)
+        elif sendfile_header:
+            response = HttpResponse(content_type=content_type)
+            response[sendfile_header] = full_path
+        else:
+            response = file_response(
+                request,
+                full_path,
+                stat.st_size,
+                etag,
+                content_type
+            )
+    for header, value in headers.items():
+        response[header] = value
+
+    return response
+
+
+@never_cache
+@require_safe
+def healthz(request):
+    """Answer load balancer and orchestrator probes
+
+    One query on the thread's persistent connection, no session,
+    authentication or model is involved.
+    """
+    try:
+        ping(connections[DEFAULT_DB_ALIAS])
+    except DatabaseError:
+        return HttpResponse('database unavailable\n', status=503,
+                            content_type='text/plain')
+
+    return HttpResponse('ok\n', content_type='text/plain')
+
+
+@require_safe
+def serve_media(request, path):
+    """Serve a file under MEDIA_ROOT
+
+    Content addressed files are cached for good as their path changes
+    with their content.
+    """
+    path = posixpath.normpath(path).lstrip('/')
+    try:
+        full_path = default_storage.path(path)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+
+    private = settings.MEDIA_REQUIRE_OWNER and \
+        path.startswith(RECIPE_MEDIA_PREFIX)
+    if private and not owns_media(request_user(request), path):
+        # Not telling other users whether the file exists
+        raise Http404
+
+    stat = os.stat(full_path)
+    if content_digest(path):
+        max_age = f'max-age={settings.MEDIA_IMMUTABLE_MAX_AGE}, immutable'
+    else:
+        max_age = f'max-age={settings.MEDIA_MAX_AGE}'
+
+    return send_file(
+        request,
+        full_path,
+        stat,
+        media_etag(path, stat),
+        ('private, ' if private else 'public, ') + max_age,
+        settings.MEDIA_ACCEL_PREFIX + path
+    )
+
+
+@require_safe
+def resized_recipe_image(request, pk, width, height, ext):
+    """Serve a recipe image fitted within width x height
+
+    Sizes and formats are limited to RECIPE_IMAGE_RESIZE_SIZES and
+    RECIPE_IMAGE_RESIZE_FORMATS so the cache cannot be filled with
+    arbitrary renders. Resized images are kept in the resize cache.
+    """
+    sizes = settings.RECIPE_IMAGE_RESIZE_SIZES
+    name = image_format(ext)
+    if width not in sizes or height not in sizes or name is None:
+        raise Http404
+
+    recipe = Recipe.objects.filter(pk=pk).only('user', 'image').first()
+    if recipe is None or not recipe.image:
+        raise Http404
+    private = settings.MEDIA_REQUIRE_OWNER
+    if private:
+        user = request_user(request)
+        if user is None or recipe.user_id != user.pk:
+            raise Http404
+
+    try:
+        full_path = get_resized(recipe.image.name, width, height, ext)
+    except (FileNotFoundError, UnidentifiedImageError):
+        # The stored image is gone or cannot be decoded
+        raise Http404
+    key = resize_key(recipe.image.name, width, height, ext)
+
+    return send_file(
+        request,
+        full_path,
+        os.stat(full_path),
+        '"%s"' % key.replace(os.sep, '-'),
+        ('private, ' if private else 'public, ') +
+        f'max-age={settings.MEDIA_MAX_AGE}',
+        settings.RECIPE_IMAGE_RESIZE_ACCEL_PREFIX + key,
+        Image.MIME.get(name)
+    )
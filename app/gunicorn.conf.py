@@ -0,0 +1,63 @@
+"""gunicorn configuration, used by manage.py serve
+
+Picked up from the working directory by a plain gunicorn run as well.
+Settings can be overridden with GUNICORN_* environment variables.
+
+Workers are forked from a master that has already imported the
+application, so they share its memory copy-on-write. Send the master
+HUP to restart the workers gracefully with a new configuration, or
+USR2 then QUIT to the old master to also load new code, which a
+preloaded master does not reload on HUP.
+"""
+import os
+
+
+def available_cpus():
+    """Return the cores this container may use, honouring a CPU quota"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as fh:
+            quota, period = fh.read().split()
+        if quota != 'max':
+            cpus = min(cpus, max(1, int(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+
+    return cpus
+
+
+asgi = os.environ.get('GUNICORN_ASGI') == '1'
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+# Sync workers block on I/O, so run a couple per core. ASGI workers do
+# not, one per core keeps them busy
+workers = int(os.environ.get(
+    'GUNICORN_WORKERS',
+    available_cpus() if asgi else available_cpus() * 2 + 1
+))
+if asgi:
+    worker_class = 'uvicorn.workers.UvicornWorker'
+preload_app = True
+
+# Recycle workers to bound slow memory growth, jittered so they do not
+# all restart at once
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 100))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = 5
+# Heartbeat files on tmpfs, a disk backed /tmp can stall workers
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+accesslog = '-'
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    # Never share a connection the master may have opened while preloading
+    from django.db import connections
+
+    connections.close_all()
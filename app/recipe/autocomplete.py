@@ -0,0 +1,144 @@
+import heapq
+import math
+import re
+import threading
+from collections import Counter, OrderedDict, defaultdict
+from itertools import chain
+
+from django.db import connections
+from django.db.models import BooleanField, F, FloatField, Func, Value
+
+from core.search import is_postgresql
+from recipe.cache import get_generation
+
+# pg_trgm.similarity_threshold's default, what the % operator matches
+SIMILARITY_THRESHOLD = 0.3
+INDEX_CACHE_SIZE = 64
+
+WORD = re.compile(r'[^\W_]+')
+
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def trigrams(text):
+    """Return the trigrams of text the way pg_trgm extracts them
+
+    Words are lower cased and padded with two spaces in front and one
+    behind, so word starts weigh more than their ends.
+    """
+    grams = set()
+    for word in WORD.findall(text.lower()):
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+
+    return grams
+
+
+class TrigramIndex:
+    """In memory trigram index of names, matching like pg_trgm
+
+    Holds an inverted index from trigram to names for fuzzy matches.
+    """
+
+    def __init__(self, rows):
+        self.names = {}
+        self.sizes = {}
+        self.postings = defaultdict(list)
+        for pk, name in rows:
+            grams = trigrams(name)
+            self.names[pk] = name.lower()
+            self.sizes[pk] = len(grams)
+            for gram in grams:
+                self.postings[gram].append(pk)
+
+    def search(self, text, limit):
+        """Return the ids of the best limit names for text
+
+        Names closest to text by trigram similarity come first, names
+        starting with text ahead of equally close ones, ties by name.
+        """
+        grams = trigrams(text)
+        prefix = text.lower()
+        shared = Counter(chain.from_iterable(
+            self.postings.get(gram, ()) for gram in grams
+        ))
+        # similarity >= threshold needs at least this share of the grams
+        needed = math.ceil(SIMILARITY_THRESHOLD * len(grams) - 1e-9)
+        ranked = []
+        for pk, count in shared.items():
+            if count < needed:
+                continue
+            score = count / (len(grams) + self.sizes[pk] - count or 1)
+            if score >= SIMILARITY_THRESHOLD:
+                name = self.names[pk]
+                ranked.append(
+                    (-score, not name.startswith(prefix), name, pk)
+                )
+
+        return [pk for *_, pk in heapq.nsmallest(limit, ranked)]
+
+
+def get_trigram_index(queryset, user_id):
+    """Return the trigram index of a user's names from queryset
+
+    Indexes are rebuilt once the user's recipe cache generation moved,
+    which every change to their tags and ingredients does.
+    """
+    key = (queryset.model._meta.label, user_id)
+    generation = get_generation(user_id)
+    with _indexes_lock:
+        cached = _indexes.get(key)
+        if cached is not None and cached[0] == generation:
+            _indexes.move_to_end(key)
+            return cached[1]
+
+    index = TrigramIndex(queryset.values_list('pk', 'name'))
+    with _indexes_lock:
+        _indexes[key] = (generation, index)
+        _indexes.move_to_end(key)
+        while len(_indexes) > INDEX_CACHE_SIZE:
+            _indexes.popitem(last=False)
+
+    return index
+
+
+def autocomplete(queryset, user_id, text, limit):
+    """Return up to limit objects of queryset whose name best match text
+
+    Names closest to text by trigram similarity first, names starting
+    with it ahead of equally close ones. On PostgreSQL the user's names
+    are walked nearest first on the per user trigram index.
+    """
+    if is_postgresql(queryset):
+        connection = connections[queryset.db]
+        prefix = Func(
+            F('name'), Value(connection.ops.prep_for_like_query(text) + '%'),
+            arg_joiner=' ILIKE ',
+            template='%(expressions)s',
+            output_field=BooleanField()
+        )
+        similar = Func(
+            F('name'), Value(text),
+            arg_joiner=' %% ',
+            template='%(expressions)s',
+            output_field=BooleanField()
+        )
+        distance = Func(
+            F('name'), Value(text),
+            arg_joiner=' <-> ',
+            template='%(expressions)s',
+            output_field=FloatField()
+        )
+        # Ordering on the distance alone lets the limit stop the index
+        # scan, prefix only sorts the few ties it returns
+        return list(queryset.annotate(
+            prefix=prefix,
+            similar=similar,
+            distance=distance
+        ).filter(similar=True).order_by('distance', '-prefix', 'name')[:limit])
+
+    pks = get_trigram_index(queryset, user_id).search(text, limit)
+    found = queryset.in_bulk(pks)
+
+    return [found[pk] for pk in pks if pk in found]
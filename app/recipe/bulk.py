@@ -0,0 +1,273 @@
+from django.db import connections, transaction
+from django.db.models import prefetch_related_objects
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from core.models import Recipe
+from core.search import update_search_vectors
+from core.signals import touch_recipes
+from recipe.cache import invalidate_user
+from recipe.serializers import UserOwnedManyRelatedField
+
+
+def is_id(value):
+    """Whether value can be a primary key, booleans are ints but not ids"""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+class BulkModelMixin:
+    """Create, update and delete lists of user owned objects
+
+    POST, PATCH and DELETE on the bulk endpoint take a list payload. Every
+    item is validated before anything is written, errors are reported
+    per item in request order and nothing is saved when any item fails.
+    Rows and many to many links are written with bulk inserts inside one
+    transaction.
+    """
+    bulk_batch_size = 1000
+    bulk_max_items = 10000
+
+    @action(methods=['POST', 'PATCH', 'DELETE'], detail=False,
+            url_path='bulk')
+    def bulk(self, request):
+        """Handle a list payload for the request method"""
+        items = request.data
+        if not isinstance(items, list) or not items:
+            return Response(
+                {'non_field_errors': ['Expected a non-empty list of items.']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(items) > self.bulk_max_items:
+            return Response(
+                {'non_field_errors': [
+                    f'Ensure there are no more than {self.bulk_max_items} '
+                    f'items.'
+                ]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        handler = {
+            'POST': self.perform_bulk_create,
+            'PATCH': self.perform_bulk_update,
+            'DELETE': self.perform_bulk_destroy,
+        }[request.method]
+        with transaction.atomic():
+            response = handler(items)
+        # Bulk writes do not send the save signals the cache relies on
+        invalidate_user(request.user.id)
+
+        return response
+
+    def perform_bulk_create(self, items):
+        """Validate and insert a list of new objects"""
+        context = self.get_bulk_serializer_context(items)
+        serializers = [
+            self.get_serializer(data=item, context=context)
+            for item in items
+        ]
+        errors = self._collect_errors(serializers)
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        model = serializers[0].Meta.model
+        instances = []
+        links = []
+        for serializer in serializers:
+            data = dict(serializer.validated_data)
+            related = {
+                field.name: data.pop(field.name)
+                for field in model._meta.many_to_many
+                if field.name in data
+            }
+            instance = model(user=self.request.user, **data)
+            instances.append(instance)
+            links.append(related)
+        self._insert(model, instances)
+        self._replace_links(model, instances, links)
+        if model is Recipe:
+            self._update_search_vectors(model, instances)
+
+        return Response(
+            self._represent(instances),
+            status=status.HTTP_201_CREATED
+        )
+
+    def perform_bulk_update(self, items):
+        """Validate and apply partial updates to a list of objects"""
+        ids = [item.get('id') if isinstance(item, dict) else None
+               for item in items]
+        found = self.get_queryset().in_bulk(
+            [pk for pk in ids if is_id(pk)]
+        )
+        context = self.get_bulk_serializer_context(items)
+        serializers = []
+        errors = []
+        seen = set()
+        for pk, item in zip(ids, items):
+            error = self._item_error(item)
+            if not error and (not is_id(pk) or pk not in found):
+                error = {'id': ['Not found.']}
+            elif not error and pk in seen:
+                error = {'id': ['Duplicate id.']}
+            if error:
+                serializers.append(None)
+                errors.append(error)
+                continue
+            seen.add(pk)
+            serializer = self.get_serializer(found[pk], data=item,
+                                             partial=True, context=context)
+            serializers.append(serializer)
+            errors.append({} if serializer.is_valid() else serializer.errors)
+        if any(errors):
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        model = serializers[0].Meta.model
+        m2m_names = {field.name for field in model._meta.many_to_many}
+        instances = []
+        links = []
+        fields = {'updated_at'}
+        now = timezone.now()
+        for serializer in serializers:
+            instance = serializer.instance
+            related = {}
+            for name, value in serializer.validated_data.items():
+                if name in m2m_names:
+                    related[name] = value
+                else:
+                    setattr(instance, name, value)
+                    fields.add(name)
+            instance.updated_at = now
+            instances.append(instance)
+            links.append(related)
+        model.objects.bulk_update(
+            instances,
+            sorted(fields),
+            batch_size=self.bulk_batch_size
+        )
+        self._replace_links(model, instances, links)
+        self._update_search_vectors(model, instances)
+        if model is not Recipe:
+            # Renames show on the linked recipes, which no save touched
+            touch_recipes(self._linked_recipes(model, instances))
+        for instance in instances:
+            instance.__dict__.pop('_prefetched_objects_cache', None)
+
+        return Response(self._represent(instances))
+
+    def perform_bulk_destroy(self, items):
+        """Delete a list of objects given by id"""
+        found = set(self.get_queryset().filter(
+            pk__in=[pk for pk in items if is_id(pk)]
+        ).values_list('pk', flat=True))
+        errors = [
+            {} if is_id(pk) and pk in found else {'id': ['Not found.']}
+            for pk in items
+        ]
+        if any(errors):
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        self.get_queryset().filter(pk__in=found).delete()
+
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def get_bulk_serializer_context(self, items):
+        """Return serializer context with the batch's relations resolved
+
+        Each related field looks up the ids of every item at once instead
+        of running a query per item.
+        """
+        context = self.get_serializer_context()
+        context['related_objects'] = {
+            name: field.preload(items)
+            for name, field in self.get_serializer().fields.items()
+            if isinstance(field, UserOwnedManyRelatedField)
+            and not field.read_only
+        }
+
+        return context
+
+    def _item_error(self, item):
+        """Return the error for an item that is not an object, if any"""
+        if isinstance(item, dict):
+            return {}
+
+        return {'non_field_errors': [
+            f'Invalid data. Expected a dictionary, but got '
+            f'{type(item).__name__}.'
+        ]}
+
+    def _collect_errors(self, serializers):
+        """Return per item errors, or an empty list if all items are valid"""
+        errors = [
+            {} if serializer.is_valid() else serializer.errors
+            for serializer in serializers
+        ]
+
+        return errors if any(errors) else []
+
+    def _insert(self, model, instances):
+        """Insert new rows, setting their primary keys"""
+        connection = connections[model.objects.db]
+        if connection.features.can_return_rows_from_bulk_insert:
+            model.objects.bulk_create(
+                instances,
+                batch_size=self.bulk_batch_size
+            )
+        else:
+            # The backend cannot report the new keys needed for the links
+            for instance in instances:
+                instance.save()
+
+    def _replace_links(self, model, instances, links):
+        """Set the given many to many links with one insert per relation"""
+        for field in model._meta.many_to_many:
+            through = field.remote_field.through
+            source = f'{field.m2m_field_name()}_id'
+            target = f'{field.m2m_reverse_field_name()}_id'
+            changed = [
+                (instance, related[field.name])
+                for instance, related in zip(instances, links)
+                if field.name in related
+            ]
+            if not changed:
+                continue
+            through.objects.filter(**{
+                f'{source}__in': [instance.pk for instance, _ in changed]
+            }).delete()
+            through.objects.bulk_create([
+                through(**{source: instance.pk, target: pk})
+                for instance, objs in changed
+                for pk in {obj.pk for obj in objs}
+            ], batch_size=self.bulk_batch_size)
+
+    def _linked_recipes(self, model, instances):
+        """Return the recipes linked to tags or ingredients"""
+        field = next(
+            relation.name for relation in Recipe._meta.many_to_many
+            if relation.related_model is model
+        )
+
+        return Recipe.objects.filter(**{f'{field}__in': instances})
+
+    def _update_search_vectors(self, model, instances):
+        """Rebuild the search vectors of the written or renamed recipes"""
+        if model is Recipe:
+            recipes = Recipe.objects.filter(
+                pk__in=[instance.pk for instance in instances]
+            )
+        else:
+            recipes = Recipe.objects.filter(
+                pk__in=self._linked_recipes(model, instances).values('pk')
+            )
+        update_search_vectors(recipes)
+
+    def _represent(self, instances):
+        """Serialize written objects, loading relations in bulk"""
+        prefetch_related_objects(
+            instances,
+            *self.get_queryset()._prefetch_related_lookups
+        )
+
+        return self.get_serializer(instances, many=True).data
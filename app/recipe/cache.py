@@ -0,0 +1,94 @@
+import functools
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def get_cache():
+    """Return the cache backend holding recipe API responses"""
+    return caches[settings.RECIPE_CACHE_ALIAS]
+
+
+def _generation_key(user_id):
+    return f'recipe:generation:{user_id}'
+
+
+def _new_generation():
+    # Seed from the clock so a counter lost to eviction or a restart never
+    # comes back lower than a generation that still has cached responses
+    return time.time_ns() // 1000
+
+
+def get_generation(user_id):
+    """Return the current cache generation for a user"""
+    cache = get_cache()
+    key = _generation_key(user_id)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, _new_generation(), None)
+        generation = cache.get(key)
+
+    return generation
+
+
+def invalidate_user(user_id):
+    """Drop every cached response for a user by moving to a new generation
+
+    Writes that bypass model signals, such as bulk_create or
+    QuerySet.update, must call this themselves.
+    """
+    cache = get_cache()
+    key = _generation_key(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _new_generation(), None)
+
+
+def response_cache_key(view, request, kwargs):
+    """Return the cache key of a read request for the requesting user"""
+    params = sorted(
+        (key, value)
+        for key, values in request.query_params.lists()
+        for value in values
+    )
+    digest = hashlib.md5(
+        repr((request.get_host(), request.path, params)).encode()
+    ).hexdigest()
+    lookup = kwargs.get(view.lookup_url_kwarg or view.lookup_field, '')
+
+    return 'recipe:response:{}:{}:{}:{}:{}:{}'.format(
+        request.user.id,
+        get_generation(request.user.id),
+        view.basename,
+        view.action,
+        lookup,
+        digest,
+    )
+
+
+def cached_per_user(handler):
+    """Cache successful responses of a viewset action per user
+
+    The cached data is keyed on the user's generation, so any change to
+    the user's recipes, tags or ingredients makes it unreachable.
+    """
+    @functools.wraps(handler)
+    def wrapper(view, request, *args, **kwargs):
+        cache = get_cache()
+        key = response_cache_key(view, request, kwargs)
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+
+        response = handler(view, request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, settings.RECIPE_CACHE_TIMEOUT)
+
+        return response
+
+    return wrapper
@@ -0,0 +1,69 @@
+import calendar
+import functools
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+def get_freshness(view, kwargs):
+    """Return the (count, last modified) state behind a read response
+
+    One aggregate query over the rows the response is built from, the
+    lookup is applied for detail actions.
+    """
+    queryset = view.filter_queryset(view.get_queryset())
+    lookup_url_kwarg = view.lookup_url_kwarg or view.lookup_field
+    if lookup_url_kwarg in kwargs:
+        queryset = queryset.filter(
+            **{view.lookup_field: kwargs[lookup_url_kwarg]}
+        )
+    state = queryset.order_by().aggregate(
+        count=Count('pk'),
+        last_modified=Max('updated_at')
+    )
+
+    return state['count'], state['last_modified']
+
+
+def conditional_read(handler):
+    """Answer If-None-Match/If-Modified-Since without building the response
+
+    The ETag is derived from the request and the freshness state of the
+    rows it reads, not from the response body. Only detail reads carry
+    Last-Modified, the newest updated_at of a list does not move when a
+    row is deleted or filtered out.
+    """
+    @functools.wraps(handler)
+    def wrapper(view, request, *args, **kwargs):
+        count, last_modified = get_freshness(view, kwargs)
+        if view.detail and not count:
+            # Nothing to validate against, let the handler answer 404
+            return handler(view, request, *args, **kwargs)
+        params = sorted(request.query_params.lists())
+        etag = 'W/' + quote_etag(hashlib.md5(repr((
+            request.user.id,
+            request.path,
+            params,
+            count,
+            last_modified and last_modified.isoformat(),
+        )).encode()).hexdigest())
+        timestamp = view.detail and last_modified and calendar.timegm(
+            last_modified.utctimetuple()
+        )
+
+        response = get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=timestamp
+        )
+        if response is None:
+            response = handler(view, request, *args, **kwargs)
+        response['ETag'] = etag
+        if timestamp:
+            response['Last-Modified'] = http_date(timestamp)
+
+        return response
+
+    return wrapper
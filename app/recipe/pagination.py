@@ -0,0 +1,25 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class BaseCursorPagination(CursorPagination):
+    """Keyset pagination with a client adjustable page size"""
+    page_size = settings.API_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.API_MAX_PAGE_SIZE
+
+
+class RecipeAttrCursorPagination(BaseCursorPagination):
+    """Paginate user owned recipe attributes by name"""
+    ordering = ('-name', 'id')
+
+
+class RecipeCursorPagination(BaseCursorPagination):
+    """Paginate recipes newest first, search results best match first"""
+    ordering = ('-id',)
+
+    def get_ordering(self, request, queryset, view):
+        if 'rank' in queryset.query.annotations:
+            return ('-rank', '-id')
+
+        return super().get_ordering(request, queryset, view)
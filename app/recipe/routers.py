@@ -0,0 +1,80 @@
+import functools
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.urls import URLPattern
+from rest_framework.routers import DefaultRouter
+
+from core.db import check_connection_health
+
+READ_METHODS = ('GET', 'HEAD')
+
+
+def _render(view, request, *args, **kwargs):
+    # request_started fired on another thread, the one whose connections
+    # this view uses still needs its own checks
+    close_old_connections()
+    check_connection_health()
+    try:
+        response = view(request, *args, **kwargs)
+        if callable(getattr(response, 'render', None)):
+            response.render()
+    finally:
+        close_old_connections()
+
+    return response
+
+
+def async_read_view(view):
+    """Return an async view running view in a worker thread
+
+    Under ASGI Django runs every sync view on one shared thread. Reads
+    only touch their own request and connection, so they run in the
+    executor instead and are rendered there too. The event loop sends
+    the response, so a slow client does not hold a thread. That holds as
+    long as every middleware is async capable, Django 3.2 runs the chain
+    below a sync only one, view included, on the thread sensitive thread.
+    Other methods keep Django's thread sensitive handling.
+    """
+    read = sync_to_async(functools.partial(_render, view),
+                         thread_sensitive=False)
+    write = sync_to_async(view, thread_sensitive=True)
+
+    @functools.wraps(view)
+    async def async_view(request, *args, **kwargs):
+        handler = read if request.method in READ_METHODS else write
+
+        return await handler(request, *args, **kwargs)
+
+    return async_view
+
+
+class AsyncReadRouter(DefaultRouter):
+    """Router serving list, retrieve and autocomplete from async views
+
+    Only when ASYNC_READ_VIEWS is set, which the ASGI entry point does.
+    Under WSGI the async views would only add a thread hop.
+    """
+    read_actions = ('list', 'retrieve', 'autocomplete')
+
+    def get_urls(self):
+        urls = super().get_urls()
+        if not settings.ASYNC_READ_VIEWS:
+            return urls
+
+        return [
+            URLPattern(
+                url.pattern,
+                async_read_view(url.callback),
+                url.default_args,
+                url.name
+            )
+            if self.serves_reads(url) else url
+            for url in urls
+        ]
+
+    def serves_reads(self, url):
+        actions = getattr(url.callback, 'actions', None) or {}
+
+        return actions.get('get') in self.read_actions
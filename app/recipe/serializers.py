@@ -1,6 +1,93 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
 from rest_framework import serializers
-
-from core.models import Tag, Ingredient, Recipe
+from rest_framework.relations import MANY_RELATION_KWARGS
+
+from core.blobs import attach_blob, content_addressed
+from core.models import Tag, Ingredient, Recipe, RecipeImageVariant
+
+
+class UserOwnedManyRelatedField(serializers.ManyRelatedField):
+    """Resolve a list of primary keys with a single query
+
+    Every missing or foreign id is reported at once. Objects preloaded
+    into context['related_objects'][field_name], as the bulk endpoints do
+    for a whole batch, are used without querying.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+
+        pks = [self.child_relation.to_pk(item) for item in data]
+        preloaded = self.context.get('related_objects', {})
+        if self.field_name in preloaded:
+            found = preloaded[self.field_name]
+        else:
+            found = self.child_relation.resolve(pks)
+        missing = [pk for pk in dict.fromkeys(pks) if pk not in found]
+        if missing:
+            raise serializers.ValidationError([
+                self.child_relation.error_messages['does_not_exist'].format(
+                    pk_value=pk
+                )
+                for pk in missing
+            ])
+
+        return [found[pk] for pk in pks]
+
+    def preload(self, items):
+        """Resolve the ids this field holds across a list of payloads"""
+        pks = set()
+        for item in items:
+            values = item.get(self.field_name) if isinstance(item, dict) \
+                else None
+            if isinstance(values, list):
+                for value in values:
+                    try:
+                        pks.add(self.child_relation.to_pk(value))
+                    except serializers.ValidationError:
+                        pass
+
+        return self.child_relation.resolve(pks)
+
+
+class UserOwnedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Primary key relation limited to objects of the requesting user"""
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+
+        return UserOwnedManyRelatedField(**list_kwargs)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        request = self.context.get('request')
+        if request is not None:
+            queryset = queryset.filter(user=request.user)
+
+        return queryset
+
+    def to_pk(self, data):
+        """Convert a submitted value to a primary key without querying"""
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return self.get_queryset().model._meta.pk.to_python(data)
+        except (DjangoValidationError, TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+    def resolve(self, pks):
+        """Return the user's objects for the given keys, keyed by pk"""
+        if not pks:
+            return {}
+
+        return self.get_queryset().in_bulk(pks)
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -24,12 +111,12 @@ class IngredientSerializer(serializers.ModelSerializer):
 class RecipeSerializer(serializers.ModelSerializer):
     """Serialize Recipe object"""
 
-    ingredients = serializers.PrimaryKeyRelatedField(
+    ingredients = UserOwnedPrimaryKeyRelatedField(
         many=True,
         queryset=Ingredient.objects.all()
     )
 
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = UserOwnedPrimaryKeyRelatedField(
         many=True,
         queryset=Tag.objects.all()
     )
@@ -41,17 +128,45 @@ class RecipeSerializer(serializers.ModelSerializer):
         read_only_fields = ('id',)
 
 
+class RecipeImageVariantSerializer(serializers.ModelSerializer):
+    """Serialize a resized recipe image"""
+
+    class Meta:
+        model = RecipeImageVariant
+        fields = ('name', 'image', 'width', 'height')
+        read_only_fields = fields
+
+
 class RecipeDetailSerializer(RecipeSerializer):
     """Serialize a recipe detail"""
 
     ingredients = IngredientSerializer(many=True, read_only=True)
     tags = TagSerializer(many=True, read_only=True)
+    image_variants = RecipeImageVariantSerializer(many=True, read_only=True)
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + (
+            'image', 'image_status', 'image_variants'
+        )
+        read_only_fields = ('id', 'image', 'image_status')
 
 
 class RecipeImageSerializer(serializers.ModelSerializer):
     """Serializer for uploading image to recipes"""
 
+    image_variants = RecipeImageVariantSerializer(many=True, read_only=True)
+
     class Meta:
         model = Recipe
-        fields = ('id', 'image')
-        read_only_fields = ('id',)
+        fields = ('id', 'image', 'image_status', 'image_variants')
+        read_only_fields = ('id', 'image_status')
+
+    def update(self, instance, validated_data):
+        """Store the image once per distinct content when enabled"""
+        image = validated_data.get('image')
+        if image is None or not content_addressed():
+            return super().update(instance, validated_data)
+
+        attach_blob(instance, 'image', image)
+
+        return instance
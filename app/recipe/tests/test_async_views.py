@@ -0,0 +1,139 @@
+import asyncio
+import threading
+import time
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.test import AsyncClient, TransactionTestCase, override_settings
+from django.urls import include, path
+from rest_framework import status
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.models import Recipe, Tag
+from recipe import views
+from recipe.routers import AsyncReadRouter
+
+
+def get_routes():
+    """Return the recipe API routes by name"""
+    router = AsyncReadRouter()
+    router.register('tags', views.TagViewSet)
+    router.register('recipes', views.RecipeViewSet)
+
+    return {url.name: url.callback for url in router.urls}
+
+
+def get_router():
+    router = AsyncReadRouter()
+    router.register('tags', views.TagViewSet)
+
+    return router
+
+
+# URLconf of the slow read test, with the read routes async
+with override_settings(ASYNC_READ_VIEWS=True):
+    urlpatterns = [path('api/', include(get_router().urls))]
+
+
+class AsyncReadViewTests(TransactionTestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            'testpass'
+        )
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title='Pancakes',
+            time_minutes=5,
+            price=3.00
+        )
+        Tag.objects.create(user=self.user, name='Breakfast')
+
+    def get(self, view, path, **kwargs):
+        request = APIRequestFactory().get(path)
+        force_authenticate(request, self.user)
+
+        return async_to_sync(view)(request, **kwargs)
+
+    @override_settings(ASYNC_READ_VIEWS=True)
+    def test_read_routes_are_async(self):
+        """Test list, retrieve and autocomplete are served by async views"""
+        routes = get_routes()
+
+        for name in ('recipe-list', 'recipe-detail', 'tag-list',
+                     'tag-autocomplete'):
+            self.assertTrue(asyncio.iscoroutinefunction(routes[name]))
+        self.assertFalse(asyncio.iscoroutinefunction(routes['recipe-bulk']))
+
+    @override_settings(ASYNC_READ_VIEWS=False)
+    def test_sync_routes_by_default(self):
+        """Test routes stay sync when async reads are off"""
+        routes = get_routes()
+
+        self.assertFalse(asyncio.iscoroutinefunction(routes['recipe-list']))
+
+    @override_settings(ASYNC_READ_VIEWS=True)
+    def test_async_list_and_retrieve(self):
+        """Test the async views return the same data as the sync ones"""
+        routes = get_routes()
+
+        listed = self.get(routes['recipe-list'], '/recipes/')
+        detail = self.get(routes['recipe-detail'], '/recipes/',
+                          pk=self.recipe.id)
+        tags = self.get(routes['tag-list'], '/tags/')
+
+        self.assertEqual(listed.status_code, status.HTTP_200_OK)
+        self.assertEqual(listed.data['results'][0]['title'], 'Pancakes')
+        self.assertEqual(detail.data['title'], 'Pancakes')
+        self.assertEqual(tags.data['results'][0]['name'], 'Breakfast')
+        self.assertTrue(listed.is_rendered)
+
+    @override_settings(ASYNC_READ_VIEWS=True)
+    def test_async_read_checks_connection_health(self):
+        """Test the worker thread's connections are health checked"""
+        routes = get_routes()
+        threads = []
+
+        with patch(
+            'recipe.routers.check_connection_health',
+            side_effect=lambda: threads.append(threading.get_ident())
+        ):
+            res = self.get(routes['tag-list'], '/tags/')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(threads), 1)
+        self.assertNotEqual(threads[0], threading.get_ident())
+
+    @override_settings(ROOT_URLCONF='recipe.tests.test_async_views')
+    def test_slow_reads_overlap(self):
+        """Test slow reads run side by side through the middleware chain
+
+        A sync only middleware would put every request, view included,
+        on Django's one thread sensitive thread.
+        """
+        delay, count = 0.3, 5
+        token = str(RefreshToken.for_user(self.user).access_token)
+        slow_list = views.TagViewSet.list
+
+        def list_slowly(viewset, request, *args, **kwargs):
+            time.sleep(delay)
+            return slow_list(viewset, request, *args, **kwargs)
+
+        async def read_all():
+            client = AsyncClient()
+            return await asyncio.gather(*[
+                client.get('/api/tags/', authorization=f'Bearer {token}')
+                for _ in range(count)
+            ])
+
+        with patch.object(views.TagViewSet, 'list', list_slowly):
+            start = time.monotonic()
+            responses = async_to_sync(read_all)()
+            elapsed = time.monotonic() - start
+
+        for response in responses:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertLess(elapsed, delay * count / 2)
@@ -0,0 +1,107 @@
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient
+from recipe.autocomplete import TrigramIndex, trigrams
+
+TAGS_AUTOCOMPLETE_URL = reverse('recipe:tag-autocomplete')
+INGREDIENTS_AUTOCOMPLETE_URL = reverse('recipe:ingredient-autocomplete')
+
+
+class TrigramIndexTests(TestCase):
+
+    def test_trigrams_match_pg_trgm(self):
+        """Test trigrams are extracted like pg_trgm's show_trgm"""
+        self.assertEqual(
+            trigrams('Cat'),
+            {'  c', ' ca', 'cat', 'at '}
+        )
+
+    def test_similarity_match_pg_trgm(self):
+        """Test the similarity pg_trgm documents for word/two words"""
+        index = TrigramIndex([(1, 'two words')])
+
+        # similarity('word', 'two words') is 0.36363637
+        self.assertEqual(index.search('word', 10), [1])
+        self.assertEqual(TrigramIndex([(1, 'two')]).search('word', 10), [])
+
+
+class AutocompleteApiTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            'password1234'
+        )
+        self.client.force_authenticate(self.user)
+
+    def names(self, url, text, **params):
+        res = self.client.get(url, {'q': text, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return [item['name'] for item in res.data]
+
+    def test_prefix_matches_first(self):
+        """Test closest names first, those starting with q above ties"""
+        for name in ('Sweet potato', 'Potatoes', 'Potato', 'Tomato'):
+            Ingredient.objects.create(user=self.user, name=name)
+
+        self.assertEqual(
+            self.names(INGREDIENTS_AUTOCOMPLETE_URL, 'potato'),
+            ['Potato', 'Potatoes', 'Sweet potato']
+        )
+
+    def test_prefix_breaks_ties(self):
+        """Test names starting with q come before equally close names"""
+        Tag.objects.create(user=self.user, name='Salt pepper')
+        Tag.objects.create(user=self.user, name='Pepper salt')
+
+        self.assertEqual(
+            self.names(TAGS_AUTOCOMPLETE_URL, 'pepper'),
+            ['Pepper salt', 'Salt pepper']
+        )
+
+    def test_fuzzy_match(self):
+        """Test misspelt names are still found"""
+        Tag.objects.create(user=self.user, name='Breakfast')
+        Tag.objects.create(user=self.user, name='Dinner')
+
+        self.assertEqual(
+            self.names(TAGS_AUTOCOMPLETE_URL, 'brekfast'),
+            ['Breakfast']
+        )
+
+    def test_limit(self):
+        """Test only the top limit names are returned"""
+        for index in range(20):
+            Tag.objects.create(user=self.user, name=f'Vegan {index:02}')
+
+        names = self.names(TAGS_AUTOCOMPLETE_URL, 'veg', limit=3)
+
+        self.assertEqual(names, ['Vegan 00', 'Vegan 01', 'Vegan 02'])
+        res = self.client.get(TAGS_AUTOCOMPLETE_URL, {'q': 'veg', 'limit': 0})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_limited_to_user_and_follows_changes(self):
+        """Test other users' names are never offered and new ones are"""
+        other = get_user_model().objects.create_user('other@test.com')
+        Tag.objects.create(user=other, name='Secret')
+        self.assertEqual(self.names(TAGS_AUTOCOMPLETE_URL, 'secret'), [])
+
+        Tag.objects.create(user=self.user, name='Secretly good')
+
+        self.assertEqual(
+            self.names(TAGS_AUTOCOMPLETE_URL, 'secret'),
+            ['Secretly good']
+        )
+
+    def test_empty_query(self):
+        """Test an empty q matches nothing"""
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        self.assertEqual(self.names(TAGS_AUTOCOMPLETE_URL, ' '), [])
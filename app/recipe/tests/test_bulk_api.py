@@ -0,0 +1,289 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils import timezone
+
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+RECIPES_BULK_URL = reverse('recipe:recipe-bulk')
+TAGS_BULK_URL = reverse('recipe:tag-bulk')
+INGREDIENTS_BULK_URL = reverse('recipe:ingredient-bulk')
+
+
+def sample_recipe(user, **params):
+    """Create and return a sample recipe"""
+
+    defaults = {
+        'title': 'sample recipe',
+        'time_minutes': 10,
+        'price': 5.00
+    }
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class PublicBulkApiTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_auth_required(self):
+        """Test that auth is required"""
+        res = self.client.post(RECIPES_BULK_URL, [], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateBulkApiTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            'password1234'
+        )
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.ingredient = Ingredient.objects.create(
+            user=self.user,
+            name='Kale'
+        )
+
+    def test_bulk_create_recipes(self):
+        """Test creating a list of recipes with their links"""
+        payload = [
+            {
+                'title': f'Recipe {i}',
+                'time_minutes': 10,
+                'price': '5.00',
+                'tags': [self.tag.id],
+                'ingredients': [self.ingredient.id],
+            }
+            for i in range(3)
+        ]
+
+        res = self.client.post(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data), 3)
+        recipes = Recipe.objects.filter(user=self.user)
+        self.assertEqual(recipes.count(), 3)
+        for recipe in recipes:
+            self.assertEqual(list(recipe.tags.all()), [self.tag])
+            self.assertEqual(
+                list(recipe.ingredients.all()),
+                [self.ingredient]
+            )
+        self.assertEqual(res.data[0]['tags'], [self.tag.id])
+
+    def test_bulk_create_reports_errors_per_item(self):
+        """Test an invalid item fails the whole batch with its errors"""
+        payload = [
+            {'title': 'Valid', 'time_minutes': 10, 'price': '5.00',
+             'tags': [], 'ingredients': []},
+            {'title': 'Missing time', 'price': '5.00',
+             'tags': [], 'ingredients': []},
+        ]
+
+        res = self.client.post(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('time_minutes', res.data[1])
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bulk_create_rejects_foreign_tags(self):
+        """Test items linking another user's tag are reported"""
+        user2 = get_user_model().objects.create_user(
+            'other@test.com',
+            'password1234'
+        )
+        foreign = Tag.objects.create(user=user2, name='Secret')
+        item = {'title': 'Cake', 'time_minutes': 10, 'price': '5.00',
+                'ingredients': []}
+        payload = [
+            dict(item, tags=[self.tag.id]),
+            dict(item, tags=[foreign.id]),
+        ]
+
+        res = self.client.post(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('tags', res.data[1])
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bulk_requires_list(self):
+        """Test a non list payload is rejected"""
+        res = self.client.post(
+            RECIPES_BULK_URL,
+            {'title': 'Not a list'},
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_update_recipes(self):
+        """Test partially updating a list of recipes"""
+        recipe1 = sample_recipe(user=self.user)
+        recipe2 = sample_recipe(user=self.user)
+        recipe2.tags.add(self.tag)
+        payload = [
+            {'id': recipe1.id, 'title': 'Renamed', 'tags': [self.tag.id]},
+            {'id': recipe2.id, 'tags': []},
+        ]
+
+        res = self.client.patch(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        recipe1.refresh_from_db()
+        self.assertEqual(recipe1.title, 'Renamed')
+        self.assertEqual(list(recipe1.tags.all()), [self.tag])
+        self.assertEqual(recipe2.tags.count(), 0)
+        self.assertEqual(res.data[0]['tags'], [self.tag.id])
+
+    def test_bulk_update_other_users_recipe(self):
+        """Test recipes of other users cannot be bulk updated"""
+        user2 = get_user_model().objects.create_user(
+            'other@test.com',
+            'password1234'
+        )
+        recipe = sample_recipe(user=user2)
+
+        res = self.client.patch(
+            RECIPES_BULK_URL,
+            [{'id': recipe.id, 'title': 'Hijacked'}],
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {'id': ['Not found.']})
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.title, 'sample recipe')
+
+    def test_bulk_delete_recipes(self):
+        """Test deleting a list of recipes"""
+        recipe1 = sample_recipe(user=self.user)
+        recipe2 = sample_recipe(user=self.user)
+        kept = sample_recipe(user=self.user)
+
+        res = self.client.delete(
+            RECIPES_BULK_URL,
+            [recipe1.id, recipe2.id],
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(list(Recipe.objects.all()), [kept])
+
+    def test_bulk_delete_missing_recipe(self):
+        """Test nothing is deleted when one of the ids is missing"""
+        recipe = sample_recipe(user=self.user)
+
+        res = self.client.delete(
+            RECIPES_BULK_URL,
+            [recipe.id, recipe.id + 100],
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data, [{}, {'id': ['Not found.']}])
+        self.assertTrue(Recipe.objects.filter(pk=recipe.pk).exists())
+
+    def test_bulk_create_tags(self):
+        """Test creating a list of tags for the user"""
+        res = self.client.post(
+            TAGS_BULK_URL,
+            [{'name': 'Breakfast'}, {'name': 'Lunch'}],
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            Tag.objects.filter(user=self.user, name__in=['Breakfast', 'Lunch'])
+            .count(),
+            2
+        )
+
+    def test_bulk_update_ingredients(self):
+        """Test renaming a list of ingredients"""
+        res = self.client.patch(
+            INGREDIENTS_BULK_URL,
+            [{'id': self.ingredient.id, 'name': 'Spinach'}],
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.ingredient.refresh_from_db()
+        self.assertEqual(self.ingredient.name, 'Spinach')
+
+    def test_bulk_rename_touches_linked_recipes(self):
+        """Test renaming ingredients marks the recipes using them modified"""
+        recipe = sample_recipe(user=self.user)
+        recipe.ingredients.add(self.ingredient)
+        Recipe.objects.filter(pk=recipe.pk).update(
+            updated_at=timezone.now() - timedelta(days=1)
+        )
+        recipe.refresh_from_db()
+        before = recipe.updated_at
+
+        res = self.client.patch(
+            INGREDIENTS_BULK_URL,
+            [{'id': self.ingredient.id, 'name': 'Spinach'}],
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        recipe.refresh_from_db()
+        self.assertGreater(recipe.updated_at, before)
+
+    def test_bulk_boolean_ids_not_found(self):
+        """Test booleans are not taken as ids"""
+        res = self.client.patch(
+            TAGS_BULK_URL,
+            [{'id': True, 'name': 'Breakfast'}],
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data, [{'id': ['Not found.']}])
+
+        res = self.client.delete(TAGS_BULK_URL, [True], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(Tag.objects.filter(pk=self.tag.pk).exists())
+
+    def test_bulk_unhashable_ids_not_found(self):
+        """Test ids that are objects or lists are reported per item"""
+        res = self.client.patch(
+            TAGS_BULK_URL,
+            [{'id': [self.tag.id], 'name': 'Breakfast'}, [self.tag.id]],
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {'id': ['Not found.']})
+        self.assertIn('non_field_errors', res.data[1])
+
+        for payload in ([{'id': self.tag.id}], [[self.tag.id]]):
+            res = self.client.delete(TAGS_BULK_URL, payload, format='json')
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(res.data, [{'id': ['Not found.']}])
+        self.assertTrue(Tag.objects.filter(pk=self.tag.pk).exists())
+
+    def test_bulk_write_invalidates_cache(self):
+        """Test bulk writes are visible in the next list response"""
+        list_url = reverse('recipe:tag-list')
+        self.client.get(list_url)
+
+        self.client.post(TAGS_BULK_URL, [{'name': 'Lunch'}], format='json')
+        res = self.client.get(list_url)
+
+        self.assertEqual(len(res.data['results']), 2)
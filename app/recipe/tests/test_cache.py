@@ -0,0 +1,104 @@
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+from recipe.cache import get_generation, invalidate_user
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def detail_url(recipe_id):
+    """ Return recipe detail url"""
+
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class ResponseCacheTests(TestCase):
+    """Test read responses are cached per user until they change"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            'password1234'
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title='Pancakes',
+            time_minutes=5,
+            price=3.00
+        )
+
+    def test_repeated_list_served_from_cache(self):
+        """Test a repeated list only runs the freshness check query"""
+        first = self.client.get(RECIPES_URL)
+
+        with self.assertNumQueries(1):
+            second = self.client.get(RECIPES_URL)
+
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(first.data, second.data)
+
+    def test_query_params_cached_separately(self):
+        """Test different query parameters are not served the same data"""
+        tag = Tag.objects.create(user=self.user, name='Breakfast')
+        self.client.get(RECIPES_URL)
+
+        res = self.client.get(RECIPES_URL, {'tags': str(tag.id)})
+
+        self.assertEqual(res.data['results'], [])
+
+    def test_save_invalidates_cache(self):
+        """Test creating a tag invalidates the cached tag list"""
+        self.client.get(TAGS_URL)
+        Tag.objects.create(user=self.user, name='Breakfast')
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_link_change_invalidates_cache(self):
+        """Test adding a tag to a recipe invalidates its cached detail"""
+        url = detail_url(self.recipe.id)
+        self.client.get(url)
+        self.recipe.tags.add(Tag.objects.create(user=self.user, name='Sweet'))
+
+        res = self.client.get(url)
+
+        self.assertEqual(res.data['tags'][0]['name'], 'Sweet')
+
+    def test_delete_invalidates_cache(self):
+        """Test deleting a recipe through the API invalidates the list"""
+        self.client.get(RECIPES_URL)
+        self.client.delete(detail_url(self.recipe.id))
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.data['results'], [])
+
+    def test_cache_not_shared_between_users(self):
+        """Test a user is never served another user's cached response"""
+        self.client.get(RECIPES_URL)
+        user2 = get_user_model().objects.create_user(
+            'other@test.com',
+            'password1234'
+        )
+        self.client.force_authenticate(user2)
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.data['results'], [])
+
+    def test_invalidate_moves_generation_forward(self):
+        """Test invalidating a user moves to a newer generation"""
+        generation = get_generation(self.user.id)
+
+        invalidate_user(self.user.id)
+
+        self.assertGreater(get_generation(self.user.id), generation)
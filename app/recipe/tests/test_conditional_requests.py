@@ -0,0 +1,149 @@
+import datetime
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def detail_url(recipe_id):
+    """ Return recipe detail url"""
+
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class ConditionalRecipeRequestTests(TestCase):
+    """Test recipe reads honour ETag and Last-Modified validators"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            'password1234'
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title='Pancakes',
+            time_minutes=5,
+            price=3.00
+        )
+
+    def test_list_returns_validators(self):
+        """Test the recipe list carries an ETag but no Last-Modified"""
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('ETag', res)
+        self.assertNotIn('Last-Modified', res)
+
+    def test_list_delete_modified_since(self):
+        """Test a delete is not hidden by an up to date If-Modified-Since"""
+        Recipe.objects.create(
+            user=self.user,
+            title='Waffles',
+            time_minutes=5,
+            price=3.00
+        )
+        since = http_date(
+            (timezone.now() + datetime.timedelta(minutes=1)).timestamp()
+        )
+        self.recipe.delete()
+
+        res = self.client.get(RECIPES_URL, HTTP_IF_MODIFIED_SINCE=since)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_matching_etag_not_modified(self):
+        """Test a matching If-None-Match is answered with one query"""
+        etag = self.client.get(RECIPES_URL)['ETag']
+
+        with self.assertNumQueries(1):
+            res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+
+    def test_etag_changes_with_query_params(self):
+        """Test a filtered list does not share the unfiltered ETag"""
+        etag = self.client.get(RECIPES_URL)['ETag']
+
+        res = self.client.get(
+            RECIPES_URL,
+            {'tags': '1'},
+            HTTP_IF_NONE_MATCH=etag
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_link_change_modifies_detail(self):
+        """Test adding a tag makes the previous detail ETag stale"""
+        url = detail_url(self.recipe.id)
+        etag = self.client.get(url)['ETag']
+        self.recipe.tags.add(Tag.objects.create(user=self.user, name='Sweet'))
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['tags'][0]['name'], 'Sweet')
+
+    def test_tag_rename_touches_recipes(self):
+        """Test renaming a linked tag updates the recipe timestamp"""
+        tag = Tag.objects.create(user=self.user, name='Sweet')
+        self.recipe.tags.add(tag)
+        Recipe.objects.filter(pk=self.recipe.pk).update(
+            updated_at=timezone.now() - datetime.timedelta(days=1)
+        )
+
+        tag.name = 'Savoury'
+        tag.save()
+
+        self.recipe.refresh_from_db()
+        self.assertGreater(
+            self.recipe.updated_at,
+            timezone.now() - datetime.timedelta(minutes=1)
+        )
+
+    def test_reverse_clear_touches_recipes(self):
+        """Test clearing a tag's recipes updates their timestamps"""
+        tag = Tag.objects.create(user=self.user, name='Sweet')
+        self.recipe.tags.add(tag)
+        Recipe.objects.filter(pk=self.recipe.pk).update(
+            updated_at=timezone.now() - datetime.timedelta(days=1)
+        )
+
+        tag.recipe_set.clear()
+
+        self.recipe.refresh_from_db()
+        self.assertGreater(
+            self.recipe.updated_at,
+            timezone.now() - datetime.timedelta(minutes=1)
+        )
+
+    def test_if_modified_since_not_modified(self):
+        """Test an up to date If-Modified-Since gets a detail 304"""
+        since = http_date(
+            (timezone.now() + datetime.timedelta(minutes=1)).timestamp()
+        )
+
+        res = self.client.get(
+            detail_url(self.recipe.id),
+            HTTP_IF_MODIFIED_SINCE=since
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_missing_recipe_not_found(self):
+        """Test a conditional request for a missing recipe is a 404"""
+        res = self.client.get(detail_url(0), HTTP_IF_NONE_MATCH='*')
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
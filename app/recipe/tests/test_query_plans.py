@@ -0,0 +1,146 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core.models import Tag, Ingredient, Recipe
+from recipe import views
+
+
+SQLITE_TABLE_SCAN = re.compile(r'\bSCAN (?:TABLE )?(\w+)$')
+
+
+def viewset_queryset(viewset_class, user, action='list', **params):
+    """Return the queryset a viewset builds for a request"""
+    request = Request(APIRequestFactory().get('/', params))
+    request.user = user
+    view = viewset_class(
+        action=action,
+        request=request,
+        format_kwarg=None,
+        kwargs={}
+    )
+
+    return view.get_queryset()
+
+
+class QueryPlanTests(TestCase):
+    """Test the viewset querysets are answered from indexes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        users = [
+            get_user_model().objects.create_user(
+                f'user{i}@test.com',
+                'password123'
+            )
+            for i in range(3)
+        ]
+        for user in users:
+            tags = [
+                Tag.objects.create(user=user, name=f'Tag {i}')
+                for i in range(10)
+            ]
+            ingredients = [
+                Ingredient.objects.create(user=user, name=f'Ingredient {i}')
+                for i in range(10)
+            ]
+            for i in range(10):
+                recipe = Recipe.objects.create(
+                    user=user,
+                    title=f'Recipe {i}',
+                    time_minutes=10,
+                    price=5.00
+                )
+                recipe.tags.add(*tags[:i])
+                recipe.ingredients.add(*ingredients[:i])
+        cls.user = users[0]
+        cls.tag = Tag.objects.filter(user=cls.user).first()
+        cls.ingredient = Ingredient.objects.filter(user=cls.user).first()
+
+    def explain(self, queryset):
+        """Return the query plan of a queryset with seq scans discouraged"""
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+        return queryset.explain()
+
+    def assertNoSequentialScan(self, queryset):
+        plan = self.explain(queryset)
+        if connection.vendor == 'postgresql':
+            self.assertNotIn('Seq Scan', plan, plan)
+        elif connection.vendor == 'sqlite':
+            for line in plan.splitlines():
+                self.assertIsNone(
+                    SQLITE_TABLE_SCAN.search(line.strip()),
+                    plan
+                )
+
+    def test_tag_list_plan(self):
+        """Test listing tags uses an index"""
+        self.assertNoSequentialScan(
+            viewset_queryset(views.TagViewSet, self.user)
+        )
+
+    def test_assigned_tag_list_plan(self):
+        """Test listing assigned tags uses an index"""
+        self.assertNoSequentialScan(
+            viewset_queryset(views.TagViewSet, self.user, assigned_only=1)
+        )
+
+    def test_ingredient_list_plan(self):
+        """Test listing ingredients uses an index"""
+        self.assertNoSequentialScan(
+            viewset_queryset(views.IngredientViewSet, self.user)
+        )
+
+    def test_assigned_ingredient_list_plan(self):
+        """Test listing assigned ingredients uses an index"""
+        self.assertNoSequentialScan(
+            viewset_queryset(
+                views.IngredientViewSet,
+                self.user,
+                assigned_only=1
+            )
+        )
+
+    def test_recipe_list_plan(self):
+        """Test listing recipes uses an index"""
+        self.assertNoSequentialScan(
+            viewset_queryset(views.RecipeViewSet, self.user)
+        )
+
+    def test_recipe_list_filtered_by_tags_plan(self):
+        """Test filtering recipes by tag uses an index"""
+        self.assertNoSequentialScan(
+            viewset_queryset(
+                views.RecipeViewSet,
+                self.user,
+                tags=str(self.tag.id)
+            )
+        )
+
+    def test_recipe_list_filtered_by_ingredients_plan(self):
+        """Test filtering recipes by ingredient uses an index"""
+        self.assertNoSequentialScan(
+            viewset_queryset(
+                views.RecipeViewSet,
+                self.user,
+                ingredients=str(self.ingredient.id)
+            )
+        )
+
+    def test_recipe_detail_plan(self):
+        """Test retrieving a recipe uses an index"""
+        recipe = Recipe.objects.filter(user=self.user).first()
+        queryset = viewset_queryset(
+            views.RecipeViewSet,
+            self.user,
+            action='retrieve'
+        )
+
+        self.assertNoSequentialScan(queryset.filter(pk=recipe.pk))
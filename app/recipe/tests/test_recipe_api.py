@@ -1,3 +1,4 @@
+import io
 import tempfile
 import os
 
@@ -5,11 +6,14 @@ from PIL import Image
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from core.models import Recipe, Tag, Ingredient
+from core.models import Recipe, Tag, Ingredient, ImageJob
+from recipe.cache import invalidate_user
 from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
 
 RECIPES_URL = reverse('recipe:recipe-list')
@@ -86,7 +90,7 @@ class PrivateRecipeApiTests(TestCase):
         serializer = RecipeSerializer(recipies, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_recipe_limited_to_user(self):
 
@@ -104,8 +108,76 @@ class PrivateRecipeApiTests(TestCase):
         serializer = RecipeSerializer(recipies, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'], serializer.data)
+
+    def test_recipes_paginated_by_cursor(self):
+        """Test walking the recipe list page by page with a cursor"""
+        recipes = [sample_recipe(user=self.user) for _ in range(5)]
+
+        res = self.client.get(RECIPES_URL, {'page_size': 2})
+        seen = [recipe['id'] for recipe in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            seen.extend(recipe['id'] for recipe in res.data['results'])
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(seen, [recipe.id for recipe in reversed(recipes)])
+
+    def test_recipe_page_size_is_capped(self):
+        """Test the requested page size cannot exceed the maximum"""
+        sample_recipe(user=self.user)
+
+        res = self.client.get(RECIPES_URL, {'page_size': 100000})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertIsNone(res.data['next'])
+
+    def test_filter_recipes_returns_each_recipe_once(self):
+        """Test a recipe matching several requested tags is not repeated"""
+        recipe = sample_recipe(user=self.user)
+        tag1 = sample_tag(user=self.user, name='Vegan')
+        tag2 = sample_tag(user=self.user, name='Dessert')
+        recipe.tags.add(tag1, tag2)
+
+        res = self.client.get(
+            RECIPES_URL,
+            {'tags': '{},{}'.format(tag1.id, tag2.id)}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_filter_recipes_matching_all_tags(self):
+        """Test match=all only returns recipes with every requested tag"""
+        tag1 = sample_tag(user=self.user, name='Vegan')
+        tag2 = sample_tag(user=self.user, name='Dessert')
+        ingredient = sample_ingredient(user=self.user)
+        recipe1 = sample_recipe(user=self.user, title='Vegan cake')
+        recipe1.tags.add(tag1, tag2)
+        recipe1.ingredients.add(ingredient)
+        recipe2 = sample_recipe(user=self.user, title='Vegan curry')
+        recipe2.tags.add(tag1)
+        recipe2.ingredients.add(ingredient)
+
+        res = self.client.get(RECIPES_URL, {
+            'tags': '{},{},{}'.format(tag1.id, tag2.id, tag2.id),
+            'ingredients': str(ingredient.id),
+            'match': 'all',
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [recipe['id'] for recipe in res.data['results']],
+            [recipe1.id]
+        )
+
+    def test_filter_recipes_invalid_match(self):
+        """Test an unknown match mode is rejected"""
+        res = self.client.get(RECIPES_URL, {'tags': '1', 'match': 'some'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
     def test_view_recipe_detail(self):
         """Test viewing a recipe detail"""
@@ -177,6 +249,51 @@ class PrivateRecipeApiTests(TestCase):
         self.assertIn(ingredient1, ingredients)
         self.assertIn(ingredient2, ingredients)
 
+    def test_recipe_creation_with_invalid_ingredients(self):
+        """Test every missing or foreign id is reported at once"""
+        user2 = get_user_model().objects.create_user(
+            'other@test.com',
+            'password1234'
+        )
+        foreign = sample_ingredient(user=user2, name='Saffron')
+        own = sample_ingredient(user=self.user, name='Salt')
+        payload = {
+            'title': 'Paella',
+            'ingredients': [own.id, foreign.id, foreign.id + 100],
+            'tags': [],
+            'time_minutes': 60,
+            'price': 20.00
+        }
+
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(res.data['ingredients']), 2)
+        self.assertIn(str(foreign.id), res.data['ingredients'][0])
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_recipe_creation_queries_independent_of_ingredients(self):
+        """Test validating ingredients takes one query however many"""
+        ingredients = [
+            sample_ingredient(user=self.user, name=f'Ingredient {i}')
+            for i in range(40)
+        ]
+        query_counts = []
+        for count in (1, 40):
+            payload = {
+                'title': 'Stew',
+                'ingredients': [i.id for i in ingredients[:count]],
+                'tags': [],
+                'time_minutes': 60,
+                'price': 20.00
+            }
+            with CaptureQueriesContext(connection) as queries:
+                res = self.client.post(RECIPES_URL, payload, format='json')
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            query_counts.append(len(queries))
+
+        self.assertEqual(query_counts[0], query_counts[1])
+
 
 class RecipeImageUploadTests(TestCase):
 
@@ -206,12 +323,104 @@ class RecipeImageUploadTests(TestCase):
         self.assertIn('image', res.data)
         self.assertTrue(os.path.exists(self.recipe.image.path))
 
+    def test_upload_image_queues_processing(self):
+        """Test an uploaded image is queued for variant processing"""
+        url = generate_image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+            img = Image.new('RGB', (10, 10))
+            img.save(ntf, format="JPEG")
+            ntf.seek(0)
+            res = self.client.post(url, {'image': ntf}, format='multipart')
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(res.data['image_status'], Recipe.IMAGE_PENDING)
+        self.assertEqual(res.data['image_variants'], [])
+        self.assertTrue(ImageJob.objects.filter(
+            recipe=self.recipe,
+            source=self.recipe.image.name
+        ).exists())
+
     def test_image_bad_request(self):
         """Test uploading an invalid iamge"""
         url = generate_image_upload_url(self.recipe.id)
         res = self.client.post(url, {'image': 'notimage'}, format='multipart')
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def post_image_file(self, content, suffix='.jpg'):
+        """Upload raw file content to the recipe"""
+        url = generate_image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix=suffix) as ntf:
+            ntf.write(content)
+            ntf.seek(0)
+
+            return self.client.post(url, {'image': ntf}, format='multipart')
+
+    @override_settings(RECIPE_IMAGE_MAX_BYTES=1024)
+    def test_image_declared_too_large(self):
+        """Test an upload declaring too large a body is not read"""
+        res = self.post_image_file(b'x' * (128 * 1024))
+
+        self.assertEqual(
+            res.status_code,
+            status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        )
+
+    @override_settings(RECIPE_IMAGE_MAX_BYTES=1024)
+    def test_image_streamed_too_large(self):
+        """Test an upload is stopped once it exceeds the byte limit"""
+        img = Image.new('RGB', (100, 100))
+        buffer = io.BytesIO()
+        img.save(buffer, format='BMP')
+
+        res = self.post_image_file(buffer.getvalue(), suffix='.png')
+
+        self.assertEqual(
+            res.status_code,
+            status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        )
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image)
+
+    def test_image_unsupported_content_type(self):
+        """Test an upload that is not declared as an image is refused"""
+        res = self.post_image_file(b'plain text', suffix='.txt')
+
+        self.assertEqual(
+            res.status_code,
+            status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+        )
+
+    def test_image_unsupported_format(self):
+        """Test the sniffed image format has to be allowed"""
+        img = Image.new('RGB', (10, 10))
+        buffer = io.BytesIO()
+        img.save(buffer, format='BMP')
+
+        res = self.post_image_file(buffer.getvalue())
+
+        self.assertEqual(
+            res.status_code,
+            status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+        )
+
+    @override_settings(RECIPE_IMAGE_MAX_PIXELS=100)
+    def test_image_too_many_pixels(self):
+        """Test images over the pixel limit are refused from the header"""
+        img = Image.new('RGB', (20, 20))
+        buffer = io.BytesIO()
+        img.save(buffer, format='PNG')
+
+        res = self.post_image_file(buffer.getvalue(), suffix='.png')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('too large', res.data['image'][0])
+
+    def test_image_content_not_an_image(self):
+        """Test content declared as an image has to parse as one"""
+        res = self.post_image_file(b'not an image')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_filter_recipes_by_tags(self):
         """Test returning recipies with specific tags"""
 
@@ -232,9 +441,9 @@ class RecipeImageUploadTests(TestCase):
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
 
     def test_filter_recipes_by_ingredients(self):
         """Test returning recipies with specific ingredients"""
@@ -256,6 +465,74 @@ class RecipeImageUploadTests(TestCase):
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
+
+
+class RecipeQueryCountTests(TestCase):
+    """Test the recipe endpoints run a fixed number of queries"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            'password1234'
+        )
+        self.client.force_authenticate(self.user)
+        self.tag = sample_tag(user=self.user)
+        self.ingredient = sample_ingredient(user=self.user)
+
+    def create_recipes(self, count):
+        """Bulk create recipes each linked to a tag and an ingredient"""
+        recipes = Recipe.objects.bulk_create([
+            Recipe(user=self.user, title=f'Recipe {i}', time_minutes=5,
+                   price=1.00)
+            for i in range(count)
+        ])
+        if not recipes[0].pk:
+            recipes = Recipe.objects.filter(user=self.user)
+            recipes = list(recipes.order_by('-id')[:count])
+        Recipe.tags.through.objects.bulk_create([
+            Recipe.tags.through(recipe_id=recipe.pk, tag_id=self.tag.pk)
+            for recipe in recipes
+        ])
+        Recipe.ingredients.through.objects.bulk_create([
+            Recipe.ingredients.through(
+                recipe_id=recipe.pk,
+                ingredient_id=self.ingredient.pk
+            )
+            for recipe in recipes
+        ])
+        invalidate_user(self.user.id)
+
+        return recipes
+
+    def test_list_query_count_is_constant(self):
+        """Test listing recipes does not query per recipe"""
+        created = 0
+        for count in (1, 50, 500):
+            self.create_recipes(count - created)
+            created = count
+
+            # Freshness check, recipes and one query per relation
+            with self.assertNumQueries(4):
+                res = self.client.get(RECIPES_URL)
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(res.data['results'][0]['tags'], [self.tag.id])
+            self.assertEqual(
+                res.data['results'][0]['ingredients'],
+                [self.ingredient.id]
+            )
+
+    def test_detail_query_count_is_constant(self):
+        """Test retrieving a recipe loads its relations in bulk"""
+        recipe = self.create_recipes(1)[0]
+
+        # Freshness check, recipe and one query per relation
+        with self.assertNumQueries(5):
+            res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['tags'][0]['name'], self.tag.name)
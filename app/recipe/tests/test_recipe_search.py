@@ -0,0 +1,133 @@
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+RECIPES_URL = reverse('recipe:recipe-list')
+RECIPES_BULK_URL = reverse('recipe:recipe-bulk')
+
+
+def sample_recipe(user, title, tags=(), ingredients=()):
+    """Create and return a recipe linked to tags and ingredients by name"""
+    recipe = Recipe.objects.create(
+        user=user,
+        title=title,
+        time_minutes=10,
+        price=5.00
+    )
+    recipe.tags.set([
+        Tag.objects.get_or_create(user=user, name=name)[0] for name in tags
+    ])
+    recipe.ingredients.set([
+        Ingredient.objects.get_or_create(user=user, name=name)[0]
+        for name in ingredients
+    ])
+
+    return recipe
+
+
+class RecipeSearchApiTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            'password1234'
+        )
+        self.client.force_authenticate(self.user)
+
+    def search(self, text, **params):
+        res = self.client.get(RECIPES_URL, {'search': text, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return res
+
+    def titles(self, text):
+        return [
+            recipe['title'] for recipe in self.search(text).data['results']
+        ]
+
+    def test_search_title_and_names(self):
+        """Test matching titles and linked ingredient and tag names"""
+        sample_recipe(self.user, 'Thai green curry', tags=['Spicy'])
+        sample_recipe(self.user, 'Porridge', ingredients=['Oats'])
+        sample_recipe(self.user, 'Toast')
+
+        self.assertEqual(self.titles('curry'), ['Thai green curry'])
+        self.assertEqual(self.titles('spicy'), ['Thai green curry'])
+        self.assertEqual(self.titles('OATS'), ['Porridge'])
+        self.assertEqual(self.titles('pancakes'), [])
+
+    def test_search_prefixes_all_terms(self):
+        """Test every term has to prefix a word"""
+        sample_recipe(self.user, 'Chicken tikka masala')
+        sample_recipe(self.user, 'Chicken soup')
+
+        self.assertEqual(self.titles('chick tik'), ['Chicken tikka masala'])
+        self.assertEqual(len(self.titles('chick')), 2)
+        self.assertEqual(self.titles('icken'), [])
+
+    def test_search_ranks_title_matches_first(self):
+        """Test a title match outranks a match on a linked name"""
+        sample_recipe(self.user, 'Tomato soup')
+        sample_recipe(self.user, 'Basil pasta', ingredients=['Tomato'])
+
+        self.assertEqual(self.titles('tomato'), ['Tomato soup', 'Basil pasta'])
+
+    def test_search_follows_changed_links_and_names(self):
+        """Test the index follows relinked, renamed and deleted names"""
+        recipe = sample_recipe(self.user, 'Stew', tags=['Winter'])
+        tag = Tag.objects.get(name='Winter')
+
+        tag.name = 'Autumn'
+        tag.save()
+        self.assertEqual(self.titles('winter'), [])
+        self.assertEqual(self.titles('autumn'), ['Stew'])
+
+        tag.delete()
+        self.assertEqual(self.titles('autumn'), [])
+
+        recipe.title = 'Goulash'
+        recipe.save()
+        self.assertEqual(self.titles('goulash'), ['Goulash'])
+
+    def test_search_limited_to_user(self):
+        """Test other users' recipes are not searched"""
+        other = get_user_model().objects.create_user('other@test.com')
+        sample_recipe(other, 'Secret sauce')
+
+        self.assertEqual(self.titles('secret'), [])
+
+    def test_search_paginates_by_rank(self):
+        """Test pages follow the ranking without repeating recipes"""
+        for index in range(5):
+            sample_recipe(self.user, f'Bean salad {index}')
+            sample_recipe(self.user, f'Rice {index}', ingredients=['Beans'])
+
+        titles = []
+        res = self.search('bean', page_size=3)
+        while True:
+            titles += [recipe['title'] for recipe in res.data['results']]
+            if not res.data['next']:
+                break
+            res = self.client.get(res.data['next'])
+
+        self.assertEqual(len(titles), 10)
+        self.assertEqual(len(set(titles)), 10)
+        self.assertTrue(all(t.startswith('Bean') for t in titles[:5]))
+
+    def test_search_bulk_created(self):
+        """Test recipes written in bulk are searchable"""
+        tag = Tag.objects.create(user=self.user, name='Brunch')
+        res = self.client.post(RECIPES_BULK_URL, [
+            {'title': 'Eggs benedict', 'time_minutes': 10, 'price': '5.00',
+             'tags': [tag.id], 'ingredients': []},
+        ], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        self.assertEqual(self.titles('brunch'), ['Eggs benedict'])
@@ -0,0 +1,129 @@
+import hashlib
+
+from django.conf import settings
+from django.core.files.uploadhandler import StopUpload, \
+                                           TemporaryFileUploadHandler
+from django.http import QueryDict
+from django.utils.datastructures import MultiValueDict
+from PIL import Image, ImageFile
+from rest_framework import status
+
+# Room for the multipart boundaries and headers around the file itself
+MULTIPART_OVERHEAD = 64 * 1024
+
+# Bytes an image has to identify itself in before the upload is refused
+HEADER_LIMIT = 64 * 1024
+
+
+class StreamingImageUploadHandler(TemporaryFileUploadHandler):
+    """Validate an image upload while it streams to a temporary file
+
+    The declared length, content type, byte size, format and pixel
+    dimensions are checked as data arrives, so a rejected upload is
+    dropped without being buffered. Accepted chunks go straight to a
+    temporary file under FILE_UPLOAD_TEMP_DIR, which storage moves into
+    place without copying when it is on the same filesystem. The SHA-256
+    of the content is computed on the way and set as file.sha256.
+
+    After the request data is parsed, error and status_code describe why
+    the upload was rejected.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.error = None
+        self.status_code = None
+
+    def reject(self, status_code, error):
+        """Record why the upload is refused and stop reading it"""
+        self.status_code = status_code
+        self.error = error
+        raise StopUpload(connection_reset=True)
+
+    def handle_raw_input(self, input_data, META, content_length, boundary,
+                         encoding=None):
+        limit = settings.RECIPE_IMAGE_MAX_BYTES + MULTIPART_OVERHEAD
+        if content_length > limit:
+            self.status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+            self.error = 'Upload exceeds the maximum image size.'
+            # Returning a result skips reading the body at all
+            return QueryDict(encoding=encoding), MultiValueDict()
+
+        return None
+
+    def new_file(self, field_name, file_name, content_type, content_length,
+                 charset=None, content_type_extra=None):
+        if content_type not in settings.RECIPE_IMAGE_CONTENT_TYPES:
+            self.reject(
+                status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                f'Unsupported image content type "{content_type}".'
+            )
+        super().new_file(field_name, file_name, content_type,
+                         content_length, charset, content_type_extra)
+        self.received = 0
+        self.hasher = hashlib.sha256()
+        self.parser = ImageFile.Parser()
+        self.image_format = None
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.RECIPE_IMAGE_MAX_BYTES:
+            self.reject(
+                status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                'Upload exceeds the maximum image size.'
+            )
+        if self.image_format is None:
+            self.inspect_header(raw_data)
+        self.hasher.update(raw_data)
+
+        return super().receive_data_chunk(raw_data, start)
+
+    def inspect_header(self, raw_data):
+        """Feed the parser until the image format and size are known"""
+        try:
+            self.parser.feed(raw_data)
+        except Image.DecompressionBombError:
+            self.reject(
+                status.HTTP_400_BAD_REQUEST,
+                'Image dimensions are too large.'
+            )
+        except Exception:
+            self.reject(
+                status.HTTP_400_BAD_REQUEST,
+                'Upload a valid image.'
+            )
+        image = self.parser.image
+        if image is None:
+            if self.received > HEADER_LIMIT:
+                self.reject(
+                    status.HTTP_400_BAD_REQUEST,
+                    'Upload a valid image.'
+                )
+            return
+
+        width, height = image.size
+        if image.format not in settings.RECIPE_IMAGE_FORMATS:
+            self.reject(
+                status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                f'Unsupported image format "{image.format}".'
+            )
+        if width * height > settings.RECIPE_IMAGE_MAX_PIXELS:
+            self.reject(
+                status.HTTP_400_BAD_REQUEST,
+                'Image dimensions are too large.'
+            )
+        self.image_format = image.format
+        # Only the header was needed, drop the partially decoded image
+        self.parser = None
+
+    def file_complete(self, file_size):
+        if self.image_format is None:
+            self.status_code = status.HTTP_400_BAD_REQUEST
+            self.error = 'Upload a valid image.'
+            self.file.close()
+            return None
+
+        file = super().file_complete(file_size)
+        file.sha256 = self.hasher.hexdigest()
+
+        return file
@@ -1,9 +1,9 @@
 from django.urls import path, include
-from rest_framework.routers import DefaultRouter
 
 from recipe import views
+from recipe.routers import AsyncReadRouter
 
-router = DefaultRouter()
+router = AsyncReadRouter()
 
 router.register('tags', views.TagViewSet)
 router.register('ingredients', views.IngredientViewSet)
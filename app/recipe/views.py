@@ -1,32 +1,83 @@
+from django.db.models import Count, Exists, OuterRef, Prefetch
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework import viewsets, mixins, status, permissions
-from rest_framework_simplejwt.authentication import JWTAuthentication
 
+from core.images import enqueue_image_processing
 from core.models import Tag, Ingredient, Recipe
+from core.search import search
+from recipe.autocomplete import autocomplete
 from recipe import serializers
+from recipe.bulk import BulkModelMixin
+from recipe.cache import cached_per_user
+from recipe.conditional import conditional_read
+from recipe.uploadhandlers import StreamingImageUploadHandler
+from recipe.pagination import RecipeAttrCursorPagination, \
+                              RecipeCursorPagination
+from user.authentication import StatelessJWTAuthentication
 
 
-class BaseRecipeAttrViewset(viewsets.GenericViewSet,
+class BaseRecipeAttrViewset(BulkModelMixin,
+                            viewsets.GenericViewSet,
                             mixins.ListModelMixin,
                             mixins.CreateModelMixin):
     """Base Viewset for user owned recipe attributes"""
-    authentication_classes = (JWTAuthentication, )
+    authentication_classes = (StatelessJWTAuthentication, )
     permission_classes = (permissions.IsAuthenticated, )
+    pagination_class = RecipeAttrCursorPagination
+    autocomplete_limit = 10
+    autocomplete_max_limit = 50
 
     def get_queryset(self):
         """Return objects for the current authenticated user"""
         assigned_only = bool(
             int(self.request.query_params.get('assigned_only', 0))
         )
-        queryset = self.queryset
+        queryset = self.queryset.filter(user=self.request.user)
         if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False)
-
-            return queryset.filter(
-                user=self.request.user
-            ).order_by('-name').distinct()
-        return self.queryset.filter(user=self.request.user).order_by('-name')
+            # Semi-join on the through table, each row is probed once
+            # instead of joining and de-duplicating every recipe link
+            queryset = queryset.filter(Exists(self._get_recipe_links()))
+
+        return queryset.order_by('-name', 'id')
+
+    @cached_per_user
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @action(methods=['GET'], detail=False)
+    @cached_per_user
+    def autocomplete(self, request):
+        """Return the names closest to q, ties starting with it first"""
+        text = request.query_params.get('q', '').strip()
+        try:
+            limit = int(request.query_params.get(
+                'limit',
+                self.autocomplete_limit
+            ))
+        except ValueError:
+            limit = 0
+        if not 0 < limit <= self.autocomplete_max_limit:
+            raise ValidationError({'limit': [
+                f'Must be between 1 and {self.autocomplete_max_limit}.'
+            ]})
+        matches = autocomplete(
+            self.queryset.filter(user=request.user),
+            request.user.id,
+            text,
+            limit
+        ) if text else []
+
+        return Response(self.get_serializer(matches, many=True).data)
+
+    def _get_recipe_links(self):
+        """Return the recipe links pointing at the outer queryset row"""
+        relation = self.queryset.model._meta.get_field('recipe')
+
+        return relation.through.objects.filter(**{
+            relation.field.m2m_reverse_field_name(): OuterRef('pk')
+        })
 
     def perform_create(self, serializer):
         """Create a new tag"""
@@ -47,12 +98,14 @@ class IngredientViewSet(BaseRecipeAttrViewset):
     serializer_class = serializers.IngredientSerializer
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(BulkModelMixin, viewsets.ModelViewSet):
 
     serializer_class = serializers.RecipeSerializer
-    queryset = Recipe.objects.all()
-    authentication_classes = (JWTAuthentication, )
+    # The search vector is only read by the database
+    queryset = Recipe.objects.defer('search_vector')
+    authentication_classes = (StatelessJWTAuthentication, )
     permission_classes = (permissions.IsAuthenticated, )
+    pagination_class = RecipeCursorPagination
 
     def _params_to_ints(self, qs):
         """Convert a list of string IDs to a list of integers"""
@@ -62,15 +115,85 @@ class RecipeViewSet(viewsets.ModelViewSet):
         """Retrieve the recipes for the authenticated user"""
         tags = self.request.query_params.get('tags')
         ingredients = self.request.query_params.get('ingredients')
-        queryset = self.queryset
+        match = self.request.query_params.get('match', 'any')
+        text = self.request.query_params.get('search')
+        if match not in ('any', 'all'):
+            raise ValidationError({'match': ['Must be "any" or "all".']})
+        queryset = self.queryset.filter(user=self.request.user)
         if tags:
             tag_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
+            queryset = queryset.filter(self._matching_links(
+                Recipe.tags.through, 'tag_id', tag_ids, match
+            ))
         if ingredients:
             ingredient_ids = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredient_ids)
+            queryset = queryset.filter(self._matching_links(
+                Recipe.ingredients.through, 'ingredient_id', ingredient_ids,
+                match
+            ))
+
+        if text:
+            # Ranked, the pagination orders by the rank
+            queryset = search(queryset, text)
+
+        queryset = queryset.order_by('-id')
+
+        return queryset.prefetch_related(*self._get_prefetch_plan())
 
-        return queryset.filter(user=self.request.user)
+    def _matching_links(self, through, field, ids, match):
+        """Return an EXISTS condition on the recipe's links to ids
+
+        Each recipe is probed through the (recipe_id, <field>) unique index
+        so a recipe is returned once however many of the ids it matches.
+        """
+        ids = set(ids)
+        links = through.objects.filter(
+            recipe_id=OuterRef('pk'),
+            **{f'{field}__in': ids}
+        )
+        if match == 'all':
+            links = links.values('recipe_id').annotate(
+                matched=Count('pk')
+            ).filter(matched=len(ids))
+
+        return Exists(links)
+
+    def _get_prefetch_plan(self):
+        """Return the relations the current serializer class will read"""
+        serializer_class = self.get_serializer_class()
+        if issubclass(serializer_class, serializers.RecipeDetailSerializer):
+            # Nested serializers need the full related rows
+            return ('ingredients', 'tags', 'image_variants')
+        if issubclass(serializer_class, serializers.RecipeSerializer):
+            # Primary key fields only need the ids of the related rows
+            return (
+                Prefetch(
+                    'ingredients',
+                    queryset=Ingredient.objects.only('id')
+                ),
+                Prefetch('tags', queryset=Tag.objects.only('id')),
+            )
+        if issubclass(serializer_class, serializers.RecipeImageSerializer):
+            return ('image_variants',)
+        return ()
+
+    @conditional_read
+    @cached_per_user
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional_read
+    @cached_per_user
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    def initialize_request(self, request, *args, **kwargs):
+        """Validate image uploads while they stream in"""
+        request = super().initialize_request(request, *args, **kwargs)
+        if self.action == 'upload_image':
+            request.upload_handlers = [StreamingImageUploadHandler(request)]
+
+        return request
 
     def get_serializer_class(self):
         """Return appropriate serializer class"""
@@ -86,17 +209,25 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
     @action(methods=['POST'], detail=True, url_path='upload-image')
     def upload_image(self, request, pk=None):
-        """Upload an image to a recipe"""
+        """Upload an image to a recipe, variants are rendered by a worker"""
         recipe = self.get_object()
+        data = request.data
+        handler = request.upload_handlers[0]
+        if handler.error:
+            return Response(
+                {'image': [handler.error]},
+                status=handler.status_code
+            )
         serializer = self.get_serializer(
             recipe,
-            data=request.data
+            data=data
         )
 
         if serializer.is_valid():
-            serializer.save()
+            recipe = serializer.save()
+            enqueue_image_processing(recipe)
             return Response(
-                serializer.data,
+                self.get_serializer(recipe).data,
                 status=status.HTTP_200_OK
             )
 
@@ -0,0 +1,218 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import router
+from django.db.models import DEFERRED
+from django.utils.crypto import constant_time_compare
+from rest_framework import exceptions
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+# Claims added to issued tokens so the user can be built without a query
+USER_CLAIMS = ('email', 'is_active', 'is_staff')
+AUTH_HASH_CLAIM = 'auth'
+AUTH_HASH_LENGTH = 16
+
+
+class TTLCache:
+    """Small in-process mapping whose entries expire after ttl seconds"""
+
+    def __init__(self, ttl, maxsize=10000):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return default
+            expires, value = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+                return default
+
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries.pop(key, None)
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+revocations = TTLCache(settings.JWT_REVOCATION_CACHE_TTL)
+token_results = TTLCache(settings.AUTH_TOKEN_CACHE_TTL)
+
+
+def auth_hash(user):
+    """Return the fingerprint of the user's password carried by tokens"""
+    return user.get_session_auth_hash()[:AUTH_HASH_LENGTH]
+
+
+def add_user_claims(token, user):
+    """Add the claims StatelessJWTAuthentication builds the user from"""
+    for claim in USER_CLAIMS:
+        token[claim] = getattr(user, claim)
+    token[AUTH_HASH_CLAIM] = auth_hash(user)
+
+    return token
+
+
+def get_revocation_state(user_id):
+    """Return whether the user is active and their current auth hash
+
+    Cached in process for JWT_REVOCATION_CACHE_TTL seconds, saving a user
+    drops the entry in this process.
+    """
+    state = revocations.get(user_id)
+    if state is None:
+        user = get_user_model().objects.filter(pk=user_id).only(
+            'password',
+            'is_active'
+        ).first()
+        state = (user.is_active, auth_hash(user)) if user else (False, '')
+        revocations.set(user_id, state)
+
+    return state
+
+
+def build_user(db, values):
+    """Return a user from field values without a query, others deferred
+
+    Deferred fields load from the database on first access, so views that
+    need the full user still get it.
+    """
+    User = get_user_model()
+
+    return User.from_db(db, list(values), [
+        values.get(field.attname, DEFERRED)
+        for field in User._meta.concrete_fields
+    ])
+
+
+def snapshot_user(user):
+    """Return what build_user needs to recreate a loaded user"""
+    return user._state.db, {
+        field.attname: user.__dict__[field.attname]
+        for field in user._meta.concrete_fields
+        if field.attname in user.__dict__
+    }
+
+
+def claims_user(validated_token):
+    """Return a user built from token claims"""
+    User = get_user_model()
+    values = {
+        User._meta.pk.attname: validated_token[api_settings.USER_ID_CLAIM],
+    }
+    values.update((claim, validated_token[claim]) for claim in USER_CLAIMS)
+
+    return build_user(router.db_for_read(User), values)
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """JWT authentication that trusts the claims of a verified token
+
+    The user is not loaded per request. Revocation, by deactivating the
+    user or changing their password, is checked against a short lived
+    in-process cache. Tokens issued without the user claims fall back to
+    loading the user.
+    """
+
+    def get_user(self, validated_token):
+        if not self.has_user_claims(validated_token):
+            return super().get_user(validated_token)
+
+        self.check_revocation(validated_token)
+
+        return claims_user(validated_token)
+
+    def has_user_claims(self, validated_token):
+        return all(
+            claim in validated_token
+            for claim in USER_CLAIMS + (AUTH_HASH_CLAIM,)
+        )
+
+    def check_revocation(self, validated_token):
+        """Raise AuthenticationFailed if the token has been revoked"""
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('Token contained no recognizable user '
+                               'identification')
+
+        is_active, current_hash = get_revocation_state(user_id)
+        if not is_active:
+            raise exceptions.AuthenticationFailed('User is inactive',
+                                                  code='user_inactive')
+        if not constant_time_compare(
+            validated_token[AUTH_HASH_CLAIM],
+            current_hash
+        ):
+            raise exceptions.AuthenticationFailed('Token has been revoked',
+                                                  code='token_revoked')
+
+
+class CachedJWTAuthentication(StatelessJWTAuthentication):
+    """Stateless JWT authentication remembering the result per token
+
+    Successes and failures are kept for AUTH_TOKEN_CACHE_TTL seconds, so a
+    client retrying a bad or unknown token is answered from memory. Hits
+    still honour the token expiry and revocation. Successes of tokens
+    without the user claims are not kept, a hit could not check their
+    revocation.
+    """
+
+    def authenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        key = hashlib.sha256(raw_token).hexdigest()
+        result = token_results.get(key)
+        if result is not None and not isinstance(result[0], type) and \
+                result[1]['exp'] <= time.time():
+            token_results.delete(key)
+            result = None
+        if result is None:
+            try:
+                validated_token = self.get_validated_token(raw_token)
+                user = self.get_user(validated_token)
+            except exceptions.AuthenticationFailed as exc:
+                token_results.set(key, (type(exc), exc.detail))
+                raise
+            if self.has_user_claims(validated_token):
+                token_results.set(
+                    key,
+                    (snapshot_user(user), validated_token)
+                )
+
+            return user, validated_token
+
+        if isinstance(result[0], type):
+            error_class, detail = result
+            raise error_class(detail)
+
+        (db, values), validated_token = result
+        self.check_revocation(validated_token)
+
+        return build_user(db, values), validated_token
@@ -0,0 +1,12 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from user.authentication import revocations
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def forget_revocation_state(sender, instance, **kwargs):
+    """Recheck a saved user's tokens on their next request"""
+    revocations.delete(instance.pk)
@@ -0,0 +1,208 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import exceptions, status
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from core.models import Recipe
+from user.authentication import CachedJWTAuthentication, \
+                                StatelessJWTAuthentication, add_user_claims, \
+                                revocations, token_results
+
+
+CREATE_USER_URL = reverse('user:create')
+USER_GETTOKEN_URL = reverse('user:token_obtain_pair')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def authenticate(token, authentication=StatelessJWTAuthentication):
+    """Authenticate a request carrying token"""
+    request = APIRequestFactory().get(
+        '/',
+        HTTP_AUTHORIZATION=f'Bearer {token}'
+    )
+
+    return authentication().authenticate(request)
+
+
+class StatelessJWTAuthenticationTests(TestCase):
+
+    def setUp(self):
+        revocations.clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@test.com',
+            password='testpass',
+            name='Joe Bloggs'
+        )
+        self.client = APIClient()
+        res = self.client.post(USER_GETTOKEN_URL, {
+            'email': 'test@test.com',
+            'password': 'testpass'
+        })
+        self.access = res.data['access']
+        self.refresh = res.data['refresh']
+
+    def test_token_carries_user_claims(self):
+        """Test issued tokens carry the claims the user is built from"""
+        token = AccessToken(self.access)
+
+        self.assertEqual(token['email'], self.user.email)
+        self.assertTrue(token['is_active'])
+        self.assertFalse(token['is_staff'])
+        self.assertIn('auth', token)
+
+    def test_authenticate_without_user_query(self):
+        """Test the user is built from claims once revocation is cached"""
+        authenticate(self.access)
+
+        with self.assertNumQueries(0):
+            user, _ = authenticate(self.access)
+            self.assertEqual(user.pk, self.user.pk)
+            self.assertEqual(user.email, self.user.email)
+            self.assertTrue(user.is_authenticated)
+
+    def test_full_user_loaded_lazily(self):
+        """Test fields outside the claims load when first used"""
+        authenticate(self.access)
+        user, _ = authenticate(self.access)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(user.name, self.user.name)
+
+    def test_password_change_revokes_token(self):
+        """Test changing the password revokes tokens issued before"""
+        authenticate(self.access)
+        self.user.set_password('newpass123')
+        self.user.save()
+
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            authenticate(self.access)
+
+    def test_inactive_user_rejected(self):
+        """Test tokens of a deactivated user are rejected"""
+        self.user.is_active = False
+        self.user.save()
+
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            authenticate(self.access)
+
+    def test_token_without_claims_loads_user(self):
+        """Test tokens issued without the claims still authenticate"""
+        token = RefreshToken.for_user(self.user).access_token
+
+        with self.assertNumQueries(1):
+            user, _ = authenticate(token)
+
+        self.assertEqual(user, self.user)
+
+    def test_refreshed_token_keeps_claims(self):
+        """Test refreshed access tokens still carry the user claims"""
+        res = self.client.post(reverse('user:token_refresh'), {
+            'refresh': self.refresh
+        })
+
+        self.assertEqual(
+            AccessToken(res.data['access'])['email'],
+            self.user.email
+        )
+
+    def test_recipes_with_stateless_user(self):
+        """Test the recipe endpoints work with a user built from claims"""
+        other = get_user_model().objects.create_user(
+            email='other@test.com',
+            password='testpass'
+        )
+        Recipe.objects.create(user=self.user, title='Mine', time_minutes=5,
+                              price=1.00)
+        Recipe.objects.create(user=other, title='Theirs', time_minutes=5,
+                              price=1.00)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access}')
+
+        created = self.client.post(RECIPES_URL, {
+            'title': 'New',
+            'time_minutes': 5,
+            'price': '2.00'
+        })
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(created.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            {recipe['title'] for recipe in res.data['results']},
+            {'Mine', 'New'}
+        )
+
+
+class CachedJWTAuthenticationTests(TestCase):
+
+    def setUp(self):
+        revocations.clear()
+        token_results.clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@test.com',
+            password='testpass'
+        )
+        self.client = APIClient()
+
+    def test_failed_auth_makes_no_query(self):
+        """Test a retried token of an inactive user is rejected from memory"""
+        self.user.is_active = False
+        self.user.save()
+        token = RefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        payload = {
+            'email': 'new@test.com',
+            'password': 'testpass',
+            'name': 'New'
+        }
+        first = self.client.post(CREATE_USER_URL, payload)
+
+        with self.assertNumQueries(0):
+            res = self.client.post(CREATE_USER_URL, payload)
+
+        self.assertEqual(first.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_claimless_token_not_remembered(self):
+        """Test a token without user claims is checked on every request"""
+        token = RefreshToken.for_user(self.user).access_token
+        authenticate(token, CachedJWTAuthentication)
+        get_user_model().objects.filter(pk=self.user.pk).update(
+            is_active=False
+        )
+
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            authenticate(token, CachedJWTAuthentication)
+
+    def test_unknown_user_remembered(self):
+        """Test a token of a deleted user is only looked up once"""
+        token = RefreshToken.for_user(self.user).access_token
+        self.user.delete()
+
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            authenticate(token, CachedJWTAuthentication)
+        with self.assertNumQueries(0):
+            with self.assertRaises(exceptions.AuthenticationFailed):
+                authenticate(token, CachedJWTAuthentication)
+
+    def test_user_remembered(self):
+        """Test a token is authenticated from memory the second time"""
+        token = add_user_claims(
+            RefreshToken.for_user(self.user).access_token,
+            self.user
+        )
+        authenticate(token, CachedJWTAuthentication)
+
+        with self.assertNumQueries(0):
+            user, _ = authenticate(token, CachedJWTAuthentication)
+
+        self.assertEqual(user, self.user)
+        self.assertEqual(user.email, self.user.email)
+
+    def test_anonymous_request(self):
+        """Test requests without a token are left to the next step"""
+        request = APIRequestFactory().get('/')
+
+        with self.assertNumQueries(0):
+            self.assertIsNone(CachedJWTAuthentication().authenticate(request))
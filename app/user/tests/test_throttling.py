@@ -0,0 +1,176 @@
+from unittest.mock import MagicMock, patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from user import throttling
+from user.throttling import get_semaphore, refill_and_take
+
+CREATE_USER_URL = reverse('user:create')
+USER_GETTOKEN_URL = reverse('user:token_obtain_pair')
+
+
+class TokenBucketTests(TestCase):
+
+    def test_bucket_refills_over_time(self):
+        """Test a bucket allows a burst then refills at the rate"""
+        state = None
+        for _ in range(3):
+            state, wait = refill_and_take(state, 100.0, 3, 1.0)
+            self.assertEqual(wait, 0)
+
+        state, wait = refill_and_take(state, 100.0, 3, 1.0)
+        self.assertEqual(wait, 1.0)
+        state, wait = refill_and_take(state, 101.5, 3, 1.0)
+        self.assertEqual(wait, 0)
+
+
+@override_settings(USER_THROTTLE_RATES={
+    'token_ip': '5/min',
+    'token_account': '2/min',
+    'create_ip': '1/hour',
+})
+class ThrottledEndpointTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            'testpass123'
+        )
+        self.client = APIClient()
+
+    def login(self, email='test@test.com', password='wrong'):
+        return self.client.post(USER_GETTOKEN_URL, {
+            'email': email,
+            'password': password
+        })
+
+    def test_account_throttled_before_hashing(self):
+        """Test throttled logins get Retry-After and hash nothing"""
+        self.login()
+        self.login()
+
+        with patch('django.contrib.auth.base_user.check_password') as check:
+            res = self.login(password='testpass123')
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertGreater(int(res['Retry-After']), 0)
+        check.assert_not_called()
+
+    def test_accounts_throttled_separately(self):
+        """Test one account running out does not lock out another"""
+        self.login()
+        self.login()
+
+        res = self.login(email='other@test.com')
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_address_throttled_across_accounts(self):
+        """Test an address trying many accounts is throttled"""
+        for index in range(5):
+            self.login(email=f'user{index}@test.com')
+
+        res = self.login(email='last@test.com')
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_list_body_throttled_by_address(self):
+        """Test a body that is not an object is only throttled per address"""
+        for _ in range(5):
+            res = self.client.post(USER_GETTOKEN_URL, [], format='json')
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.post(USER_GETTOKEN_URL, [], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_create_throttled(self):
+        """Test user creation is throttled per address"""
+        payload = {'email': 'new@test.com', 'password': 'testpass123'}
+        self.client.post(CREATE_USER_URL, payload)
+
+        res = self.client.post(CREATE_USER_URL, dict(payload,
+                                                     email='new2@test.com'))
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertFalse(
+            get_user_model().objects.filter(email='new2@test.com').exists()
+        )
+
+    def test_forwarded_for_not_trusted(self):
+        """Test a spoofed X-Forwarded-For does not get a fresh bucket"""
+        payload = {'email': 'new@test.com', 'password': 'testpass123'}
+        self.client.post(CREATE_USER_URL, payload,
+                         HTTP_X_FORWARDED_FOR='10.0.0.1')
+
+        res = self.client.post(CREATE_USER_URL,
+                               dict(payload, email='new2@test.com'),
+                               HTTP_X_FORWARDED_FOR='10.0.0.2')
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_local_fallback_when_cache_fails(self):
+        """Test buckets are kept in process when the cache is down"""
+        caches = MagicMock()
+        caches.__getitem__.side_effect = ConnectionError
+        with patch.object(throttling, 'caches', caches):
+            self.login()
+            self.login()
+            res = self.login()
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+
+@override_settings(USER_CONCURRENCY_CAPS={'token': 1})
+class ConcurrencyCapTests(TestCase):
+
+    def test_request_past_cap_rejected(self):
+        """Test a request past the in-flight cap is answered 429"""
+        semaphore = get_semaphore('token', 1)
+        semaphore.acquire()
+        try:
+            res = APIClient().post(USER_GETTOKEN_URL, {
+                'email': 'test@test.com',
+                'password': 'testpass123'
+            })
+        finally:
+            semaphore.release()
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', res)
+
+    def test_slot_released_after_request(self):
+        """Test the slot is free again once a request finished"""
+        for _ in range(2):
+            res = APIClient().post(USER_GETTOKEN_URL, {
+                'email': 'test@test.com',
+                'password': 'wrong'
+            })
+            self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(USER_CONCURRENCY_CAPS={'create': 1})
+    def test_slot_released_when_view_raises(self):
+        """Test an unhandled error in the view frees its slot"""
+        client = APIClient(raise_request_exception=False)
+        payload = {
+            'email': 'new@test.com',
+            'password': 'testpass123',
+            'name': 'New'
+        }
+        with patch('user.serializers.UserSerializer.create',
+                   side_effect=RuntimeError):
+            for _ in range(2):
+                res = client.post(CREATE_USER_URL, payload)
+                self.assertEqual(res.status_code,
+                                 status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        res = client.post(CREATE_USER_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
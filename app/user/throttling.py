@@ -0,0 +1,169 @@
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from rest_framework.exceptions import Throttled
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+LOCAL_BUCKETS_MAX = 10000
+
+_local_buckets = OrderedDict()
+_local_lock = threading.Lock()
+_semaphores = {}
+_semaphores_lock = threading.Lock()
+
+
+def parse_rate(rate):
+    """Return the capacity and refill per second of a 'N/period' rate"""
+    capacity, period = rate.split('/')
+    capacity = int(capacity)
+
+    return capacity, capacity / PERIODS[period[0]]
+
+
+def refill_and_take(state, now, capacity, refill):
+    """Return the bucket state after taking a token and the wait in seconds
+
+    The wait is 0 when a token was taken.
+    """
+    tokens, stamp = state if state is not None else (capacity, now)
+    tokens = min(capacity, tokens + max(0, now - stamp) * refill)
+    if tokens >= 1:
+        return (tokens - 1, now), 0
+
+    return (tokens, now), (1 - tokens) / refill
+
+
+def take_token(key, capacity, refill):
+    """Take a token from the bucket at key, return the wait in seconds
+
+    Buckets live in THROTTLE_CACHE_ALIAS so every process shares them, an
+    entry expires once the bucket would be full again anyway. When the
+    cache is unreachable the buckets of this process are used instead.
+    Concurrent requests can race between the read and the write and let
+    a request or two more through, which a throttle can live with.
+    """
+    now = time.time()
+    try:
+        cache = caches[settings.THROTTLE_CACHE_ALIAS]
+        state = cache.get(key)
+    except Exception:
+        cache = None
+        with _local_lock:
+            state = _local_buckets.get(key)
+
+    state, wait = refill_and_take(state, now, capacity, refill)
+    if cache is not None:
+        try:
+            cache.set(key, state, math.ceil(capacity / refill))
+            return wait
+        except Exception:
+            pass
+    with _local_lock:
+        _local_buckets.pop(key, None)
+        _local_buckets[key] = state
+        while len(_local_buckets) > LOCAL_BUCKETS_MAX:
+            _local_buckets.popitem(last=False)
+
+    return wait
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Token bucket throttle for the scope of the view
+
+    The rate for '<view.throttle_scope>_<kind>' is looked up in
+    USER_THROTTLE_RATES, scopes without a rate are not throttled.
+    """
+    kind = None
+
+    def get_ident_key(self, request, view):
+        """Return what the bucket is kept for, None to not throttle"""
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        scope = f'{view.throttle_scope}_{self.kind}'
+        rate = settings.USER_THROTTLE_RATES.get(scope)
+        ident = self.get_ident_key(request, view) if rate else None
+        if ident is None:
+            return True
+
+        digest = hashlib.sha256(ident.encode()).hexdigest()
+        self.delay = take_token(
+            f'throttle:{scope}:{digest}',
+            *parse_rate(rate)
+        )
+
+        return self.delay == 0
+
+    def wait(self):
+        return self.delay
+
+
+class IPThrottle(TokenBucketThrottle):
+    """Bucket per client address
+
+    X-Forwarded-For is only trusted for the NUM_PROXIES hops in front of
+    the app, REMOTE_ADDR otherwise, so clients cannot pick their bucket.
+    """
+    kind = 'ip'
+
+    def get_ident_key(self, request, view):
+        return self.get_ident(request)
+
+
+class AccountThrottle(TokenBucketThrottle):
+    """Bucket per account named in the request body"""
+    kind = 'account'
+
+    def get_ident_key(self, request, view):
+        if not isinstance(request.data, Mapping):
+            return None
+        username = request.data.get(get_user_model().USERNAME_FIELD)
+        if not isinstance(username, str) or not username:
+            return None
+
+        return username.strip().lower()
+
+
+def get_semaphore(scope, cap):
+    with _semaphores_lock:
+        semaphore = _semaphores.get((scope, cap))
+        if semaphore is None:
+            semaphore = _semaphores[(scope, cap)] = threading.Semaphore(cap)
+
+    return semaphore
+
+
+class ConcurrencyCapMixin:
+    """Reject requests past USER_CONCURRENCY_CAPS in flight in a process
+
+    Checked after the throttles, the slot is released once dispatch
+    returns, whether the view succeeded, failed or raised.
+    """
+    concurrency_slot = None
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            if self.concurrency_slot is not None:
+                self.concurrency_slot.release()
+                self.concurrency_slot = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        cap = settings.USER_CONCURRENCY_CAPS.get(self.throttle_scope)
+        if cap is None:
+            return
+
+        semaphore = get_semaphore(self.throttle_scope, cap)
+        if not semaphore.acquire(blocking=False):
+            raise Throttled(wait=1)
+        self.concurrency_slot = semaphore
@@ -1,14 +1,32 @@
 from rest_framework import generics, permissions
 from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.views import TokenObtainPairView, \
+                                           TokenRefreshView
 
 
-from user.serializers import UserSerializer
+from user.serializers import UserSerializer, AuthTokenObtainPairSerializer
+from user.throttling import AccountThrottle, ConcurrencyCapMixin, IPThrottle
 
 
-class CreateUserView(generics.CreateAPIView):
+class CreateUserView(ConcurrencyCapMixin, generics.CreateAPIView):
     """Create a new user in the system"""
     serializer_class = UserSerializer
     permissions_classes = (permissions.AllowAny, )
+    throttle_classes = (IPThrottle, AccountThrottle)
+    throttle_scope = 'create'
+
+
+class CreateTokenView(ConcurrencyCapMixin, TokenObtainPairView):
+    """Issue a token pair carrying the user claims"""
+    serializer_class = AuthTokenObtainPairSerializer
+    throttle_classes = (IPThrottle, AccountThrottle)
+    throttle_scope = 'token'
+
+
+class RefreshTokenView(ConcurrencyCapMixin, TokenRefreshView):
+    """Issue a new access token for a refresh token"""
+    throttle_classes = (IPThrottle, )
+    throttle_scope = 'refresh'
 
 
 class ManageUserView(generics.RetrieveUpdateAPIView):